@@ -1,12 +1,20 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
 import os
 import sys
 from pathlib import Path
 from tools.supabase_client import supabase
+from tools.memory_store import get_memory_store
+from tools.enrichment_queue import get_enrichment_queue
+from tools.llm_cache import get_llm_cache
+from tools.llm_gateway import get_llm_gateway
+from tools.trend_engine import get_trend_engine
+from tools.trend_leaderboard import get_ranked_articles, get_trend_leaderboard
+from tools.blog_task_queue import get_blog_task_queue
+from tools.blog_stream import format_sse, stream_blog
 from config.logging_config import setup_logging
 from crew import execute_workflow  # Only import what we need
 from datetime import datetime
@@ -23,6 +31,10 @@ class TrendAnalysisRequest(BaseModel):
     topic: str
     category: Optional[str] = None
     max_results: Optional[int] = 10
+    # Idempotency key; a retried request with the same key does not save a second blog
+    run_id: Optional[str] = None
+    # Generate even if a blog on a near-identical topic was written recently
+    force: Optional[bool] = False
 
 class BlogPost(BaseModel):
     title: str
@@ -40,6 +52,9 @@ class NewsArticle(BaseModel):
 # Predefined categories
 CATEGORIES = ["All", "Tech", "Culture", "Business", "Fashion", "Sports", "Politics", "Health", "Miscellaneous"]
 
+# Columns returned for blog list views, without the full content
+BLOG_SUMMARY_COLUMNS = 'id,title,category,image_url,trend_score,created_at,excerpt,word_count,reading_time_minutes'
+
 app = FastAPI(
     title="MPCrew API",
     description="API for MPCrew News Analysis and Blog Generation",
@@ -49,6 +64,11 @@ app = FastAPI(
 # Include the router
 app.include_router(router)
 
+@app.on_event("startup")
+def start_background_workers():
+    """Refresh and decay the trend leaderboard from the API process, not from every importer"""
+    get_trend_leaderboard().start()
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -90,7 +110,9 @@ async def analyze_trends(request: TrendAnalysisRequest):
         # Use CrewAI crew to analyze trends
         crew_result = execute_workflow(
             topic=request.topic,
-            category=request.category
+            category=request.category,
+            run_id=request.run_id,
+            force=request.force
         )
         
         # Extract content from the crew result
@@ -112,13 +134,24 @@ async def analyze_trends(request: TrendAnalysisRequest):
         logger.error(f"Error analyzing trends: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/analyze-trends/stream")
+async def analyze_trends_stream(topic: str, category: Optional[str] = None, run_id: Optional[str] = None):
+    """Stream stage progress and blog tokens as Server-Sent Events; the blog is saved at the end"""
+    logger.info(f"Streaming blog generation for topic: {topic}", extra={'category': category})
+    # A sync generator is iterated in the threadpool, so waiting for events does not block the loop
+    events = (format_sse(event) for event in stream_blog(topic, category, run_id))
+    return StreamingResponse(events, media_type="text/event-stream", headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Keep proxies from buffering the stream
+    })
+
 @app.get("/api/blogs")
-async def get_blogs(category: Optional[str] = None):
-    """Get all blog posts, optionally filtered by category"""
+async def get_blogs(category: Optional[str] = None, summary: bool = False):
+    """Get all blog posts, optionally filtered by category; summary=true leaves out the content"""
     logger.info("Fetching blog posts", extra={'category': category})
     
     try:
-        query = supabase.table('blogs').select('*')
+        query = supabase.table('blogs').select(BLOG_SUMMARY_COLUMNS if summary else '*')
         if category and category.lower() != 'all':
             query = query.eq('category', category)
         
@@ -128,22 +161,81 @@ async def get_blogs(category: Optional[str] = None):
         logger.error(f"Error fetching blogs: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/blogs/{blog_id}/tasks")
+async def get_blog_tasks(blog_id: str):
+    """Get the status of background image and embedding tasks for a blog"""
+    logger.info("Fetching blog tasks", extra={'blog_id': blog_id})
+    try:
+        response = supabase.table('blog_tasks').select('*').eq('blog_id', blog_id).order('created_at').execute()
+        return response.data
+    except Exception as e:
+        logger.error(f"Error fetching blog tasks, using in-process status: {str(e)}")
+        return get_blog_task_queue().get_tasks(blog_id)
+
 @app.get("/api/trends")
-async def get_trends(category: Optional[str] = None):
-    """Get all trends, optionally filtered by category"""
+async def get_trends(category: Optional[str] = None, page: int = 1, page_size: int = 50):
+    """Get analyzed articles ranked by trend score, optionally filtered by category"""
     logger.info("Fetching trends", extra={'category': category})
+    page = max(1, page)
+    page_size = max(1, min(page_size, 200))
+    offset = (page - 1) * page_size
     
     try:
-        query = supabase.table('news_articles').select('*').eq('analyzed', True)
-        if category and category.lower() != 'all':
-            query = query.eq('category', category)
-        
-        response = query.execute()
-        return response.data
+        leaderboard = get_trend_leaderboard()
+        # Only the top leaderboard.size ranks are stored; deeper pages come from the articles table
+        if offset + page_size <= leaderboard.size:
+            try:
+                return leaderboard.get_page(category, limit=page_size, offset=offset)
+            except Exception as leaderboard_error:
+                logger.error(f"Error reading trend leaderboard, querying articles: {str(leaderboard_error)}")
+
+        return get_ranked_articles(category, limit=page_size, offset=offset)
     except Exception as e:
         logger.error(f"Error fetching trends: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/trends/rising")
+async def get_rising_trends(category: Optional[str] = None, limit: int = 20):
+    """Get terms bursting above their rolling baseline, optionally within a category"""
+    logger.info("Fetching rising trends", extra={'category': category})
+    try:
+        return get_trend_engine().rising_terms(category, limit=limit)
+    except Exception as e:
+        logger.error(f"Error detecting rising trends: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/memory/stats")
+async def get_memory_stats():
+    """Get hit/miss statistics for the shared article memory store"""
+    logger.info("Memory stats endpoint accessed")
+    stats = get_memory_store().get_stats()
+    stats['enrichment_queue'] = get_enrichment_queue().get_stats()
+    return stats
+
+@app.get("/api/llm/cache-stats")
+async def get_llm_cache_stats():
+    """Get per-call-site hit/miss statistics for the LLM response cache"""
+    logger.info("LLM cache stats endpoint accessed")
+    return get_llm_cache().get_stats()
+
+@app.get("/api/llm/stats")
+async def get_llm_stats():
+    """Get per-call-site request, retry, latency and token metrics from the LLM gateway"""
+    logger.info("LLM stats endpoint accessed")
+    return get_llm_gateway().get_stats()
+
+@app.get("/api/blogs/tasks/stats")
+async def get_blog_task_stats():
+    """Get queue depth, retry and failure counts for background blog tasks"""
+    logger.info("Blog task stats endpoint accessed")
+    return get_blog_task_queue().get_stats()
+
+@app.get("/api/trends/leaderboard/stats")
+async def get_trend_leaderboard_stats():
+    """Get refresh counts and pending categories for the trend leaderboard"""
+    logger.info("Trend leaderboard stats endpoint accessed")
+    return get_trend_leaderboard().get_stats()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
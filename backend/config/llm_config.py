@@ -0,0 +1,64 @@
+import os
+from typing import Any, Dict, Tuple
+
+# Model used by each tier. Tiers are resolved when a profile is requested,
+# so values loaded by load_dotenv() after import are still picked up.
+def get_tier_models() -> Dict[str, str]:
+    return {
+        'small': os.getenv('LLM_SMALL_MODEL', 'gpt-4o-mini'),
+        'large': os.getenv('LLM_LARGE_MODEL', os.getenv('OPENAI_MODEL_NAME', 'gpt-4o')),
+        'embedding': os.getenv('LLM_EMBEDDING_MODEL', 'text-embedding-ada-002'),
+    }
+
+# One profile per LLM task. The task name is also the call site name used
+# in the LLM cache and gateway metrics, so each tier can be tuned against
+# the per-task latency and token numbers from /api/llm/stats.
+TASK_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Short extractive work: summary and key points of a single article
+    'article_enrichment': {'tier': 'small', 'temperature': 0.7},
+    # One-word label from a fixed list
+    'blog_categorization': {'tier': 'small', 'temperature': 0.3, 'max_tokens': 20},
+    # Reasoning over many articles and structured JSON output
+    'trend_analysis': {'tier': 'large', 'temperature': 0.7},
+    # Long-form writing that readers see
+    'blog_generation': {'tier': 'large', 'temperature': 0.7},
+    'rag_chat': {'tier': 'large', 'temperature': 0.7, 'max_tokens': 1000},
+    # CrewAI agents
+    'crew': {'tier': 'large', 'temperature': 0.7},
+    'blog_embedding': {'tier': 'embedding'},
+    # Story clustering of news articles
+    'article_embedding': {'tier': 'embedding'},
+}
+
+DEFAULT_PROFILE = {'tier': 'large', 'temperature': 0.7}
+
+def get_task_profile(task: str) -> Dict[str, Any]:
+    """
+    Resolve the model settings for task.
+
+    LLM_MODEL_<TASK> (e.g. LLM_MODEL_TREND_ANALYSIS) pins a single task to
+    a specific model; otherwise the model comes from the task's tier.
+    """
+    profile = dict(TASK_PROFILES.get(task, DEFAULT_PROFILE))
+    profile['model'] = os.getenv(f"LLM_MODEL_{task.upper()}") or get_tier_models()[profile['tier']]
+    profile['task'] = task
+    return profile
+
+# USD per million (input, output) tokens, used for per-workflow cost estimates
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4o-mini': (0.15, 0.60),
+    'gpt-4-turbo': (10.00, 30.00),
+    'gpt-3.5-turbo': (0.50, 1.50),
+    'text-embedding-ada-002': (0.10, 0.0),
+    'text-embedding-3-small': (0.02, 0.0),
+}
+
+def get_model_price(model: str) -> Tuple[float, float]:
+    """Price for model, matching dated snapshots (gpt-4o-2024-08-06) by prefix"""
+    if not model:
+        return (0.0, 0.0)
+    for name in sorted(MODEL_PRICES, key=len, reverse=True):
+        if model.startswith(name):
+            return MODEL_PRICES[name]
+    return (0.0, 0.0)
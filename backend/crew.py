@@ -1,15 +1,18 @@
 import os
 import time
-import openai
+import uuid
 import traceback
+from typing import Optional
 from crewai import Agent, Task, Crew, Process
-from langchain_openai import ChatOpenAI
+from tools.llm_gateway import get_llm_gateway
+from config.llm_config import get_task_profile
+from tools.token_budget import TokenBudgetExceeded, WorkflowUsage, track_usage
 from tools.news_data_collection_tool import fetch_news
 from tools.trend_analyzer_tool import analyze_trends
-from tools.save_blog_post_tool import create_blog_post
+from tools.save_blog_post_tool import blog_stage, create_blog_post
 from config.logging_config import setup_logging
 from tools.supabase_client import supabase
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import json
 import postgrest
 
@@ -17,17 +20,21 @@ import postgrest
 logger = setup_logging()
 from dotenv import load_dotenv
 load_dotenv()
-openai.api_key = os.getenv('OPENAI_API_KEY')
-openai_model = os.getenv('OPENAI_MODEL_NAME', 'gpt-4o')
+openai_model = get_task_profile('crew')['model']
 
 logger.info("Initializing CrewAI components", extra={'extra_data': {'model': openai_model}})
 
 # Initialize the language model
-llm = ChatOpenAI(
-    model=openai_model,
-    temperature=0.7,
-    api_key=os.getenv('OPENAI_API_KEY')
-)
+llm = get_llm_gateway().langchain_chat('crew')
+
+# Upper bound on reasoning steps per agent, so a looping agent cannot run forever
+AGENT_MAX_ITERATIONS = int(os.getenv('AGENT_MAX_ITERATIONS', '15'))
+
+# Skip generation when a blog on a near-identical topic was written within the window
+TOPIC_GATE_ENABLED = os.getenv('TOPIC_GATE_ENABLED', 'true').lower() == 'true'
+TOPIC_GATE_WINDOW_HOURS = float(os.getenv('TOPIC_GATE_WINDOW_HOURS', '24'))
+# Cosine similarity between the topic and a blog's embedding that counts as the same topic
+TOPIC_GATE_THRESHOLD = float(os.getenv('TOPIC_GATE_THRESHOLD', '0.85'))
 
 # Create singleton instances of agents
 news_collector = None
@@ -44,6 +51,8 @@ def get_news_collector():
             and relevant content. Your job is to find and validate news articles that are
             both credible and relevant to the topic.""",
             tools=[fetch_news],
+            llm=llm,
+            max_iter=AGENT_MAX_ITERATIONS,
             allow_delegation=False,
             verbose=True
         )
@@ -59,6 +68,8 @@ def get_trend_analyzer():
             and patterns in news content. Your expertise lies in extracting meaningful
             insights from large volumes of information.""",
             tools=[analyze_trends],
+            llm=llm,
+            max_iter=AGENT_MAX_ITERATIONS,
             allow_delegation=False,
             verbose=True
         )
@@ -74,6 +85,8 @@ def get_content_creator():
             complex trend analysis into engaging blog posts. You know how to structure
             content for maximum impact and readability.""",
             tools=[create_blog_post],
+            llm=llm,
+            max_iter=AGENT_MAX_ITERATIONS,
             allow_delegation=False,
             verbose=True
         )
@@ -109,7 +122,9 @@ def create_tasks(topic: str, category: str = None) -> list[Task]:
             content = output.raw
             
             # Use the create_blog_post tool's _run method directly
-            # This avoids the 'Tool' object is not callable error
+            # This avoids the 'Tool' object is not callable error.
+            # If the agent already saved a blog through the tool during this
+            # workflow run, _run returns that blog instead of saving another.
             parsed_input = create_blog_post._parse_input({
                 'final_answer': content,
                 'topic': topic,
@@ -198,10 +213,18 @@ def serialize_crew_output(crew_output):
         logger.error(traceback.format_exc())
         return {"error": "Failed to serialize crew output", "message": str(e)}
 
-def execute_workflow(topic: str, category: str = None) -> dict:
-    """Execute the news analysis and blog creation workflow"""
+def execute_workflow(topic: str, category: str = None, run_id: str = None, force: bool = False) -> dict:
+    """
+    Execute the news analysis and blog creation workflow.
+
+    run_id is the idempotency key for the blog this run saves; retrying a
+    run with the same key returns its blog instead of writing a new one.
+    Unless force is set, a topic close to a recently written blog returns
+    that blog instead of running the crew.
+    """
     try:
-        logger.info(f"Starting workflow for topic: {topic}, category: {category}")
+        run_id = run_id or str(uuid.uuid4())
+        logger.info(f"Starting workflow {run_id} for topic: {topic}, category: {category}")
         
         # Check cache first
         cached_result = get_cached_results(topic, category)
@@ -209,6 +232,19 @@ def execute_workflow(topic: str, category: str = None) -> dict:
             logger.info(f"Using cached analysis for {topic}")
             return cached_result
         
+        if TOPIC_GATE_ENABLED and not force:
+            existing = check_existing_analysis(topic, category)
+            if existing:
+                logger.info(f"Skipping generation for {topic}, returning existing blog {existing['blog']['id']}")
+                return {
+                    "cached": True,
+                    "topic": topic,
+                    "category": category if category else 'miscellaneous',
+                    "timestamp": existing['blog']['created_at'],
+                    "blog": existing['blog'],
+                    "similarity": existing['similarity']
+                }
+        
         # Create and run the crew
         crew = Crew(
             agents=[
@@ -227,8 +263,16 @@ def execute_workflow(topic: str, category: str = None) -> dict:
             'category': category if category else 'miscellaneous'
         }
         
+        # Every LLM call made while the crew runs is charged to this workflow,
+        # and the blog stage commits at most one blog for it
+        usage = WorkflowUsage()
         logger.info(f"Kicking off crew with inputs: {inputs}")
-        result = crew.kickoff(inputs=inputs)
+        try:
+            with track_usage(usage), blog_stage(run_id) as stage:
+                result = crew.kickoff(inputs=inputs)
+        except TokenBudgetExceeded as budget_error:
+            logger.error(f"Workflow stopped by token budget: {str(budget_error)}")
+            return {"error": str(budget_error), "run_id": run_id, "token_usage": usage.summary()}
         
         # Serialize the result before caching
         serialized_result = serialize_crew_output(result)
@@ -238,8 +282,12 @@ def execute_workflow(topic: str, category: str = None) -> dict:
             "topic": topic,
             "category": category if category else 'miscellaneous',
             "timestamp": datetime.now().isoformat(),
-            "result": serialized_result
+            "run_id": run_id,
+            "blog": stage.result.get("blog") if stage.result else None,
+            "result": serialized_result,
+            "token_usage": usage.summary()
         }
+        logger.info("Workflow token usage", extra={'extra_data': final_result['token_usage']})
         
         # Save the result to cache
         try:
@@ -256,29 +304,37 @@ def execute_workflow(topic: str, category: str = None) -> dict:
         logger.error(traceback.format_exc())
         return {"error": str(e)}
 
-def check_existing_analysis(topic: str, category: str = None) -> bool:
-    """Check if we already have analysis for this topic"""
+def check_existing_analysis(topic: str, category: str = None) -> Optional[dict]:
+    """
+    Find a recent blog on the same topic, compared by embedding so wording
+    differences ("AI" vs "Artificial Intelligence") still match.
+
+    Returns the closest blog created within TOPIC_GATE_WINDOW_HOURS whose
+    similarity to the topic is above TOPIC_GATE_THRESHOLD, or None.
+    """
     try:
-        # Check for existing blog posts on this topic
-        query = supabase.table('blogs').select('id')
-        
-        if topic:
-            query = query.ilike('title', f'%{topic}%')
-        
-        if category:
-            query = query.eq('category', category)
-            
-        # Only consider recent posts (last 24 hours)
-        yesterday = (datetime.now().isoformat().split('T')[0] + 'T00:00:00')
-        query = query.gte('created_at', yesterday)
-        
-        result = query.execute()
-        
-        return len(result.data) > 0
+        # Same embedding model as blog_embeddings so the vectors are comparable
+        topic_embedding = get_llm_gateway().embed_for_task('blog_embedding', topic)[0]
+        since = datetime.now(timezone.utc) - timedelta(hours=TOPIC_GATE_WINDOW_HOURS)
+        matches = supabase.rpc('match_recent_blogs', {
+            'query_embedding': topic_embedding,
+            'p_since': since.isoformat(),
+            'match_threshold': TOPIC_GATE_THRESHOLD,
+            'match_count': 1,
+            'p_category': category
+        }).execute()
+        if not matches.data:
+            return None
+        match = matches.data[0]
+        blog = supabase.table('blogs').select('*').eq('id', match['blog_id']).execute()
+        if not blog.data:
+            return None
+        logger.info(f"Topic '{topic}' matches recent blog '{match['title']}' (similarity {match['similarity']:.3f})")
+        return {"blog": blog.data[0], "similarity": match['similarity']}
     except Exception as e:
         logger.error(f"Error checking existing analysis: {str(e)}")
         logger.error(traceback.format_exc())
-        return False
+        return None
 
 def get_cached_results(topic: str, category: str = None):
     """Get cached results for a topic"""
@@ -341,6 +397,7 @@ def cache_result(topic: str, category: str, result: dict):
                 "topic": topic,
                 "category": category if category else 'miscellaneous',
                 "result": json_result,
+                "token_usage": json_result.get('token_usage'),
                 "created_at": datetime.now().isoformat()
             }
             
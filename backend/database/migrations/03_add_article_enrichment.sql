@@ -0,0 +1,10 @@
+-- Store background enrichment results alongside each article
+ALTER TABLE public.news_articles
+ADD COLUMN IF NOT EXISTS summary TEXT,
+ADD COLUMN IF NOT EXISTS key_points JSONB DEFAULT '[]',
+ADD COLUMN IF NOT EXISTS enriched_at TIMESTAMP WITH TIME ZONE;
+
+CREATE INDEX IF NOT EXISTS idx_news_articles_enriched_at ON public.news_articles(enriched_at);
+
+-- Refresh the schema cache
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,6 @@
+-- Token and cost totals for each cached workflow run
+ALTER TABLE public.workflow_cache
+ADD COLUMN IF NOT EXISTS token_usage JSONB;
+
+-- Refresh the schema cache
+NOTIFY pgrst, 'reload schema';
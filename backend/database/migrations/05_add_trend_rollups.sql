@@ -0,0 +1,79 @@
+-- Hourly term and bigram counts per category, used by the local trend engine
+CREATE TABLE IF NOT EXISTS public.trend_term_rollups (
+    category TEXT NOT NULL,
+    bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+    term TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (category, bucket, term)
+);
+
+-- Number of articles in each hourly bucket, the denominator for term rates
+CREATE TABLE IF NOT EXISTS public.trend_bucket_totals (
+    category TEXT NOT NULL,
+    bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+    articles INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (category, bucket)
+);
+
+CREATE INDEX IF NOT EXISTS idx_trend_term_rollups_bucket ON public.trend_term_rollups(bucket);
+CREATE INDEX IF NOT EXISTS idx_trend_bucket_totals_bucket ON public.trend_bucket_totals(bucket);
+
+-- Enable RLS on the rollup tables
+ALTER TABLE public.trend_term_rollups ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.trend_bucket_totals ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Public read access for trend_term_rollups" ON public.trend_term_rollups
+    FOR SELECT USING (true);
+
+CREATE POLICY "Enable insert for service role" ON public.trend_term_rollups
+    FOR INSERT WITH CHECK (true);
+
+CREATE POLICY "Enable update for service role" ON public.trend_term_rollups
+    FOR UPDATE USING (true);
+
+CREATE POLICY "Public read access for trend_bucket_totals" ON public.trend_bucket_totals
+    FOR SELECT USING (true);
+
+CREATE POLICY "Enable insert for service role" ON public.trend_bucket_totals
+    FOR INSERT WITH CHECK (true);
+
+CREATE POLICY "Enable update for service role" ON public.trend_bucket_totals
+    FOR UPDATE USING (true);
+
+-- Add counts to the rollups. Increments (rather than overwrites) keep
+-- concurrent writers from different API workers from losing updates.
+CREATE OR REPLACE FUNCTION increment_trend_rollups(
+    term_rows JSONB,
+    total_rows JSONB
+)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO public.trend_term_rollups (category, bucket, term, count)
+    SELECT r->>'category', (r->>'bucket')::timestamptz, r->>'term', (r->>'count')::int
+    FROM jsonb_array_elements(term_rows) AS r
+    ON CONFLICT (category, bucket, term)
+    DO UPDATE SET count = public.trend_term_rollups.count + EXCLUDED.count;
+
+    INSERT INTO public.trend_bucket_totals (category, bucket, articles)
+    SELECT r->>'category', (r->>'bucket')::timestamptz, (r->>'articles')::int
+    FROM jsonb_array_elements(total_rows) AS r
+    ON CONFLICT (category, bucket)
+    DO UPDATE SET articles = public.trend_bucket_totals.articles + EXCLUDED.articles;
+END;
+$$;
+
+-- Grant permissions
+GRANT ALL ON public.trend_term_rollups TO service_role;
+GRANT ALL ON public.trend_term_rollups TO anon;
+GRANT ALL ON public.trend_term_rollups TO authenticated;
+GRANT ALL ON public.trend_bucket_totals TO service_role;
+GRANT ALL ON public.trend_bucket_totals TO anon;
+GRANT ALL ON public.trend_bucket_totals TO authenticated;
+GRANT EXECUTE ON FUNCTION increment_trend_rollups TO service_role;
+GRANT EXECUTE ON FUNCTION increment_trend_rollups TO anon;
+GRANT EXECUTE ON FUNCTION increment_trend_rollups TO authenticated;
+
+-- Refresh the schema cache
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,41 @@
+-- Accumulated trend analysis per topic, updated incrementally as new articles are analyzed
+CREATE TABLE IF NOT EXISTS public.topic_trend_state (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    topic_key TEXT NOT NULL,
+    category TEXT NOT NULL,
+    trends JSONB NOT NULL DEFAULT '{}'::jsonb,
+    top_articles JSONB NOT NULL DEFAULT '[]'::jsonb,
+    article_count INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT TIMEZONE('utc'::text, NOW()),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT TIMEZONE('utc'::text, NOW()),
+    UNIQUE (topic_key, category)
+);
+
+-- Unanalyzed articles are fetched newest first
+CREATE INDEX IF NOT EXISTS idx_news_articles_unanalyzed
+    ON public.news_articles(created_at DESC) WHERE analyzed = FALSE;
+
+-- Enable RLS on topic_trend_state
+ALTER TABLE public.topic_trend_state ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Public read access for topic_trend_state" ON public.topic_trend_state
+    FOR SELECT USING (true);
+
+CREATE POLICY "Enable insert for service role" ON public.topic_trend_state
+    FOR INSERT WITH CHECK (true);
+
+CREATE POLICY "Enable update for service role" ON public.topic_trend_state
+    FOR UPDATE USING (true);
+
+CREATE TRIGGER set_updated_at
+    BEFORE UPDATE ON public.topic_trend_state
+    FOR EACH ROW
+    EXECUTE FUNCTION public.handle_updated_at();
+
+-- Grant permissions
+GRANT ALL ON public.topic_trend_state TO service_role;
+GRANT ALL ON public.topic_trend_state TO anon;
+GRANT ALL ON public.topic_trend_state TO authenticated;
+
+-- Refresh the schema cache
+NOTIFY pgrst, 'reload schema';
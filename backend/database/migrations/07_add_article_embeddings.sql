@@ -0,0 +1,33 @@
+-- Enable the pgvector extension
+CREATE EXTENSION IF NOT EXISTS vector;
+
+-- One embedding per news article, used for story clustering
+CREATE TABLE IF NOT EXISTS public.article_embeddings (
+    article_id UUID PRIMARY KEY REFERENCES public.news_articles(id) ON DELETE CASCADE,
+    model TEXT NOT NULL,
+    embedding vector(1536),  -- OpenAI embeddings are 1536 dimensions
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT TIMEZONE('utc'::text, NOW())
+);
+
+-- Create an index for faster similarity search
+CREATE INDEX IF NOT EXISTS article_embeddings_embedding_idx ON public.article_embeddings USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
+
+-- Enable RLS on the article_embeddings table
+ALTER TABLE public.article_embeddings ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Public read access for article_embeddings" ON public.article_embeddings
+    FOR SELECT USING (true);
+
+CREATE POLICY "Enable insert for service role" ON public.article_embeddings
+    FOR INSERT WITH CHECK (true);
+
+CREATE POLICY "Enable update for service role" ON public.article_embeddings
+    FOR UPDATE USING (true);
+
+-- Grant permissions
+GRANT ALL ON public.article_embeddings TO service_role;
+GRANT ALL ON public.article_embeddings TO anon;
+GRANT ALL ON public.article_embeddings TO authenticated;
+
+-- Refresh the schema cache
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,102 @@
+-- Precomputed top analyzed articles per category (and 'all'), ranked by trend score.
+-- Pages are read by (category, rank) primary key lookups.
+CREATE TABLE IF NOT EXISTS public.trend_leaderboard (
+    category TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    article_id UUID NOT NULL REFERENCES public.news_articles(id) ON DELETE CASCADE,
+    title TEXT,
+    description TEXT,
+    url TEXT,
+    source TEXT,
+    image_url TEXT,
+    url_to_image TEXT,
+    published_at TIMESTAMP WITH TIME ZONE,
+    trend_score FLOAT,
+    refreshed_at TIMESTAMP WITH TIME ZONE DEFAULT TIMEZONE('utc'::text, NOW()),
+    PRIMARY KEY (category, rank)
+);
+
+-- Supports the per-category top-N scan in refresh_trend_leaderboard
+CREATE INDEX IF NOT EXISTS idx_news_articles_analyzed_category_score
+    ON public.news_articles(lower(category), trend_score DESC) WHERE analyzed = TRUE;
+
+-- Enable RLS on trend_leaderboard
+ALTER TABLE public.trend_leaderboard ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Public read access for trend_leaderboard" ON public.trend_leaderboard
+    FOR SELECT USING (true);
+
+CREATE POLICY "Enable insert for service role" ON public.trend_leaderboard
+    FOR INSERT WITH CHECK (true);
+
+CREATE POLICY "Enable delete for service role" ON public.trend_leaderboard
+    FOR DELETE USING (true);
+
+-- Rebuild the leaderboard for the given categories (lowercase, 'all' for the
+-- overall ranking), or for every category when p_categories is NULL.
+-- Runs in one transaction, so readers see either the old or the new ranking.
+CREATE OR REPLACE FUNCTION refresh_trend_leaderboard(
+    p_categories TEXT[] DEFAULT NULL,
+    p_size INTEGER DEFAULT 200
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    refreshed INTEGER;
+BEGIN
+    -- Serialise concurrent refreshes from different API workers
+    PERFORM pg_advisory_xact_lock(hashtext('refresh_trend_leaderboard'));
+
+    IF p_categories IS NULL THEN
+        SELECT array_agg(DISTINCT lower(category)) INTO p_categories
+        FROM public.news_articles
+        WHERE analyzed = TRUE;
+        p_categories := array_append(COALESCE(p_categories, '{}'), 'all');
+        -- Categories without analyzed articles drop out
+        DELETE FROM public.trend_leaderboard WHERE category <> ALL(p_categories);
+    END IF;
+
+    DELETE FROM public.trend_leaderboard WHERE category = ANY(p_categories);
+
+    INSERT INTO public.trend_leaderboard (category, rank, article_id, title, description, url, source,
+                                          image_url, url_to_image, published_at, trend_score)
+    SELECT category, rank, id, title, description, url, source, image_url, url_to_image, published_at, trend_score
+    FROM (
+        SELECT lower(a.category) AS category,
+               ROW_NUMBER() OVER (PARTITION BY lower(a.category) ORDER BY a.trend_score DESC, a.published_at DESC) AS rank,
+               a.id, a.title, a.description, a.url, a.source, a.image_url, a.url_to_image, a.published_at, a.trend_score
+        FROM public.news_articles a
+        WHERE a.analyzed = TRUE AND lower(a.category) = ANY(p_categories)
+    ) ranked
+    WHERE rank <= p_size;
+
+    IF 'all' = ANY(p_categories) THEN
+        INSERT INTO public.trend_leaderboard (category, rank, article_id, title, description, url, source,
+                                              image_url, url_to_image, published_at, trend_score)
+        SELECT 'all', ROW_NUMBER() OVER (ORDER BY trend_score DESC, published_at DESC),
+               id, title, description, url, source, image_url, url_to_image, published_at, trend_score
+        FROM (
+            SELECT *
+            FROM public.news_articles
+            WHERE analyzed = TRUE
+            ORDER BY trend_score DESC, published_at DESC
+            LIMIT p_size
+        ) top;
+    END IF;
+
+    SELECT count(*) INTO refreshed FROM public.trend_leaderboard WHERE category = ANY(p_categories);
+    RETURN refreshed;
+END;
+$$;
+
+-- Grant permissions
+GRANT ALL ON public.trend_leaderboard TO service_role;
+GRANT SELECT ON public.trend_leaderboard TO anon;
+GRANT SELECT ON public.trend_leaderboard TO authenticated;
+GRANT EXECUTE ON FUNCTION refresh_trend_leaderboard TO service_role;
+GRANT EXECUTE ON FUNCTION refresh_trend_leaderboard TO anon;
+GRANT EXECUTE ON FUNCTION refresh_trend_leaderboard TO authenticated;
+
+-- Refresh the schema cache
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,89 @@
+-- Score a blog was created with; trend_score decays from it over time
+ALTER TABLE public.blogs
+ADD COLUMN IF NOT EXISTS base_trend_score FLOAT;
+
+UPDATE public.blogs SET base_trend_score = trend_score WHERE base_trend_score IS NULL;
+
+CREATE OR REPLACE FUNCTION public.set_base_trend_score()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.base_trend_score = COALESCE(NEW.base_trend_score, NEW.trend_score, 1.0);
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS set_base_trend_score ON public.blogs;
+CREATE TRIGGER set_base_trend_score
+    BEFORE INSERT ON public.blogs
+    FOR EACH ROW
+    EXECUTE FUNCTION public.set_base_trend_score();
+
+-- Score decay alone should not count as an edit of the blog
+DROP TRIGGER IF EXISTS set_updated_at ON public.blogs;
+CREATE TRIGGER set_updated_at
+    BEFORE UPDATE ON public.blogs
+    FOR EACH ROW
+    WHEN ((to_jsonb(OLD) - 'trend_score' - 'updated_at') IS DISTINCT FROM (to_jsonb(NEW) - 'trend_score' - 'updated_at'))
+    EXECUTE FUNCTION public.handle_updated_at();
+
+-- Recompute decayed trend scores in bulk. Articles use the same factors as
+-- calculate_trend_score (time decay, source weight, key point relevance);
+-- blogs decay from base_trend_score. Rows inside the window, and older rows
+-- whose score has not decayed below p_floor yet, are recomputed; rows whose
+-- score is unchanged are not rewritten.
+CREATE OR REPLACE FUNCTION recompute_trend_scores(
+    p_source_weights JSONB DEFAULT '{}'::jsonb,
+    p_window_hours INTEGER DEFAULT 168,
+    p_article_decay_hours FLOAT DEFAULT 24,
+    p_blog_decay_hours FLOAT DEFAULT 72,
+    p_floor FLOAT DEFAULT 0.01
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    articles_updated INTEGER;
+    blogs_updated INTEGER;
+BEGIN
+    UPDATE public.news_articles a
+    SET trend_score = s.score
+    FROM (
+        SELECT n.id,
+               round((
+                   exp(-GREATEST(EXTRACT(EPOCH FROM (now() - n.published_at)), 0) / 3600.0 / p_article_decay_hours)
+                   * COALESCE((p_source_weights ->> lower(n.source))::float, 1.0)
+                   * LEAST(1.5, 0.8 + 0.1 * CASE WHEN jsonb_typeof(n.key_points) = 'array'
+                                                  THEN jsonb_array_length(n.key_points) ELSE 0 END)
+               )::numeric, 2)::float AS score
+        FROM public.news_articles n
+        WHERE n.published_at >= now() - make_interval(hours => p_window_hours)
+           OR n.trend_score > p_floor
+    ) s
+    WHERE a.id = s.id AND a.trend_score IS DISTINCT FROM s.score;
+    GET DIAGNOSTICS articles_updated = ROW_COUNT;
+
+    UPDATE public.blogs b
+    SET trend_score = s.score
+    FROM (
+        SELECT bl.id,
+               round((
+                   COALESCE(bl.base_trend_score, 1.0)
+                   * exp(-GREATEST(EXTRACT(EPOCH FROM (now() - COALESCE(bl.published_at, bl.created_at))), 0)
+                         / 3600.0 / p_blog_decay_hours)
+               )::numeric, 2)::float AS score
+        FROM public.blogs bl
+        WHERE COALESCE(bl.published_at, bl.created_at) >= now() - make_interval(hours => p_window_hours)
+           OR bl.trend_score > p_floor
+    ) s
+    WHERE b.id = s.id AND b.trend_score IS DISTINCT FROM s.score;
+    GET DIAGNOSTICS blogs_updated = ROW_COUNT;
+
+    RETURN jsonb_build_object('articles', articles_updated, 'blogs', blogs_updated);
+END;
+$$;
+
+-- Grant permissions
+GRANT EXECUTE ON FUNCTION recompute_trend_scores TO service_role;
+
+-- Refresh the schema cache
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,39 @@
+-- Status of post-save background work (image lookup, embeddings) for each blog
+CREATE TABLE IF NOT EXISTS public.blog_tasks (
+    id UUID PRIMARY KEY,
+    blog_id UUID NOT NULL REFERENCES public.blogs(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',  -- pending, running, retrying, succeeded, failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT TIMEZONE('utc'::text, NOW()),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT TIMEZONE('utc'::text, NOW())
+);
+
+CREATE INDEX IF NOT EXISTS idx_blog_tasks_blog_id ON public.blog_tasks(blog_id);
+CREATE INDEX IF NOT EXISTS idx_blog_tasks_status ON public.blog_tasks(status);
+
+-- Enable RLS on blog_tasks
+ALTER TABLE public.blog_tasks ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Public read access for blog_tasks" ON public.blog_tasks
+    FOR SELECT USING (true);
+
+CREATE POLICY "Enable insert for service role" ON public.blog_tasks
+    FOR INSERT WITH CHECK (true);
+
+CREATE POLICY "Enable update for service role" ON public.blog_tasks
+    FOR UPDATE USING (true);
+
+CREATE TRIGGER set_updated_at
+    BEFORE UPDATE ON public.blog_tasks
+    FOR EACH ROW
+    EXECUTE FUNCTION public.handle_updated_at();
+
+-- Grant permissions
+GRANT ALL ON public.blog_tasks TO service_role;
+GRANT ALL ON public.blog_tasks TO anon;
+GRANT ALL ON public.blog_tasks TO authenticated;
+
+-- Refresh the schema cache
+NOTIFY pgrst, 'reload schema';
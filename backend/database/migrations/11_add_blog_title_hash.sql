@@ -0,0 +1,86 @@
+-- Normalized title used to detect duplicate blogs (case and whitespace insensitive)
+CREATE OR REPLACE FUNCTION public.blog_title_hash(p_title TEXT)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT md5(lower(regexp_replace(btrim(p_title), '\s+', ' ', 'g')));
+$$;
+
+ALTER TABLE public.blogs
+ADD COLUMN IF NOT EXISTS title_hash TEXT GENERATED ALWAYS AS (public.blog_title_hash(title)) STORED;
+
+-- Duplicates written before the unique index existed block the index. They
+-- are listed and the migration stops, so published posts are reviewed (and
+-- merged or deleted by hand) rather than removed silently. To delete the
+-- newer copies instead, keeping the oldest, run the migration after
+--   SET trendsage.delete_duplicate_blogs = 'on';
+-- Embeddings and tasks of deleted rows go with them (ON DELETE CASCADE).
+DO $$
+DECLARE
+    duplicates TEXT;
+BEGIN
+    SELECT string_agg(format('%s (%s, created %s)', b.title, b.id, b.created_at), E'\n' ORDER BY b.title_hash, b.created_at)
+    INTO duplicates
+    FROM public.blogs b
+    WHERE EXISTS (
+        SELECT 1 FROM public.blogs keep
+        WHERE keep.title_hash = b.title_hash
+          AND (keep.created_at, keep.id) < (b.created_at, b.id)
+    );
+
+    IF duplicates IS NULL THEN
+        RETURN;
+    END IF;
+    IF COALESCE(current_setting('trendsage.delete_duplicate_blogs', true), '') <> 'on' THEN
+        RAISE EXCEPTION 'Blogs with duplicate titles must be merged before adding idx_blogs_title_hash. Newer copies:%',
+            E'\n' || duplicates
+            USING HINT = 'Merge or delete them, or SET trendsage.delete_duplicate_blogs = ''on'' to keep only the oldest copy.';
+    END IF;
+
+    RAISE NOTICE 'Deleting newer copies of duplicate blogs:%', E'\n' || duplicates;
+    DELETE FROM public.blogs b
+    USING public.blogs keep
+    WHERE b.title_hash = keep.title_hash
+      AND (keep.created_at, keep.id) < (b.created_at, b.id);
+END;
+$$;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_blogs_title_hash ON public.blogs(title_hash);
+
+-- Insert a blog unless one with the same normalized title exists, in one
+-- statement. Returns the stored row and whether this call created it.
+CREATE OR REPLACE FUNCTION insert_blog(p_blog JSONB)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    saved public.blogs;
+BEGIN
+    INSERT INTO public.blogs (title, content, category, image_url, trend_score, created_at)
+    SELECT r.title, r.content, COALESCE(r.category, 'Miscellaneous'), r.image_url,
+           COALESCE(r.trend_score, 1.0), COALESCE(r.created_at, TIMEZONE('utc'::text, NOW()))
+    FROM jsonb_populate_record(NULL::public.blogs, p_blog) r
+    ON CONFLICT (title_hash) DO NOTHING
+    RETURNING * INTO saved;
+
+    IF FOUND THEN
+        RETURN jsonb_build_object('blog', to_jsonb(saved), 'created', true);
+    END IF;
+
+    SELECT * INTO saved FROM public.blogs
+    WHERE title_hash = public.blog_title_hash(p_blog ->> 'title');
+    RETURN jsonb_build_object('blog', to_jsonb(saved), 'created', false);
+END;
+$$;
+
+-- Grant permissions
+GRANT EXECUTE ON FUNCTION public.blog_title_hash TO service_role;
+GRANT EXECUTE ON FUNCTION public.blog_title_hash TO anon;
+GRANT EXECUTE ON FUNCTION public.blog_title_hash TO authenticated;
+GRANT EXECUTE ON FUNCTION insert_blog TO service_role;
+GRANT EXECUTE ON FUNCTION insert_blog TO anon;
+GRANT EXECUTE ON FUNCTION insert_blog TO authenticated;
+
+-- Refresh the schema cache
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,48 @@
+-- Idempotency key of the workflow run that wrote a blog; each run commits at most one
+ALTER TABLE public.blogs
+ADD COLUMN IF NOT EXISTS workflow_run_id TEXT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_blogs_workflow_run_id
+    ON public.blogs(workflow_run_id) WHERE workflow_run_id IS NOT NULL;
+
+-- Same as before, but a conflict on either the normalized title or the
+-- workflow run returns the existing row. A run that already committed a blog
+-- gets that blog back even when the title differs.
+CREATE OR REPLACE FUNCTION insert_blog(p_blog JSONB)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    saved public.blogs;
+BEGIN
+    INSERT INTO public.blogs (title, content, category, image_url, trend_score, workflow_run_id, created_at)
+    SELECT r.title, r.content, COALESCE(r.category, 'Miscellaneous'), r.image_url,
+           COALESCE(r.trend_score, 1.0), r.workflow_run_id,
+           COALESCE(r.created_at, TIMEZONE('utc'::text, NOW()))
+    FROM jsonb_populate_record(NULL::public.blogs, p_blog) r
+    ON CONFLICT DO NOTHING
+    RETURNING * INTO saved;
+
+    IF FOUND THEN
+        RETURN jsonb_build_object('blog', to_jsonb(saved), 'created', true);
+    END IF;
+
+    IF p_blog ->> 'workflow_run_id' IS NOT NULL THEN
+        SELECT * INTO saved FROM public.blogs
+        WHERE workflow_run_id = p_blog ->> 'workflow_run_id';
+    END IF;
+    IF saved.id IS NULL THEN
+        SELECT * INTO saved FROM public.blogs
+        WHERE title_hash = public.blog_title_hash(p_blog ->> 'title');
+    END IF;
+    RETURN jsonb_build_object('blog', to_jsonb(saved), 'created', false);
+END;
+$$;
+
+-- Grant permissions
+GRANT EXECUTE ON FUNCTION insert_blog TO service_role;
+GRANT EXECUTE ON FUNCTION insert_blog TO anon;
+GRANT EXECUTE ON FUNCTION insert_blog TO authenticated;
+
+-- Refresh the schema cache
+NOTIFY pgrst, 'reload schema';
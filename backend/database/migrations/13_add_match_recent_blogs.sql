@@ -0,0 +1,46 @@
+-- Blogs created since p_since whose embeddings are closest to query_embedding
+-- (cosine similarity, best embedding per blog). Used to skip generating a blog
+-- on a topic that was just covered.
+CREATE OR REPLACE FUNCTION match_recent_blogs(
+    query_embedding vector(1536),
+    p_since TIMESTAMP WITH TIME ZONE,
+    match_threshold FLOAT,
+    match_count INT,
+    p_category TEXT DEFAULT NULL
+)
+RETURNS TABLE (
+    blog_id UUID,
+    title TEXT,
+    category TEXT,
+    created_at TIMESTAMP WITH TIME ZONE,
+    similarity FLOAT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT m.blog_id, m.title, m.category, m.created_at, m.similarity
+    FROM (
+        SELECT DISTINCT ON (b.id)
+            b.id AS blog_id,
+            b.title,
+            b.category,
+            b.created_at,
+            1 - (be.embedding <=> query_embedding) AS similarity
+        FROM public.blogs b
+        JOIN public.blog_embeddings be ON be.blog_id = b.id
+        WHERE b.created_at >= p_since
+          AND (p_category IS NULL OR lower(b.category) = lower(p_category))
+        ORDER BY b.id, be.embedding <=> query_embedding
+    ) m
+    WHERE m.similarity > match_threshold
+    ORDER BY m.similarity DESC
+    LIMIT match_count;
+$$;
+
+-- Grant permissions
+GRANT EXECUTE ON FUNCTION match_recent_blogs TO service_role;
+GRANT EXECUTE ON FUNCTION match_recent_blogs TO anon;
+GRANT EXECUTE ON FUNCTION match_recent_blogs TO authenticated;
+
+-- Refresh the schema cache
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,59 @@
+-- Display fields derived from the markdown content when a blog is saved,
+-- so list views can skip the content and detail views the markdown parsing
+ALTER TABLE public.blogs
+ADD COLUMN IF NOT EXISTS content_html TEXT,
+ADD COLUMN IF NOT EXISTS excerpt TEXT,
+ADD COLUMN IF NOT EXISTS word_count INTEGER,
+ADD COLUMN IF NOT EXISTS reading_time_minutes INTEGER;
+
+-- Filling in derived fields (backfill, score decay) does not count as an edit
+DROP TRIGGER IF EXISTS set_updated_at ON public.blogs;
+CREATE TRIGGER set_updated_at
+    BEFORE UPDATE ON public.blogs
+    FOR EACH ROW
+    WHEN ((to_jsonb(OLD) - 'trend_score' - 'updated_at' - 'content_html' - 'excerpt' - 'word_count' - 'reading_time_minutes')
+          IS DISTINCT FROM
+          (to_jsonb(NEW) - 'trend_score' - 'updated_at' - 'content_html' - 'excerpt' - 'word_count' - 'reading_time_minutes'))
+    EXECUTE FUNCTION public.handle_updated_at();
+
+-- Same as before, also storing the display fields
+CREATE OR REPLACE FUNCTION insert_blog(p_blog JSONB)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    saved public.blogs;
+BEGIN
+    INSERT INTO public.blogs (title, content, category, image_url, trend_score, workflow_run_id,
+                              content_html, excerpt, word_count, reading_time_minutes, created_at)
+    SELECT r.title, r.content, COALESCE(r.category, 'Miscellaneous'), r.image_url,
+           COALESCE(r.trend_score, 1.0), r.workflow_run_id,
+           r.content_html, r.excerpt, r.word_count, r.reading_time_minutes,
+           COALESCE(r.created_at, TIMEZONE('utc'::text, NOW()))
+    FROM jsonb_populate_record(NULL::public.blogs, p_blog) r
+    ON CONFLICT DO NOTHING
+    RETURNING * INTO saved;
+
+    IF FOUND THEN
+        RETURN jsonb_build_object('blog', to_jsonb(saved), 'created', true);
+    END IF;
+
+    IF p_blog ->> 'workflow_run_id' IS NOT NULL THEN
+        SELECT * INTO saved FROM public.blogs
+        WHERE workflow_run_id = p_blog ->> 'workflow_run_id';
+    END IF;
+    IF saved.id IS NULL THEN
+        SELECT * INTO saved FROM public.blogs
+        WHERE title_hash = public.blog_title_hash(p_blog ->> 'title');
+    END IF;
+    RETURN jsonb_build_object('blog', to_jsonb(saved), 'created', false);
+END;
+$$;
+
+-- Grant permissions
+GRANT EXECUTE ON FUNCTION insert_blog TO service_role;
+GRANT EXECUTE ON FUNCTION insert_blog TO anon;
+GRANT EXECUTE ON FUNCTION insert_blog TO authenticated;
+
+-- Refresh the schema cache
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,72 @@
+-- Blogs are embedded as heading-bounded chunks, one row per chunk
+ALTER TABLE public.blog_embeddings
+ADD COLUMN IF NOT EXISTS chunk_index INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN IF NOT EXISTS heading TEXT,
+ADD COLUMN IF NOT EXISTS start_offset INTEGER,  -- character offsets of the chunk in blogs.content
+ADD COLUMN IF NOT EXISTS end_offset INTEGER,
+ADD COLUMN IF NOT EXISTS token_count INTEGER;
+
+-- Earlier whole-post rows become chunk 0; keep only the newest when a blog has several
+DELETE FROM public.blog_embeddings e
+USING public.blog_embeddings newer
+WHERE e.blog_id = newer.blog_id
+  AND e.chunk_index = newer.chunk_index
+  AND (e.created_at, e.id) < (newer.created_at, newer.id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_blog_embeddings_blog_chunk
+    ON public.blog_embeddings(blog_id, chunk_index);
+
+-- Searches rank by cosine distance (<=>), which the L2 index cannot serve
+DROP INDEX IF EXISTS public.blog_embeddings_embedding_idx;
+CREATE INDEX IF NOT EXISTS blog_embeddings_embedding_idx
+    ON public.blog_embeddings USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
+
+-- Similarity search now returns the matching section of each post
+DROP FUNCTION IF EXISTS match_blog_embeddings(vector, float, int);
+CREATE OR REPLACE FUNCTION match_blog_embeddings(
+    query_embedding vector(1536),
+    match_threshold float,
+    match_count int
+)
+RETURNS TABLE (
+    id UUID,
+    blog_id UUID,
+    content TEXT,
+    title TEXT,
+    chunk_index INTEGER,
+    heading TEXT,
+    start_offset INTEGER,
+    end_offset INTEGER,
+    similarity float
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        be.id,
+        be.blog_id,
+        be.content,
+        be.title,
+        be.chunk_index,
+        be.heading,
+        be.start_offset,
+        be.end_offset,
+        1 - (be.embedding <=> query_embedding) as similarity
+    FROM
+        public.blog_embeddings be
+    WHERE
+        1 - (be.embedding <=> query_embedding) > match_threshold
+    ORDER BY
+        be.embedding <=> query_embedding
+    LIMIT match_count;
+END;
+$$;
+
+-- Grant permissions
+GRANT EXECUTE ON FUNCTION match_blog_embeddings TO service_role;
+GRANT EXECUTE ON FUNCTION match_blog_embeddings TO anon;
+GRANT EXECUTE ON FUNCTION match_blog_embeddings TO authenticated;
+
+-- Refresh the schema cache
+NOTIFY pgrst, 'reload schema';
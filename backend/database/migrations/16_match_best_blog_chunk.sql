@@ -0,0 +1,49 @@
+-- Similarity search returns the best-matching chunk of each blog, so several
+-- sections of one post cannot take up all of match_count
+CREATE OR REPLACE FUNCTION match_blog_embeddings(
+    query_embedding vector(1536),
+    match_threshold float,
+    match_count int
+)
+RETURNS TABLE (
+    id UUID,
+    blog_id UUID,
+    content TEXT,
+    title TEXT,
+    chunk_index INTEGER,
+    heading TEXT,
+    start_offset INTEGER,
+    end_offset INTEGER,
+    similarity float
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT m.id, m.blog_id, m.content, m.title, m.chunk_index, m.heading,
+           m.start_offset, m.end_offset, m.similarity
+    FROM (
+        SELECT DISTINCT ON (be.blog_id)
+            be.id,
+            be.blog_id,
+            be.content,
+            be.title,
+            be.chunk_index,
+            be.heading,
+            be.start_offset,
+            be.end_offset,
+            1 - (be.embedding <=> query_embedding) AS similarity
+        FROM public.blog_embeddings be
+        WHERE 1 - (be.embedding <=> query_embedding) > match_threshold
+        ORDER BY be.blog_id, be.embedding <=> query_embedding
+    ) m
+    ORDER BY m.similarity DESC
+    LIMIT match_count;
+$$;
+
+-- Grant permissions
+GRANT EXECUTE ON FUNCTION match_blog_embeddings TO service_role;
+GRANT EXECUTE ON FUNCTION match_blog_embeddings TO anon;
+GRANT EXECUTE ON FUNCTION match_blog_embeddings TO authenticated;
+
+-- Refresh the schema cache
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,8 @@
+-- Re-embedding a post deletes chunks left over from a longer earlier version;
+-- without a DELETE policy RLS silently filters those rows out of the delete
+DROP POLICY IF EXISTS "Enable delete for service role" ON public.blog_embeddings;
+CREATE POLICY "Enable delete for service role" ON public.blog_embeddings
+    FOR DELETE USING (true);
+
+-- Refresh the schema cache
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,48 @@
+-- Rollups are cleared before a rebuild and pruned past the retained window;
+-- without DELETE policies RLS silently filters those rows out of the delete
+DROP POLICY IF EXISTS "Enable delete for service role" ON public.trend_term_rollups;
+CREATE POLICY "Enable delete for service role" ON public.trend_term_rollups
+    FOR DELETE USING (true);
+
+DROP POLICY IF EXISTS "Enable delete for service role" ON public.trend_bucket_totals;
+CREATE POLICY "Enable delete for service role" ON public.trend_bucket_totals
+    FOR DELETE USING (true);
+
+-- Delete rollup buckets after p_after and/or up to and including p_until,
+-- returning the rows removed from each table. One of the bounds is required.
+CREATE OR REPLACE FUNCTION delete_trend_rollups(
+    p_after TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_until TIMESTAMP WITH TIME ZONE DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    terms_deleted INTEGER;
+    totals_deleted INTEGER;
+BEGIN
+    IF p_after IS NULL AND p_until IS NULL THEN
+        RAISE EXCEPTION 'delete_trend_rollups needs p_after or p_until';
+    END IF;
+
+    DELETE FROM public.trend_term_rollups
+    WHERE (p_after IS NULL OR bucket > p_after)
+      AND (p_until IS NULL OR bucket <= p_until);
+    GET DIAGNOSTICS terms_deleted = ROW_COUNT;
+
+    DELETE FROM public.trend_bucket_totals
+    WHERE (p_after IS NULL OR bucket > p_after)
+      AND (p_until IS NULL OR bucket <= p_until);
+    GET DIAGNOSTICS totals_deleted = ROW_COUNT;
+
+    RETURN jsonb_build_object('terms', terms_deleted, 'totals', totals_deleted);
+END;
+$$;
+
+-- Grant permissions
+GRANT EXECUTE ON FUNCTION delete_trend_rollups TO service_role;
+GRANT EXECUTE ON FUNCTION delete_trend_rollups TO anon;
+GRANT EXECUTE ON FUNCTION delete_trend_rollups TO authenticated;
+
+-- Refresh the schema cache
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,105 @@
+-- Story-cluster factor an article was scored with at analysis time; the
+-- bulk decay multiplies it back in, as blogs decay from base_trend_score
+ALTER TABLE public.news_articles
+ADD COLUMN IF NOT EXISTS cluster_factor FLOAT NOT NULL DEFAULT 1.0;
+
+-- Last run of shared maintenance jobs, so API workers on their own timers
+-- do not repeat a job another worker just ran
+CREATE TABLE IF NOT EXISTS public.trend_maintenance_runs (
+    name TEXT PRIMARY KEY,
+    last_run_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+-- Enable RLS on trend_maintenance_runs
+ALTER TABLE public.trend_maintenance_runs ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Public read access for trend_maintenance_runs" ON public.trend_maintenance_runs
+    FOR SELECT USING (true);
+
+CREATE POLICY "Enable insert for service role" ON public.trend_maintenance_runs
+    FOR INSERT WITH CHECK (true);
+
+CREATE POLICY "Enable update for service role" ON public.trend_maintenance_runs
+    FOR UPDATE USING (true);
+
+-- Same decay as before, now including the cluster factor. Runs at most once
+-- per p_min_interval_seconds across every caller; a call made while another
+-- is running, or too soon after the last run, returns {"skipped": true}.
+DROP FUNCTION IF EXISTS recompute_trend_scores(JSONB, INTEGER, FLOAT, FLOAT, FLOAT);
+CREATE OR REPLACE FUNCTION recompute_trend_scores(
+    p_source_weights JSONB DEFAULT '{}'::jsonb,
+    p_window_hours INTEGER DEFAULT 168,
+    p_article_decay_hours FLOAT DEFAULT 24,
+    p_blog_decay_hours FLOAT DEFAULT 72,
+    p_floor FLOAT DEFAULT 0.01,
+    p_min_interval_seconds FLOAT DEFAULT 0
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    articles_updated INTEGER;
+    blogs_updated INTEGER;
+BEGIN
+    IF NOT pg_try_advisory_xact_lock(hashtext('recompute_trend_scores')) THEN
+        RETURN jsonb_build_object('skipped', true);
+    END IF;
+    IF EXISTS (
+        SELECT 1 FROM public.trend_maintenance_runs
+        WHERE name = 'recompute_trend_scores'
+          AND last_run_at > now() - make_interval(secs => p_min_interval_seconds)
+    ) THEN
+        RETURN jsonb_build_object('skipped', true);
+    END IF;
+    INSERT INTO public.trend_maintenance_runs (name, last_run_at)
+    VALUES ('recompute_trend_scores', now())
+    ON CONFLICT (name) DO UPDATE SET last_run_at = EXCLUDED.last_run_at;
+
+    UPDATE public.news_articles a
+    SET trend_score = s.score
+    FROM (
+        SELECT n.id,
+               round((
+                   exp(-GREATEST(EXTRACT(EPOCH FROM (now() - n.published_at)), 0) / 3600.0 / p_article_decay_hours)
+                   * COALESCE((p_source_weights ->> lower(n.source))::float, 1.0)
+                   * LEAST(1.5, 0.8 + 0.1 * CASE WHEN jsonb_typeof(n.key_points) = 'array'
+                                                  THEN jsonb_array_length(n.key_points) ELSE 0 END)
+                   * COALESCE(n.cluster_factor, 1.0)
+               )::numeric, 2)::float AS score
+        FROM public.news_articles n
+        WHERE n.published_at >= now() - make_interval(hours => p_window_hours)
+           OR n.trend_score > p_floor
+    ) s
+    WHERE a.id = s.id AND a.trend_score IS DISTINCT FROM s.score;
+    GET DIAGNOSTICS articles_updated = ROW_COUNT;
+
+    UPDATE public.blogs b
+    SET trend_score = s.score
+    FROM (
+        SELECT bl.id,
+               round((
+                   COALESCE(bl.base_trend_score, 1.0)
+                   * exp(-GREATEST(EXTRACT(EPOCH FROM (now() - COALESCE(bl.published_at, bl.created_at))), 0)
+                         / 3600.0 / p_blog_decay_hours)
+               )::numeric, 2)::float AS score
+        FROM public.blogs bl
+        WHERE COALESCE(bl.published_at, bl.created_at) >= now() - make_interval(hours => p_window_hours)
+           OR bl.trend_score > p_floor
+    ) s
+    WHERE b.id = s.id AND b.trend_score IS DISTINCT FROM s.score;
+    GET DIAGNOSTICS blogs_updated = ROW_COUNT;
+
+    RETURN jsonb_build_object('articles', articles_updated, 'blogs', blogs_updated);
+END;
+$$;
+
+-- Grant permissions; the API calls this with the anon key
+GRANT ALL ON public.trend_maintenance_runs TO service_role;
+GRANT ALL ON public.trend_maintenance_runs TO anon;
+GRANT ALL ON public.trend_maintenance_runs TO authenticated;
+GRANT EXECUTE ON FUNCTION recompute_trend_scores TO service_role;
+GRANT EXECUTE ON FUNCTION recompute_trend_scores TO anon;
+GRANT EXECUTE ON FUNCTION recompute_trend_scores TO authenticated;
+
+-- Refresh the schema cache
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,9 @@
+-- commit_blog calls insert_blog with the anon key; databases that ran 11-14
+-- before these grants were added only allowed service_role
+GRANT EXECUTE ON FUNCTION public.blog_title_hash TO anon;
+GRANT EXECUTE ON FUNCTION public.blog_title_hash TO authenticated;
+GRANT EXECUTE ON FUNCTION insert_blog TO anon;
+GRANT EXECUTE ON FUNCTION insert_blog TO authenticated;
+
+-- Refresh the schema cache
+NOTIFY pgrst, 'reload schema';
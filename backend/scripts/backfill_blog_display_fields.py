@@ -0,0 +1,56 @@
+import os
+import sys
+import argparse
+import traceback
+from dotenv import load_dotenv
+
+# Add parent directory to path to import from tools
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.logging_config import setup_logging
+from tools.supabase_client import supabase
+from tools.blog_rendering import blog_display_fields
+
+# Initialize logger
+logger = setup_logging()
+
+# Load environment variables
+load_dotenv()
+
+def backfill_display_fields(page_size: int, recompute: bool) -> int:
+    """Fill content_html, excerpt, word_count and reading_time_minutes for existing blogs"""
+    updated = 0
+    offset = 0
+    while True:
+        query = supabase.table('blogs').select('id,content')
+        if not recompute:
+            query = query.is_('excerpt', 'null')
+        page = query.order('created_at').range(offset, offset + page_size - 1).execute().data or []
+        if not page:
+            break
+        failed = 0
+        for blog in page:
+            try:
+                supabase.table('blogs').update(blog_display_fields(blog.get('content'))).eq('id', blog['id']).execute()
+                updated += 1
+            except Exception as e:
+                failed += 1
+                logger.error(f"Error updating blog {blog['id']}: {str(e)}")
+        logger.info(f"Updated {updated} blogs")
+        if len(page) < page_size:
+            break
+        # Filled rows drop out of the filtered query; only skip past the ones that failed
+        offset += page_size if recompute else failed
+    return updated
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill rendered HTML, excerpts and reading times for blogs")
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--recompute', action='store_true', help="Also recompute blogs that already have the fields")
+    args = parser.parse_args()
+    try:
+        total = backfill_display_fields(args.page_size, args.recompute)
+        logger.info(f"Backfilled display fields for {total} blogs")
+    except Exception as e:
+        logger.error(f"Error backfilling blog display fields: {str(e)}")
+        logger.error(traceback.format_exc())
+        sys.exit(1)
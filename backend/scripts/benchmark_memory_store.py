@@ -0,0 +1,93 @@
+import os
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+from datetime import datetime
+
+# Add parent directory to path to import from tools
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.memory_backends import COMPRESS_THRESHOLD, ArticleRecord, InMemoryBackend
+
+WORDS = (
+    "market growth chip demand model launch policy investors revenue quarter team season "
+    "analysts regulators startup platform users data cloud security league players election "
+    "research hospital treatment energy battery supply chain prices forecast report"
+).split()
+
+def make_article(rng: random.Random, content_length: int):
+    """Build a synthetic article with a random body, summary and key points"""
+    words = []
+    length = 0
+    while length < content_length:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    content = " ".join(words)
+    summary = content[:200]
+    key_points = [f"- {' '.join(rng.choices(WORDS, k=8))}" for _ in range(5)]
+    metadata = {'title': ' '.join(rng.choices(WORDS, k=6)), 'description': content[:120], 'category': 'technology'}
+    return content, summary, key_points, metadata
+
+def load_legacy(articles):
+    """Original layout: three parallel dicts with nested metadata and datetime objects"""
+    store = {'articles': {}, 'summaries': {}, 'key_points': {}}
+    for url, content, summary, key_points, metadata in articles:
+        store['articles'][url] = {'content': content, 'metadata': metadata, 'added_at': datetime.now()}
+        store['summaries'][url] = summary
+        store['key_points'][url] = key_points
+    return store
+
+def load_records(articles, compress_threshold):
+    backend = InMemoryBackend(max_entries=sys.maxsize, max_bytes=sys.maxsize)
+    for url, content, summary, key_points, metadata in articles:
+        backend.set(url, ArticleRecord(content, summary, key_points, metadata, compress_threshold=compress_threshold))
+    return backend
+
+def generate_articles(size: int, content_length: int, seed: int = 42):
+    """Yield (url, content, summary, key_points, metadata) tuples deterministically"""
+    rng = random.Random(seed)
+    for i in range(size):
+        content, summary, key_points, metadata = make_article(rng, content_length)
+        yield f"https://example.com/article/{i}", content, summary, key_points, metadata
+
+def measure(label, loader, size, content_length, *args):
+    """
+    Return (label, MiB retained, seconds) for building a store with loader.
+
+    Articles are generated inside the traced region so every layout pays
+    for the text it keeps alive; compressed layouts let the originals go.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    store = loader(generate_articles(size, content_length), *args)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del store
+    return label, current / (1024 * 1024), elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare MemoryStore layouts by retained memory")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--content-length', type=int, default=2000,
+                        help="Characters per scraped article body")
+    parser.add_argument('--compress-threshold', type=int, default=COMPRESS_THRESHOLD,
+                        help="Compress fields longer than this; defaults to MEMORY_STORE_COMPRESS_THRESHOLD")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        results = [
+            measure("legacy dicts", load_legacy, size, args.content_length),
+            measure("records", load_records, size, args.content_length, 0),
+            measure(f"records+zlib>{args.compress_threshold}", load_records, size, args.content_length,
+                    args.compress_threshold),
+        ]
+
+        print(f"\n{size:,} articles, {args.content_length} chars each")
+        for label, mib, seconds in results:
+            print(f"  {label:<22} {mib:9.1f} MiB retained  {seconds:7.3f}s to load")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import multiprocessing
+
+# Add parent directory to path to import from tools
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.memory_backends import ArticleRecord, InMemoryBackend, SQLiteBackend
+
+def make_record(i: int) -> ArticleRecord:
+    body = f"Article {i} body. " * 100
+    return ArticleRecord(
+        content=body,
+        summary=f"Summary of article {i}",
+        key_points=[f"Point {n} of article {i}" for n in range(5)],
+        metadata={'title': f"Article {i}", 'category': 'technology'}
+    )
+
+def populate(path: str, count: int):
+    backend = SQLiteBackend(path)
+    for i in range(count):
+        backend.set(f"https://example.com/{i}", make_record(i))
+
+def warm_start(path: str, count: int, queue):
+    """Runs in a fresh process, like a restarted or additional uvicorn worker"""
+    start = time.perf_counter()
+    backend = SQLiteBackend(path)
+    opened = time.perf_counter() - start
+
+    start = time.perf_counter()
+    hits = sum(1 for i in range(count) if backend.get(f"https://example.com/{i}") is not None)
+    lookups = time.perf_counter() - start
+    queue.put((opened, lookups, hits))
+
+def cold_start(count: int, queue):
+    backend = InMemoryBackend()
+    hits = sum(1 for i in range(count) if backend.get(f"https://example.com/{i}") is not None)
+    queue.put(hits)
+
+def concurrent_worker(path: str, worker: int, operations: int, queue):
+    backend = SQLiteBackend(path)
+    rng = random.Random(worker)
+    errors = 0
+    start = time.perf_counter()
+    for n in range(operations):
+        try:
+            if n % 4 == 0:
+                backend.set(f"https://example.com/w{worker}/{n}", make_record(n))
+            else:
+                backend.get(f"https://example.com/{rng.randrange(1000)}")
+        except Exception:
+            errors += 1
+    queue.put((time.perf_counter() - start, errors))
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure MemoryStore warm start and multi-process access")
+    parser.add_argument('--articles', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--operations', type=int, default=2000)
+    parser.add_argument('--llm-seconds-per-article', type=float, default=1.5,
+                        help="Estimated enrichment latency that a cold start has to pay again")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="memory_store_bench_"), "memory_store.sqlite3")
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+
+    start = time.perf_counter()
+    populate(path, args.articles)
+    print(f"Populated {args.articles:,} articles in {time.perf_counter() - start:.2f}s ({path})")
+
+    process = ctx.Process(target=cold_start, args=(args.articles, queue))
+    process.start()
+    cold_hits = queue.get()
+    process.join()
+    misses = args.articles - cold_hits
+    print(f"\nIn-memory backend after restart: {cold_hits:,} hits, {misses:,} misses")
+    print(f"  re-enrichment cost ~{misses * args.llm_seconds_per_article / 60:.1f} LLM-minutes")
+
+    process = ctx.Process(target=warm_start, args=(path, args.articles, queue))
+    process.start()
+    opened, lookups, hits = queue.get()
+    process.join()
+    print(f"\nSQLite backend after restart: {hits:,} hits in a new process")
+    print(f"  open {opened * 1000:.1f}ms, lookups {lookups:.2f}s total, "
+          f"{lookups / max(args.articles, 1) * 1e6:.0f}us per article")
+
+    start = time.perf_counter()
+    processes = [
+        ctx.Process(target=concurrent_worker, args=(path, worker, args.operations, queue))
+        for worker in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    results = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+    total_ops = args.workers * args.operations
+    errors = sum(error for _, error in results)
+    print(f"\n{args.workers} processes, {total_ops:,} mixed operations (25% writes): "
+          f"{total_ops / elapsed:,.0f} ops/s, {errors} errors")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+# Add parent directory to path to import from tools
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.memory_backends import ArticleRecord, InMemoryBackend, SQLiteBackend
+from tools.memory_store import MemoryStore
+from tools.trend_scoring import calculate_trend_score, calculate_trend_scores
+
+SOURCES = ['Reuters', 'BBC', 'The Verge', 'Wired', 'Some Blog', 'Local News', None]
+
+def make_articles(count: int, now: datetime, seed: int = 0):
+    """Articles shaped like news_articles rows, with a mix of timestamp formats"""
+    rng = random.Random(seed)
+    articles = []
+    for i in range(count):
+        published = now - timedelta(minutes=rng.randrange(0, 7 * 24 * 60), seconds=rng.randrange(60))
+        style = i % 5
+        if style == 0:
+            published_at = published.strftime('%Y-%m-%dT%H:%M:%SZ')
+        elif style == 1:
+            published_at = published.isoformat() + '+00:00'
+        elif style == 2:
+            published_at = published
+        elif style == 3:
+            published_at = published.isoformat()
+        else:
+            published_at = 'not a date' if i % 50 == 4 else published.isoformat()
+        article = {'url': f"https://example.com/{i}", 'source': rng.choice(SOURCES), 'published_at': published_at}
+        if i % 97 == 0:
+            del article['published_at']
+        articles.append(article)
+    return articles
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare scalar and batch trend scoring")
+    parser.add_argument('--articles', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--backend', choices=['memory', 'sqlite'], default='memory')
+    args = parser.parse_args()
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    if args.backend == 'sqlite':
+        backend = SQLiteBackend(os.path.join(tempfile.mkdtemp(prefix="trend_bench_"), "memory_store.sqlite3"))
+    else:
+        backend = InMemoryBackend(max_entries=args.articles * 2)
+    store = MemoryStore(backend=backend, expiry_interval=0)
+    articles = make_articles(args.articles, now)
+    # Two thirds of the articles have been enriched with 0-7 key points
+    for i, article in enumerate(articles):
+        if i % 3:
+            store.backend.set(article['url'], ArticleRecord("body", "summary", [f"point {n}" for n in range(i % 8)]))
+
+    # Silence per-article parse errors from the scalar version while timing
+    import logging
+    logging.getLogger('mpcrew').setLevel(logging.CRITICAL)
+
+    scalar_times, batch_times = [], []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        scalar = [calculate_trend_score(article, store, now=now) for article in articles]
+        scalar_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        batch = calculate_trend_scores(articles, store, now=now)
+        batch_times.append(time.perf_counter() - start)
+
+    mismatches = sum(1 for a, b in zip(scalar, batch) if a != b)
+    print(f"{args.articles:,} articles, {args.backend} backend, best of {args.repeat}")
+    print(f"  scalar: {min(scalar_times) * 1000:8.1f} ms")
+    print(f"  batch:  {min(batch_times) * 1000:8.1f} ms  ({min(scalar_times) / min(batch_times):.1f}x)")
+    print(f"  mismatched scores: {mismatches}")
+
+if __name__ == "__main__":
+    main()
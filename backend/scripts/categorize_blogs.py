@@ -3,21 +3,21 @@ import sys
 import json
 import traceback
 from dotenv import load_dotenv
-import openai
 from supabase import create_client, Client
 
 # Add parent directory to path to import from config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config.logging_config import setup_logging
 from tools.supabase_client import supabase
+from tools.llm_cache import get_llm_cache
+from tools.llm_gateway import get_llm_gateway
+from config.llm_config import get_task_profile
 
 # Initialize logger
 logger = setup_logging()
 
 # Load environment variables
 load_dotenv()
-openai.api_key = os.getenv('OPENAI_API_KEY')
-openai_model = os.getenv('OPENAI_MODEL_NAME', 'gpt-4o')
 
 # Categories
 CATEGORIES = ["Tech", "Business", "Health", "Science", "Sports", "Entertainment", "Politics", "Miscellaneous"]
@@ -40,17 +40,20 @@ def classify_blog_category(title, content):
         Return ONLY the category name, nothing else.
         """
         
-        response = openai.chat.completions.create(
-            model=openai_model,
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that classifies blog posts into categories."},
+        system_prompt = "You are a helpful assistant that classifies blog posts into categories."
+        
+        def classify():
+            return get_llm_gateway().chat_for_task('blog_categorization', [
+                {"role": "system", "content": system_prompt},
                 {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=20
-        )
+            ])
         
-        category = response.choices[0].message.content.strip()
+        # Re-running the script re-sends identical prompts, so serve them from the cache
+        profile = get_task_profile('blog_categorization')
+        category = get_llm_cache().get_or_compute(
+            'blog_categorization', profile['model'], profile['temperature'], f"{system_prompt}\n\n{prompt}", classify,
+            max_tokens=profile.get('max_tokens')
+        ).strip()
         
         # Ensure the category is valid
         if category not in CATEGORIES:
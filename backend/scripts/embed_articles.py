@@ -0,0 +1,46 @@
+import os
+import sys
+import argparse
+import traceback
+from dotenv import load_dotenv
+
+# Add parent directory to path to import from tools
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.logging_config import setup_logging
+from tools.supabase_client import supabase
+from tools.article_embeddings import embed_articles
+
+# Initialize logger
+logger = setup_logging()
+
+# Load environment variables
+load_dotenv()
+
+def embed_recent_articles(limit: int, page_size: int):
+    """Embed the newest news_articles that do not have a stored embedding yet"""
+    done = 0
+    while done < limit:
+        page = supabase.table('news_articles')\
+            .select('id,title,description,content')\
+            .order('created_at', desc=True)\
+            .range(done, min(done + page_size, limit) - 1)\
+            .execute().data or []
+        if not page:
+            break
+        embed_articles(page)
+        done += len(page)
+        logger.info(f"Processed {done} articles")
+        if len(page) < page_size:
+            break
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill article_embeddings for news_articles")
+    parser.add_argument('--limit', type=int, default=1000, help="Newest articles to cover")
+    parser.add_argument('--page-size', type=int, default=500)
+    args = parser.parse_args()
+    try:
+        embed_recent_articles(args.limit, args.page_size)
+    except Exception as e:
+        logger.error(f"Error embedding articles: {str(e)}")
+        logger.error(traceback.format_exc())
+        sys.exit(1)
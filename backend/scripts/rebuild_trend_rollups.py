@@ -0,0 +1,63 @@
+import os
+import sys
+import argparse
+import traceback
+from dotenv import load_dotenv
+
+# Add parent directory to path to import from tools
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.logging_config import setup_logging
+from tools.supabase_client import supabase
+from tools.trend_engine import TrendEngine, bucket_timestamp, current_hour
+
+# Initialize logger
+logger = setup_logging()
+
+# Load environment variables
+load_dotenv()
+
+PAGE_SIZE = 1000
+
+def rebuild_trend_rollups(window_hours: int, baseline_hours: int):
+    """Recompute the hourly trend rollups from news_articles for the retained window"""
+    engine = TrendEngine(window_hours=window_hours, baseline_hours=baseline_hours)
+    since = bucket_timestamp(current_hour() - window_hours - baseline_hours)
+
+    # Rollups are persisted by increment, so clear the window before recounting it
+    deleted = supabase.rpc('delete_trend_rollups', {'p_after': since}).execute().data or {}
+    logger.info(f"Cleared {deleted.get('terms', 0)} term rows and {deleted.get('totals', 0)} bucket totals")
+    remaining = supabase.table('trend_bucket_totals').select('bucket').gt('bucket', since).limit(1).execute().data
+    if remaining:
+        # Recounting on top of rows that were not deleted would double them
+        raise RuntimeError("Trend rollups were not cleared; apply migration 18 (delete_trend_rollups)")
+    # Buckets older than the window are never read again
+    pruned = engine.prune_persisted()
+    logger.info(f"Pruned {pruned.get('terms', 0)} term rows older than the retained window")
+
+    total, start = 0, 0
+    while True:
+        page = supabase.table('news_articles')\
+            .select('title,description,content,category,published_at')\
+            .gt('published_at', since)\
+            .order('published_at')\
+            .range(start, start + PAGE_SIZE - 1)\
+            .execute().data or []
+        total += engine.ingest(page)
+        logger.info(f"Counted {total} articles")
+        if len(page) < PAGE_SIZE:
+            break
+        start += PAGE_SIZE
+
+    logger.info(f"Rebuilt trend rollups from {total} articles", extra={'extra_data': engine.get_stats()})
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild trend_term_rollups and trend_bucket_totals from news_articles")
+    parser.add_argument('--window-hours', type=int, default=int(os.getenv('TREND_WINDOW_HOURS', '6')))
+    parser.add_argument('--baseline-hours', type=int, default=int(os.getenv('TREND_BASELINE_HOURS', '168')))
+    args = parser.parse_args()
+    try:
+        rebuild_trend_rollups(args.window_hours, args.baseline_hours)
+    except Exception as e:
+        logger.error(f"Error rebuilding trend rollups: {str(e)}")
+        logger.error(traceback.format_exc())
+        sys.exit(1)
@@ -0,0 +1,34 @@
+import os
+import sys
+import argparse
+import traceback
+from dotenv import load_dotenv
+
+# Add parent directory to path to import from tools
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.logging_config import setup_logging
+from tools.supabase_client import supabase
+from tools.trend_leaderboard import TREND_DECAY_WINDOW_HOURS, recompute_trend_scores
+
+# Initialize logger
+logger = setup_logging()
+
+# Load environment variables
+load_dotenv()
+
+if __name__ == "__main__":
+    # For running from cron when no API process (and its leaderboard worker) is up
+    parser = argparse.ArgumentParser(description="Decay stored trend scores and rebuild the trend leaderboard")
+    parser.add_argument('--window-hours', type=int, default=TREND_DECAY_WINDOW_HOURS)
+    parser.add_argument('--skip-leaderboard', action='store_true')
+    args = parser.parse_args()
+    try:
+        updated = recompute_trend_scores(args.window_hours)
+        logger.info(f"Recomputed trend scores: {updated}")
+        if not args.skip_leaderboard:
+            rows = supabase.rpc('refresh_trend_leaderboard', {}).execute().data
+            logger.info(f"Rebuilt trend leaderboard with {rows} rows")
+    except Exception as e:
+        logger.error(f"Error recomputing trend scores: {str(e)}")
+        logger.error(traceback.format_exc())
+        sys.exit(1)
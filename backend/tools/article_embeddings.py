@@ -0,0 +1,77 @@
+import os
+import json
+from typing import Any, Dict, List
+import numpy as np
+from tools.supabase_client import supabase
+from tools.llm_gateway import get_llm_gateway
+from tools.token_budget import truncate_to_tokens
+from config.llm_config import get_task_profile
+from config.logging_config import setup_logging
+
+logger = setup_logging()
+
+# Inputs per embeddings API call
+ARTICLE_EMBEDDING_BATCH_SIZE = int(os.getenv('ARTICLE_EMBEDDING_BATCH_SIZE', '100'))
+# Tokens of title, description and content embedded per article
+ARTICLE_EMBEDDING_MAX_TOKENS = int(os.getenv('ARTICLE_EMBEDDING_MAX_TOKENS', '512'))
+
+# Ids per IN (...) lookup, keeping the PostgREST query string well under URL limits
+LOOKUP_BATCH_SIZE = 200
+
+def embedding_text(article: Dict[str, Any]) -> str:
+    """Text embedded for an article"""
+    text = "\n".join(str(article.get(field) or "") for field in ('title', 'description', 'content'))
+    return truncate_to_tokens(text.strip(), ARTICLE_EMBEDDING_MAX_TOKENS)
+
+def _parse_vector(value: Any) -> np.ndarray:
+    # PostgREST returns pgvector columns as '[0.1,0.2,...]' strings
+    if isinstance(value, str):
+        value = json.loads(value)
+    return np.asarray(value, dtype=np.float32)
+
+def load_article_embeddings(article_ids: List[str]) -> Dict[str, np.ndarray]:
+    """Stored embeddings for the given news_articles ids"""
+    vectors = {}
+    for start in range(0, len(article_ids), LOOKUP_BATCH_SIZE):
+        batch = article_ids[start:start + LOOKUP_BATCH_SIZE]
+        result = supabase.table('article_embeddings').select('article_id,embedding')\
+            .in_('article_id', batch).execute()
+        for row in result.data or []:
+            if row.get('embedding') is not None:
+                vectors[row['article_id']] = _parse_vector(row['embedding'])
+    return vectors
+
+def embed_articles(articles: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Embeddings for articles keyed by article id.
+
+    Stored embeddings are reused; the rest are embedded in batches of
+    ARTICLE_EMBEDDING_BATCH_SIZE inputs per API call and saved to
+    article_embeddings. Articles without an id are skipped.
+    """
+    by_id = {article['id']: article for article in articles if article.get('id')}
+    try:
+        vectors = load_article_embeddings(list(by_id))
+    except Exception as e:
+        logger.error(f"Error loading article embeddings: {str(e)}")
+        vectors = {}
+
+    missing = [article_id for article_id in by_id if article_id not in vectors]
+    if not missing:
+        return vectors
+
+    gateway = get_llm_gateway()
+    model = get_task_profile('article_embedding')['model']
+    for start in range(0, len(missing), ARTICLE_EMBEDDING_BATCH_SIZE):
+        batch = missing[start:start + ARTICLE_EMBEDDING_BATCH_SIZE]
+        embeddings = gateway.embed_for_task('article_embedding', [embedding_text(by_id[article_id]) for article_id in batch])
+        rows = []
+        for article_id, embedding in zip(batch, embeddings):
+            vectors[article_id] = np.asarray(embedding, dtype=np.float32)
+            rows.append({'article_id': article_id, 'model': model, 'embedding': embedding})
+        try:
+            supabase.table('article_embeddings').upsert(rows, on_conflict='article_id').execute()
+        except Exception as e:
+            logger.error(f"Error saving {len(rows)} article embeddings: {str(e)}")
+    logger.info(f"Embedded {len(missing)} articles, reused {len(by_id) - len(missing)} stored embeddings")
+    return vectors
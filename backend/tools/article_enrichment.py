@@ -0,0 +1,301 @@
+import os
+import re
+import json
+import time
+import threading
+import traceback
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from config.logging_config import setup_logging
+from tools.extractive_summarizer import extractive_enrich
+from tools.token_budget import count_tokens, current_usage, truncate_to_tokens
+
+logger = setup_logging()
+
+# Prompt tokens allowed per batched enrichment request
+ENRICHMENT_TOKEN_BUDGET = int(os.getenv('ENRICHMENT_TOKEN_BUDGET', '6000'))
+# Upper bound on articles per request, which also bounds the response size
+ENRICHMENT_MAX_BATCH = int(os.getenv('ENRICHMENT_MAX_BATCH', '8'))
+# Article bodies are truncated to this many tokens before being sent
+ENRICHMENT_MAX_ARTICLE_TOKENS = int(os.getenv('ENRICHMENT_MAX_ARTICLE_TOKENS', '1500'))
+
+# llm, extractive, or auto (LLM with extractive fallback when it is slow or failing)
+ENRICHMENT_MODE = os.getenv('ENRICHMENT_MODE', 'auto').lower()
+# Average seconds per LLM enrichment call above which auto mode falls back
+ENRICHMENT_LATENCY_THRESHOLD = float(os.getenv('ENRICHMENT_LATENCY_THRESHOLD', '20'))
+# Fraction of failed article enrichments above which auto mode falls back
+ENRICHMENT_ERROR_THRESHOLD = float(os.getenv('ENRICHMENT_ERROR_THRESHOLD', '0.5'))
+# Seconds auto mode stays on the extractive engine before retrying the LLM
+ENRICHMENT_FALLBACK_COOLDOWN = float(os.getenv('ENRICHMENT_FALLBACK_COOLDOWN', '300'))
+
+MAX_SUMMARY_LENGTH = 200
+MAX_KEY_POINTS = 5
+
+SINGLE_PROMPT = """Read the article below and return a JSON object with two keys:
+- "summary": a concise summary of the article in at most {max_summary} characters
+- "key_points": a list of at most {max_points} short key points
+
+Return only the JSON object.
+
+Article:
+{content}
+"""
+
+BATCH_PROMPT = """For each article below, write a concise summary (at most {max_summary} characters)
+and extract at most {max_points} short key points.
+
+Return only a JSON object of the form:
+{{"articles": [{{"id": <article id>, "summary": "...", "key_points": ["...", "..."]}}]}}
+with exactly one entry per article id.
+
+{articles}
+"""
+
+def _extract_json(response: str) -> Any:
+    """Parse a JSON value from an LLM response, tolerating surrounding prose or code fences"""
+    try:
+        return json.loads(response)
+    except json.JSONDecodeError:
+        match = re.search(r'({[\s\S]*})', response)
+        if not match:
+            raise
+        return json.loads(match.group(1))
+
+def _normalize(summary: Any, key_points: Any) -> Dict[str, Any]:
+    if not isinstance(key_points, list):
+        key_points = [line for line in str(key_points or "").split('\n')]
+    points = [str(point).strip() for point in key_points if str(point).strip()]
+    return {
+        'summary': str(summary or "").strip()[:MAX_SUMMARY_LENGTH],
+        'key_points': points[:MAX_KEY_POINTS],
+    }
+
+def _model_name(llm) -> Optional[str]:
+    return getattr(llm, 'model_name', None) or getattr(llm, 'model', None)
+
+def enrich_article(llm, content: str) -> Dict[str, Any]:
+    """
+    Summarize an article and extract its key points in a single LLM call.
+
+    Returns a dict with summary and key_points. If the response is not
+    valid JSON, the first line becomes the summary and the remaining
+    lines become key points.
+    """
+    model = _model_name(llm)
+    prompt = SINGLE_PROMPT.format(
+        max_summary=MAX_SUMMARY_LENGTH,
+        max_points=MAX_KEY_POINTS,
+        content=truncate_to_tokens(content, ENRICHMENT_MAX_ARTICLE_TOKENS, model)
+    )
+    response = llm.predict(prompt)
+
+    try:
+        data = _extract_json(response)
+        return _normalize(data.get('summary'), data.get('key_points'))
+    except (json.JSONDecodeError, AttributeError):
+        logger.warning("Failed to parse enrichment response as JSON, using plain text")
+        lines = [line.strip() for line in response.split('\n') if line.strip()]
+        return _normalize(lines[0] if lines else "", lines[1:])
+
+def pack_batches(articles: Sequence[Tuple[str, str]], model: str = None,
+                 token_budget: int = ENRICHMENT_TOKEN_BUDGET,
+                 max_batch: int = ENRICHMENT_MAX_BATCH) -> List[List[Tuple[str, str]]]:
+    """
+    Group (url, content) pairs into batches whose prompts fit token_budget.
+
+    Content is truncated to ENRICHMENT_MAX_ARTICLE_TOKENS first, so a single
+    article always fits in a batch of its own.
+    """
+    overhead = count_tokens(BATCH_PROMPT, model)
+    batches: List[List[Tuple[str, str]]] = []
+    current: List[Tuple[str, str]] = []
+    current_tokens = overhead
+
+    for url, content in articles:
+        content = truncate_to_tokens(content, ENRICHMENT_MAX_ARTICLE_TOKENS, model)
+        # Article header ("Article <id>:") plus body
+        tokens = count_tokens(content, model) + 8
+        if current and (current_tokens + tokens > token_budget or len(current) >= max_batch):
+            batches.append(current)
+            current, current_tokens = [], overhead
+        current.append((url, content))
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+    return batches
+
+def _enrich_batch(llm, batch: List[Tuple[str, str]]) -> Dict[str, Dict[str, Any]]:
+    """Enrich one packed batch, returning results only for articles the model answered"""
+    sections = [f"Article {i}:\n{content}" for i, (_, content) in enumerate(batch)]
+    prompt = BATCH_PROMPT.format(
+        max_summary=MAX_SUMMARY_LENGTH,
+        max_points=MAX_KEY_POINTS,
+        articles="\n\n".join(sections)
+    )
+    response = llm.predict(prompt)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        data = _extract_json(response)
+        for item in data.get('articles', []):
+            try:
+                index = int(item.get('id'))
+            except (TypeError, ValueError):
+                continue
+            if 0 <= index < len(batch) and item.get('summary'):
+                results[batch[index][0]] = _normalize(item.get('summary'), item.get('key_points'))
+    except (json.JSONDecodeError, AttributeError):
+        logger.warning(f"Failed to parse batched enrichment response for {len(batch)} articles")
+    return results
+
+def enrich_articles(llm, articles: Sequence[Tuple[str, str]],
+                    token_budget: int = ENRICHMENT_TOKEN_BUDGET,
+                    latencies: List[float] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Enrich many (url, content) pairs with as few LLM calls as possible.
+
+    Articles are packed into batches up to token_budget prompt tokens.
+    Any article missing from a batch response (parse failure or omitted id)
+    is retried with a single-article call. When latencies is given, the
+    duration of each batch's own call is appended to it; the single-article
+    retries are not included.
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    if not articles:
+        return results
+
+    batches = pack_batches(articles, _model_name(llm), token_budget)
+    logger.info(f"Enriching {len(articles)} articles in {len(batches)} LLM calls")
+
+    for batch in batches:
+        if len(batch) > 1:
+            started = time.monotonic()
+            try:
+                results.update(_enrich_batch(llm, batch))
+            except Exception as e:
+                logger.error(f"Error enriching batch of {len(batch)} articles: {str(e)}")
+                logger.error(traceback.format_exc())
+            if latencies is not None:
+                latencies.append(time.monotonic() - started)
+
+        for url, content in batch:
+            if url in results:
+                continue
+            started = time.monotonic()
+            try:
+                results[url] = enrich_article(llm, content)
+            except Exception as e:
+                logger.error(f"Error enriching article {url}: {str(e)}")
+            # A lone article's call is its batch call; retries after a batch are not timed
+            if latencies is not None and len(batch) == 1:
+                latencies.append(time.monotonic() - started)
+
+    return results
+
+class EnrichmentRouter:
+    """
+    Chooses between LLM and local extractive enrichment.
+
+    In auto mode the router tracks recent LLM call latency and per-article
+    failures. When either crosses its threshold it serves extractive results
+    for a cooldown period before trying the LLM again. Articles the LLM
+    fails to enrich always get an extractive result instead of nothing.
+    """
+
+    def __init__(self, llm, mode: str = ENRICHMENT_MODE,
+                 latency_threshold: float = ENRICHMENT_LATENCY_THRESHOLD,
+                 error_threshold: float = ENRICHMENT_ERROR_THRESHOLD,
+                 cooldown: float = ENRICHMENT_FALLBACK_COOLDOWN,
+                 window: int = 20, min_samples: int = 5):
+        if mode not in ('llm', 'extractive', 'auto'):
+            logger.warning(f"Unknown enrichment mode '{mode}', using auto")
+            mode = 'auto'
+        self.llm = llm
+        self.mode = mode
+        self.latency_threshold = latency_threshold
+        self.error_threshold = error_threshold
+        self.cooldown = cooldown
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        self._outcomes = deque(maxlen=window)
+        self._degraded_until = 0.0
+        self._lock = threading.Lock()
+        self._stats = {'llm_articles': 0, 'extractive_articles': 0, 'llm_failures': 0, 'fallbacks': 0}
+
+    def use_llm(self) -> bool:
+        if self.mode == 'extractive':
+            return False
+        if self.mode == 'llm':
+            return True
+        with self._lock:
+            return time.monotonic() >= self._degraded_until
+
+    def _observe(self, latencies: Sequence[float], succeeded: int, failed: int):
+        if self.mode != 'auto':
+            return
+        with self._lock:
+            self._latencies.extend(latencies)
+            self._outcomes.extend([True] * succeeded + [False] * failed)
+            if len(self._outcomes) < self.min_samples:
+                return
+            error_rate = self._outcomes.count(False) / len(self._outcomes)
+            mean_latency = sum(self._latencies) / len(self._latencies) if self._latencies else 0.0
+            if error_rate > self.error_threshold or mean_latency > self.latency_threshold:
+                logger.warning(
+                    f"LLM enrichment degraded (error rate {error_rate:.2f}, mean latency {mean_latency:.1f}s), "
+                    f"using extractive enrichment for {self.cooldown:.0f}s"
+                )
+                self._degraded_until = time.monotonic() + self.cooldown
+                self._latencies.clear()
+                self._outcomes.clear()
+                self._stats['fallbacks'] += 1
+
+    def enrich(self, articles: Sequence[Tuple[str, str]], extractive: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Enrich (url, content) pairs, returning url -> {summary, key_points}.
+
+        Pass extractive=True to skip the LLM for this call, e.g. when a
+        workflow is over its token budget.
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        if not articles:
+            return results
+
+        # Switch to extractive summaries rather than overrun the workflow budget
+        usage = current_usage()
+        if not extractive and usage is not None:
+            model = _model_name(self.llm)
+            estimated = sum(
+                min(count_tokens(content, model), ENRICHMENT_MAX_ARTICLE_TOKENS) + 150 for _, content in articles
+            )
+            if not usage.allows('article_enrichment', estimated):
+                usage.degrade('article_enrichment', "extractive summaries")
+                extractive = True
+
+        if not extractive and self.use_llm():
+            latencies: List[float] = []
+            try:
+                results = enrich_articles(self.llm, articles, latencies=latencies)
+            except Exception as e:
+                logger.error(f"Error in LLM enrichment: {str(e)}")
+                results = {}
+            failed = sum(1 for url, _ in articles if url not in results)
+            self._observe(latencies, len(articles) - failed, failed)
+            with self._lock:
+                self._stats['llm_articles'] += len(articles) - failed
+                self._stats['llm_failures'] += failed
+
+        missing = [(url, content) for url, content in articles if url not in results]
+        for url, content in missing:
+            results[url] = extractive_enrich(content, MAX_SUMMARY_LENGTH, MAX_KEY_POINTS)
+        with self._lock:
+            self._stats['extractive_articles'] += len(missing)
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['degraded'] = self.mode == 'auto' and time.monotonic() < self._degraded_until
+        stats['mode'] = self.mode
+        return stats
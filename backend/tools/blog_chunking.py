@@ -0,0 +1,107 @@
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from tools.token_budget import count_tokens
+
+# Upper bound on tokens per embedded chunk of a blog post
+BLOG_CHUNK_MAX_TOKENS = int(os.getenv('BLOG_CHUNK_MAX_TOKENS', '500'))
+# Tokens repeated from the end of one chunk at the start of the next within a section
+BLOG_CHUNK_OVERLAP_TOKENS = int(os.getenv('BLOG_CHUNK_OVERLAP_TOKENS', '60'))
+
+HEADING = re.compile(r'^(#{1,6})\s+(.+?)\s*#*\s*$')
+FENCE = re.compile(r'^\s*(```|~~~)')
+# Paragraphs, then sentences, then words: the finer splits are only used for oversized pieces
+SPLITTERS = [
+    re.compile(r'\S(?:.|\n(?!\s*\n))*'),
+    re.compile(r'[^\s.!?][^.!?\n]*(?:[.!?]+|$)'),
+    re.compile(r'\S+'),
+]
+
+Span = Tuple[int, int, int]  # (start, end, tokens) in characters of the post
+
+def split_sections(content: str) -> List[Dict[str, Any]]:
+    """Split markdown at headings outside code blocks; each section keeps its heading line"""
+    sections = []
+    start, heading, in_code, position = 0, None, False, 0
+    for line in content.splitlines(keepends=True):
+        if FENCE.match(line):
+            in_code = not in_code
+        match = None if in_code else HEADING.match(line.rstrip('\n'))
+        if match and position > start:
+            sections.append({'heading': heading, 'start': start, 'end': position})
+        if match:
+            start, heading = position, match.group(2)
+        position += len(line)
+    if position > start:
+        sections.append({'heading': heading, 'start': start, 'end': position})
+    return [section for section in sections if content[section['start']:section['end']].strip()]
+
+def _units(content: str, start: int, end: int, max_tokens: int, model: Optional[str], level: int = 0) -> List[Span]:
+    """Pieces of content[start:end] no longer than max_tokens, split as coarsely as possible"""
+    units = []
+    for match in SPLITTERS[level].finditer(content, start, end):
+        tokens = count_tokens(match.group(0), model)
+        if tokens > max_tokens and level + 1 < len(SPLITTERS):
+            units.extend(_units(content, match.start(), match.end(), max_tokens, model, level + 1))
+        else:
+            units.append((match.start(), match.end(), tokens))
+    return units
+
+def chunk_markdown(content: str, max_tokens: int = None, overlap_tokens: int = None,
+                   model: str = None) -> List[Dict[str, Any]]:
+    """
+    Split a markdown post into chunks for embedding.
+
+    Chunks never cross a heading. A section longer than max_tokens is
+    packed from paragraphs (or sentences, or words when those are too long)
+    into windows of about max_tokens that overlap by overlap_tokens.
+    Offsets are character positions in content, so content[start:end] is
+    the chunk text.
+    """
+    max_tokens = max_tokens or BLOG_CHUNK_MAX_TOKENS
+    overlap_tokens = BLOG_CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+    chunks = []
+    for section in split_sections(content or ""):
+        text = content[section['start']:section['end']]
+        tokens = count_tokens(text, model)
+        if tokens <= max_tokens:
+            spans = [(section['start'], section['end'], tokens)]
+        else:
+            spans = _pack(_units(content, section['start'], section['end'], max_tokens, model),
+                          max_tokens, overlap_tokens)
+        for start, end, tokens in spans:
+            chunks.append({
+                'index': len(chunks), 'heading': section['heading'],
+                'start': start, 'end': end, 'tokens': tokens,
+                'content': content[start:end].strip()
+            })
+    return chunks
+
+def _pack(units: List[Span], max_tokens: int, overlap_tokens: int) -> List[Span]:
+    """Group consecutive units into windows of at most max_tokens with trailing overlap"""
+    windows = []
+    current: List[Span] = []
+    total = 0
+    for unit in units:
+        if current and total + unit[2] > max_tokens:
+            windows.append((current[0][0], current[-1][1], total))
+            # Carry the last units forward while they fit in the overlap
+            carried, carried_tokens = [], 0
+            for previous in reversed(current):
+                if carried_tokens + previous[2] > overlap_tokens or carried_tokens + previous[2] + unit[2] > max_tokens:
+                    break
+                carried.insert(0, previous)
+                carried_tokens += previous[2]
+            current, total = carried, carried_tokens
+        current.append(unit)
+        total += unit[2]
+    if current:
+        windows.append((current[0][0], current[-1][1], total))
+    return windows
+
+def embedding_input(chunk: Dict[str, Any], title: Optional[str]) -> str:
+    """Text embedded for a chunk: the post title and section heading give it context"""
+    prefix = [title] if title else []
+    if chunk['heading'] and not chunk['content'].lstrip().startswith('#'):
+        prefix.append(chunk['heading'])
+    return "\n".join(prefix + [chunk['content']])
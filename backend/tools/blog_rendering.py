@@ -0,0 +1,112 @@
+import os
+import re
+import math
+from typing import Any, Dict, List, Optional
+from config.logging_config import setup_logging
+
+logger = setup_logging()
+
+try:
+    import markdown
+    from markdown.treeprocessors import Treeprocessor
+except ImportError:
+    markdown = None
+    Treeprocessor = object
+    logger.warning("markdown not installed, blogs will be saved without rendered HTML")
+
+# Length of the plain-text excerpt shown in blog lists
+BLOG_EXCERPT_CHARS = int(os.getenv('BLOG_EXCERPT_CHARS', '280'))
+# Reading speed used for the reading-time estimate
+READING_WORDS_PER_MINUTE = int(os.getenv('READING_WORDS_PER_MINUTE', '200'))
+
+SAFE_URL = re.compile(r'^(https?:|mailto:|/|#|\?|[^:]*$)', re.IGNORECASE)
+
+FENCE = re.compile(r'^\s*(```|~~~)')
+HEADING = re.compile(r'^\s*#{1,6}\s+')
+BLOCK_PREFIX = re.compile(r'^\s*(?:>\s*)+|^\s*(?:[-*+]|\d+[.)])\s+')
+TABLE_ROW = re.compile(r'^\s*\|')
+TABLE_RULE = re.compile(r'^\s*\|?\s*:?-{3,}')
+# Link targets may contain one level of parentheses
+URL = r'\((?:[^()]|\([^)]*\))*\)'
+IMAGE = re.compile(r'!\[([^\]]*)\]' + URL)
+LINK = re.compile(r'\[([^\]]+)\]' + URL)
+TAG = re.compile(r'<[^>]+>')
+EMPHASIS = re.compile(r'(\*{1,3}|_{1,3}|~~|`+)')
+
+class _SafeLinks(Treeprocessor):
+    """Drop link and image URLs with schemes such as javascript:"""
+
+    def run(self, root):
+        for element in root.iter():
+            for attribute in ('href', 'src'):
+                url = element.get(attribute)
+                if url is not None and not SAFE_URL.match(url.strip()):
+                    del element.attrib[attribute]
+
+def render_html(content: str) -> Optional[str]:
+    """Render blog markdown to HTML, or None when markdown is not installed"""
+    if markdown is None:
+        return None
+    md = markdown.Markdown(extensions=['tables', 'fenced_code', 'sane_lists'])
+    # Content comes from the LLM: raw HTML is escaped instead of passed through
+    md.preprocessors.deregister('html_block')
+    md.inlinePatterns.deregister('html')
+    md.treeprocessors.register(_SafeLinks(md), 'safe_links', 0)
+    return md.convert(content)
+
+def _plain_line(line: str) -> str:
+    line = HEADING.sub('', line)
+    line = BLOCK_PREFIX.sub('', line)
+    line = IMAGE.sub(r'\1', line)
+    line = LINK.sub(r'\1', line)
+    line = TAG.sub('', line)
+    line = EMPHASIS.sub('', line)
+    return line.replace('|', ' ').strip()
+
+def plain_paragraphs(content: str, body_only: bool = False) -> List[str]:
+    """Markdown content as plain-text paragraphs; body_only leaves out headings, code and tables"""
+    paragraphs, current, in_code = [], [], False
+    for line in content.splitlines():
+        if FENCE.match(line):
+            in_code = not in_code
+            continue
+        if in_code and body_only:
+            continue
+        is_heading = not in_code and bool(HEADING.match(line))
+        is_table = not in_code and bool(TABLE_ROW.match(line) or TABLE_RULE.match(line))
+        if not line.strip() or is_heading or (is_table and (body_only or TABLE_RULE.match(line))):
+            if current:
+                paragraphs.append(" ".join(current))
+                current = []
+            if is_heading and not body_only:
+                paragraphs.append(_plain_line(line))
+            continue
+        text = line.strip() if in_code else _plain_line(line)
+        if text:
+            current.append(text)
+    if current:
+        paragraphs.append(" ".join(current))
+    return [paragraph for paragraph in paragraphs if paragraph]
+
+def make_excerpt(content: str, max_chars: int = None) -> str:
+    """Opening body text of the post, cut at a word boundary"""
+    max_chars = max_chars or BLOG_EXCERPT_CHARS
+    text = " ".join(plain_paragraphs(content, body_only=True))
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars + 1].rsplit(' ', 1)[0].rstrip(' ,;:.-')
+    return cut + "…"
+
+def blog_display_fields(content: str) -> Dict[str, Any]:
+    """
+    Columns derived from a blog's markdown for list and detail views:
+    rendered HTML, a plain-text excerpt, word count and reading time.
+    """
+    content = content or ""
+    word_count = sum(len(paragraph.split()) for paragraph in plain_paragraphs(content))
+    return {
+        "content_html": render_html(content),
+        "excerpt": make_excerpt(content),
+        "word_count": word_count,
+        "reading_time_minutes": max(1, math.ceil(word_count / READING_WORDS_PER_MINUTE)) if word_count else 0
+    }
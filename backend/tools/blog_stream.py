@@ -0,0 +1,101 @@
+import os
+import json
+import uuid
+import queue
+import threading
+import traceback
+from typing import Any, Dict, Iterator, Optional, Tuple
+from tools.token_budget import TokenBudgetExceeded, WorkflowUsage, track_usage
+from tools.news_data_collection_tool import fetch_news
+from tools.trend_analyzer_tool import analyze_trends
+from tools.save_blog_post_tool import (average_trend_score, blog_stage, commit_blog,
+                                       parse_markdown_blog, stream_blog_content)
+from config.logging_config import setup_logging
+
+logger = setup_logging()
+
+# Seconds without an event after which a keep-alive comment is sent
+BLOG_STREAM_KEEPALIVE_SECONDS = float(os.getenv('BLOG_STREAM_KEEPALIVE_SECONDS', '15'))
+
+Event = Tuple[str, Dict[str, Any]]
+
+def _generate(events: queue.Queue, topic: str, category: Optional[str], run_id: str):
+    """Collect, analyse, write and save one blog, reporting progress to events"""
+    def emit(event: str, data: Dict[str, Any]):
+        events.put((event, data))
+
+    # Every LLM call is charged to this run, and it commits at most one blog
+    usage = WorkflowUsage()
+    try:
+        with track_usage(usage), blog_stage(run_id):
+            emit('stage', {'stage': 'collecting', 'run_id': run_id})
+            articles = fetch_news._run(topic=topic, category=category)
+            articles = articles if isinstance(articles, list) else []
+
+            emit('stage', {'stage': 'analyzing', 'articles': len(articles)})
+            analysis = analyze_trends._run(topic=topic, category=category, articles=articles)
+            if analysis.get('error') and not analysis.get('articles'):
+                emit('error', {'message': analysis['error'], 'run_id': run_id})
+                return
+            category = analysis.get('category') or category or 'technology'
+            top_articles = analysis.get('articles') or []
+
+            emit('stage', {'stage': 'writing'})
+            parts = []
+            for text in stream_blog_content(analysis.get('trends') or {}, top_articles):
+                parts.append(text)
+                emit('token', {'text': text})
+
+            emit('stage', {'stage': 'saving'})
+            blog = parse_markdown_blog("".join(parts), f"{topic} Trends Analysis")
+            new_blog = {
+                "title": blog["title"],
+                "content": blog["content"],
+                "category": category.lower(),
+                "image_url": None,
+                "trend_score": average_trend_score(top_articles),
+            }
+            result = commit_blog(new_blog, category, "Blog post created successfully")
+            emit('done' if result.get('status') != 'error' else 'error', {
+                **result, 'run_id': run_id, 'token_usage': usage.summary()
+            })
+    except TokenBudgetExceeded as budget_error:
+        logger.error(f"Blog stream stopped by token budget: {str(budget_error)}")
+        emit('error', {'message': str(budget_error), 'run_id': run_id, 'token_usage': usage.summary()})
+    except Exception as e:
+        logger.error(f"Error in blog stream: {str(e)}")
+        logger.error(traceback.format_exc())
+        emit('error', {'message': str(e), 'run_id': run_id})
+    finally:
+        events.put(None)
+
+def stream_blog(topic: str, category: str = None, run_id: str = None) -> Iterator[Optional[Event]]:
+    """
+    Run the blog workflow for topic, yielding (event, data) as it goes.
+
+    Events are 'stage' at each step, 'token' for each piece of generated
+    text, then 'done' with the saved blog or 'error'. None is yielded
+    when nothing happened for a while so the caller can keep the
+    connection alive. Generation runs in its own thread and still saves
+    the blog if the consumer goes away.
+    """
+    run_id = run_id or str(uuid.uuid4())
+    events: queue.Queue = queue.Queue()
+    threading.Thread(target=_generate, args=(events, topic, category, run_id),
+                     name=f"blog-stream-{run_id[:8]}", daemon=True).start()
+    while True:
+        try:
+            event = events.get(timeout=BLOG_STREAM_KEEPALIVE_SECONDS)
+        except queue.Empty:
+            yield None
+            continue
+        if event is None:
+            return
+        yield event
+
+def format_sse(event: Optional[Event]) -> str:
+    """Encode an event from stream_blog as a Server-Sent Events message"""
+    if event is None:
+        return ": keep-alive\n\n"
+    name, data = event
+    return f"event: {name}\ndata: {json.dumps(data, default=str)}\n\n"
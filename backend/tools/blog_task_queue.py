@@ -0,0 +1,187 @@
+import os
+import time
+import heapq
+import uuid
+import random
+import itertools
+import threading
+import traceback
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from tools.supabase_client import supabase
+from config.logging_config import setup_logging
+
+logger = setup_logging()
+
+TaskHandler = Callable[[str, Dict[str, Any]], None]
+
+class BlogTaskQueue:
+    """
+    Background workers for side effects that follow a committed blog save.
+
+    Handlers are registered per task kind and called as
+    handler(blog_id, payload); an exception schedules a retry with
+    exponential backoff and jitter until max_attempts is reached. Task
+    status is kept in memory for the API and mirrored to blog_tasks by the
+    workers, from the first attempt on, so it is visible from every process.
+    Worker threads start on the first enqueue().
+    """
+
+    def __init__(self, workers: int = 2, max_attempts: int = 4, backoff_base: float = 2.0,
+                 backoff_max: float = 60.0, history: int = 500):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.history = history
+        self._handlers: Dict[str, TaskHandler] = {}
+        # (ready_at, sequence, task_id) ordered by when the task may run
+        self._ready: List[tuple] = []
+        self._sequence = itertools.count()
+        self._tasks: Dict[str, Dict[str, Any]] = {}
+        self._payloads: Dict[str, Dict[str, Any]] = {}
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._stats = {'enqueued': 0, 'succeeded': 0, 'failed': 0, 'retries': 0}
+        self.workers = workers
+        self._workers: List[threading.Thread] = []
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Start the worker threads if they are not running yet"""
+        with self._start_lock:
+            if not self._workers:
+                self._workers = [
+                    threading.Thread(target=self._run, name=f"blog-tasks-{i}", daemon=True) for i in range(self.workers)
+                ]
+                for worker in self._workers:
+                    worker.start()
+
+    def register(self, kind: str, handler: TaskHandler):
+        self._handlers[kind] = handler
+
+    def enqueue(self, kind: str, blog_id: str, payload: Dict[str, Any] = None) -> str:
+        """Schedule a task for a saved blog without blocking the caller; returns the task id"""
+        self.start()
+        task_id = str(uuid.uuid4())
+        task = {
+            'id': task_id, 'blog_id': blog_id, 'kind': kind, 'status': 'pending',
+            'attempts': 0, 'last_error': None, 'created_at': datetime.now().isoformat()
+        }
+        # The blog_tasks row is written by the worker that claims the task,
+        # keeping database round trips off the save path
+        with self._condition:
+            self._tasks[task_id] = task
+            self._payloads[task_id] = payload or {}
+            self._stats['enqueued'] += 1
+            heapq.heappush(self._ready, (time.monotonic(), next(self._sequence), task_id))
+            self._condition.notify()
+        return task_id
+
+    def get_tasks(self, blog_id: str) -> List[Dict[str, Any]]:
+        """Status of the tasks this process has run for blog_id"""
+        with self._condition:
+            return [dict(task) for task in self._tasks.values() if task['blog_id'] == blog_id]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._condition:
+            stats = dict(self._stats)
+            stats['queued'] = len(self._ready)
+            stats['running'] = sum(1 for task in self._tasks.values() if task['status'] == 'running')
+        return stats
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        for worker in self._workers:
+            worker.join(timeout=timeout)
+
+    def _next_task(self) -> Optional[str]:
+        """Wait until the earliest scheduled task is due and claim it"""
+        with self._condition:
+            while not self._stop.is_set():
+                if not self._ready:
+                    self._condition.wait(timeout=1.0)
+                    continue
+                delay = self._ready[0][0] - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(timeout=delay)
+                    continue
+                _, _, task_id = heapq.heappop(self._ready)
+                task = self._tasks[task_id]
+                task['status'] = 'running'
+                task['attempts'] += 1
+                return task_id
+        return None
+
+    def _run(self):
+        while not self._stop.is_set():
+            task_id = self._next_task()
+            if task_id is None:
+                continue
+            task = self._tasks[task_id]
+            self._persist(task)
+            try:
+                handler = self._handlers.get(task['kind'])
+                if handler is None:
+                    raise RuntimeError(f"No handler registered for task kind '{task['kind']}'")
+                handler(task['blog_id'], self._payloads[task_id])
+                self._finish(task, 'succeeded')
+                logger.info(f"Blog task {task['kind']} succeeded for blog {task['blog_id']}")
+            except Exception as e:
+                task['last_error'] = str(e)
+                if task['attempts'] >= self.max_attempts:
+                    self._finish(task, 'failed')
+                    logger.error(f"Blog task {task['kind']} failed for blog {task['blog_id']} "
+                                 f"after {task['attempts']} attempts: {str(e)}")
+                    logger.error(traceback.format_exc())
+                    continue
+                # Full-jitter exponential backoff
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (task['attempts'] - 1)))
+                with self._condition:
+                    task['status'] = 'retrying'
+                    self._stats['retries'] += 1
+                    heapq.heappush(self._ready, (time.monotonic() + delay, next(self._sequence), task_id))
+                    self._condition.notify()
+                self._persist(task)
+                logger.warning(f"Blog task {task['kind']} for blog {task['blog_id']} failed, "
+                               f"retrying in {delay:.1f}s: {str(e)}")
+
+    def _finish(self, task: Dict[str, Any], status: str):
+        with self._condition:
+            task['status'] = status
+            if status == 'succeeded':
+                task['last_error'] = None
+            self._stats[status] += 1
+            self._payloads.pop(task['id'], None)
+            # Keep a bounded history of finished tasks for the status endpoint
+            finished = [task_id for task_id, item in self._tasks.items() if item['status'] in ('succeeded', 'failed')]
+            for task_id in finished[:max(0, len(finished) - self.history)]:
+                del self._tasks[task_id]
+        self._persist(task)
+
+    def _persist(self, task: Dict[str, Any]):
+        # Upsert the whole row: the first write creates it, and a failed write is repaired by the next
+        row = {key: task[key] for key in ('id', 'blog_id', 'kind', 'status', 'attempts', 'last_error')}
+        try:
+            supabase.table('blog_tasks').upsert(row, on_conflict='id').execute()
+        except Exception as e:
+            logger.error(f"Error saving blog task status: {str(e)}")
+
+# Process-wide queue shared by blog creation and the API
+_blog_task_queue: Optional[BlogTaskQueue] = None
+_blog_task_queue_lock = threading.Lock()
+
+def get_blog_task_queue() -> BlogTaskQueue:
+    """Return the shared BlogTaskQueue, starting its workers on first use"""
+    global _blog_task_queue
+    if _blog_task_queue is None:
+        with _blog_task_queue_lock:
+            if _blog_task_queue is None:
+                _blog_task_queue = BlogTaskQueue(
+                    workers=int(os.getenv('BLOG_TASK_WORKERS', '2')),
+                    max_attempts=int(os.getenv('BLOG_TASK_MAX_ATTEMPTS', '4')),
+                    backoff_base=float(os.getenv('BLOG_TASK_BACKOFF_BASE', '2')),
+                    backoff_max=float(os.getenv('BLOG_TASK_BACKOFF_MAX', '60'))
+                )
+    return _blog_task_queue
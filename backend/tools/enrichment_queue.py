@@ -0,0 +1,173 @@
+import os
+import time
+import queue
+import threading
+import traceback
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from tools.supabase_client import supabase
+from tools.memory_store import MemoryStore, get_memory_store
+from tools.token_budget import current_usage, track_usage
+from config.logging_config import setup_logging
+
+logger = setup_logging()
+
+class EnrichmentQueue:
+    """
+    Background worker that enriches articles after they have been saved.
+
+    Ingestion calls enqueue() and returns immediately. The worker thread
+    starts on the first enqueue() and drains the queue in batches, stores summaries and key points in the shared
+    MemoryStore and writes them back to news_articles. Consumers that need
+    the results call wait_for() with a timeout.
+    """
+
+    def __init__(self, store: MemoryStore, batch_size: int = 8, batch_wait: float = 0.5):
+        self.store = store
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self._queue: "queue.Queue[Tuple[str, str, Optional[Dict], Any]]" = queue.Queue()
+        self._events: Dict[str, threading.Event] = {}
+        self._events_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._stats = {'enqueued': 0, 'enriched': 0, 'failed': 0, 'batches': 0, 'write_back_errors': 0}
+        self._stats_lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def _record(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def _event(self, url: str) -> threading.Event:
+        with self._events_lock:
+            event = self._events.get(url)
+            if event is None:
+                event = self._events[url] = threading.Event()
+            return event
+
+    def start(self):
+        """Start the worker thread if it is not running yet"""
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="article-enrichment", daemon=True)
+                self._worker.start()
+
+    def enqueue(self, url: str, content: str, metadata: Dict = None):
+        """Schedule an article for enrichment without blocking the caller"""
+        if self.store.backend.contains(url):
+            return
+        self.start()
+        self._event(url)
+        self._record('enqueued')
+        # Carry the caller's workflow so its token usage and budget apply in the worker
+        self._queue.put((url, content, metadata, current_usage()))
+
+    def wait_for(self, urls: Iterable[str], timeout: float = 10.0) -> Dict[str, bool]:
+        """
+        Block until the given URLs are enriched or timeout seconds pass.
+
+        URLs that were never enqueued count as ready if the store already
+        holds them. Returns a URL -> ready mapping.
+        """
+        deadline = time.monotonic() + timeout
+        ready = {}
+        for url in urls:
+            with self._events_lock:
+                event = self._events.get(url)
+            if event is None:
+                ready[url] = self.store.backend.contains(url)
+                continue
+            ready[url] = event.wait(max(0.0, deadline - time.monotonic()))
+        return ready
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['pending'] = self.pending()
+        return stats
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join(timeout=timeout)
+
+    def _next_batch(self) -> List[Tuple[str, str, Optional[Dict], Any]]:
+        """Wait for one item, then collect more for up to batch_wait seconds"""
+        try:
+            batch = [self._queue.get(timeout=1.0)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                groups: Dict[int, Tuple[Any, List[Tuple[str, str, Optional[Dict]]]]] = {}
+                for url, content, metadata, usage in batch:
+                    groups.setdefault(id(usage), (usage, []))[1].append((url, content, metadata))
+                records = {}
+                for usage, items in groups.values():
+                    with track_usage(usage):
+                        records.update(self.store.add_articles(items))
+                self._record('batches')
+                # Failed enrichments are still stored, as records without a summary or key points
+                enriched = sum(1 for record in records.values() if record.summary or record.key_points)
+                self._record('enriched', enriched)
+                self._record('failed', len(records) - enriched)
+                for url, record in records.items():
+                    self._write_back(url, record.summary, list(record.key_points))
+            except Exception as e:
+                logger.error(f"Error in enrichment worker: {str(e)}")
+                logger.error(traceback.format_exc())
+            finally:
+                # Release waiters whether or not enrichment succeeded; later
+                # wait_for calls fall back to checking the store directly
+                with self._events_lock:
+                    for url, *_ in batch:
+                        event = self._events.pop(url, None)
+                        if event is not None:
+                            event.set()
+
+    def _write_back(self, url: str, summary: str, key_points: List[str]):
+        try:
+            supabase.table('news_articles').update({
+                'summary': summary,
+                'key_points': key_points,
+                'enriched_at': datetime.now().isoformat()
+            }).eq('url', url).execute()
+        except Exception as e:
+            self._record('write_back_errors')
+            logger.error(f"Error writing enrichment for {url}: {str(e)}")
+
+# Process-wide queue shared by ingestion and analysis
+_enrichment_queue: Optional[EnrichmentQueue] = None
+_enrichment_queue_lock = threading.Lock()
+
+def get_enrichment_queue() -> EnrichmentQueue:
+    """Return the shared EnrichmentQueue, starting its worker on first use"""
+    global _enrichment_queue
+    if _enrichment_queue is None:
+        with _enrichment_queue_lock:
+            if _enrichment_queue is None:
+                _enrichment_queue = EnrichmentQueue(
+                    get_memory_store(),
+                    batch_size=int(os.getenv('ENRICHMENT_MAX_BATCH', '8')),
+                    batch_wait=float(os.getenv('ENRICHMENT_BATCH_WAIT', '0.5'))
+                )
+    return _enrichment_queue
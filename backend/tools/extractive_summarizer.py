@@ -0,0 +1,112 @@
+import re
+from typing import Any, Dict, List
+import numpy as np
+
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])["\')\]]*\s+(?=["\'(\[]?[A-Z0-9])')
+WORD = re.compile(r"[a-z0-9][a-z0-9'\-]*")
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further had
+has have having he her here hers herself him himself his how i if in into is it its itself just
+me more most my myself no nor not now of off on once only or other our ours ourselves out over own
+said same she should so some such than that the their theirs them themselves then there these they
+this those through to too under until up very was we were what when where which while who whom why
+will with would you your yours yourself yourselves says say new one two year years
+""".split())
+
+MIN_SENTENCE_CHARS = 25
+MAX_SENTENCES = 60
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences, dropping fragments too short to stand alone"""
+    text = re.sub(r'\s+', ' ', text or "").strip()
+    if not text:
+        return []
+    return [sentence.strip() for sentence in SENTENCE_SPLIT.split(text) if len(sentence.strip()) >= MIN_SENTENCE_CHARS]
+
+def _tokenize(sentence: str) -> List[str]:
+    return [word for word in WORD.findall(sentence.lower()) if word not in STOPWORDS and len(word) > 2]
+
+def rank_sentences(sentences: List[str], damping: float = 0.85, iterations: int = 30) -> np.ndarray:
+    """
+    Score sentences with TextRank over a TF-IDF cosine-similarity graph.
+
+    The whole graph is built with matrix operations: a sentence x term
+    TF-IDF matrix, L2-normalised rows, one matrix product for the
+    similarities and a vectorised power iteration.
+    """
+    count = len(sentences)
+    if count == 0:
+        return np.zeros(0)
+    if count == 1:
+        return np.ones(1)
+
+    tokens = [_tokenize(sentence) for sentence in sentences]
+    vocabulary: Dict[str, int] = {}
+    rows, cols = [], []
+    for row, words in enumerate(tokens):
+        for word in words:
+            rows.append(row)
+            cols.append(vocabulary.setdefault(word, len(vocabulary)))
+    if not vocabulary:
+        return np.ones(count) / count
+
+    tf = np.zeros((count, len(vocabulary)))
+    np.add.at(tf, (np.array(rows), np.array(cols)), 1.0)
+
+    document_frequency = np.count_nonzero(tf, axis=0)
+    idf = np.log((1 + count) / (1 + document_frequency)) + 1.0
+    tfidf = tf * idf
+    norms = np.linalg.norm(tfidf, axis=1, keepdims=True)
+    tfidf = np.divide(tfidf, norms, out=np.zeros_like(tfidf), where=norms > 0)
+
+    similarity = tfidf @ tfidf.T
+    np.fill_diagonal(similarity, 0.0)
+
+    # Row-normalise into a transition matrix; isolated sentences jump uniformly
+    out_weight = similarity.sum(axis=1, keepdims=True)
+    transition = np.divide(similarity, out_weight, out=np.full_like(similarity, 1.0 / count), where=out_weight > 0)
+
+    scores = np.full(count, 1.0 / count)
+    teleport = (1.0 - damping) / count
+    for _ in range(iterations):
+        updated = teleport + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < 1e-6:
+            scores = updated
+            break
+        scores = updated
+    return scores
+
+def extractive_enrich(content: str, max_summary_length: int = 200, max_points: int = 5) -> Dict[str, Any]:
+    """
+    Build a summary and key points from the article's own sentences.
+
+    Returns the same shape as the LLM enrichment: a summary of at most
+    max_summary_length characters and up to max_points key points. The
+    summary keeps the top-ranked sentences in their original order.
+    """
+    sentences = split_sentences(content)[:MAX_SENTENCES]
+    if not sentences:
+        text = re.sub(r'\s+', ' ', content or "").strip()
+        return {'summary': text[:max_summary_length], 'key_points': [text[:max_summary_length]] if text else []}
+
+    scores = rank_sentences(sentences)
+    # Stable sort keeps earlier sentences first on ties, which favours the lede
+    ranked = np.argsort(-scores, kind='stable')
+
+    chosen: List[int] = []
+    length = 0
+    for index in ranked:
+        sentence_length = len(sentences[index]) + (1 if chosen else 0)
+        if length + sentence_length > max_summary_length:
+            continue
+        chosen.append(int(index))
+        length += sentence_length
+    if chosen:
+        summary = " ".join(sentences[index] for index in sorted(chosen))
+    else:
+        summary = sentences[int(ranked[0])][:max_summary_length]
+
+    key_points = [sentences[int(index)] for index in ranked[:max_points]]
+    return {'summary': summary, 'key_points': key_points}
@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Optional
+from config.logging_config import setup_logging
+
+logger = setup_logging()
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'cache', 'llm_cache.sqlite3')
+
+# Sites that generate content at temperature > 0, where a re-run is meant to produce a new result
+DEFAULT_UNCACHED_SITES = 'blog_generation,trend_analysis'
+
+def make_cache_key(model: Optional[str], temperature: Optional[float], prompt: str,
+                   max_tokens: Optional[int] = None) -> str:
+    """Content address for a completion: hash of model, temperature, max_tokens and prompt"""
+    payload = json.dumps([model or "", temperature, max_tokens, prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class LLMResponseCache:
+    """
+    Disk-backed cache of LLM completions keyed by make_cache_key().
+
+    Entries expire after ttl seconds. When the cache grows past max_entries
+    or max_bytes, the least recently used entries are dropped. Hit and miss
+    counters are kept per call site.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: float = 7 * 24 * 3600,
+                 max_entries: int = 20000, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._stats_lock = threading.Lock()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_last_used ON llm_responses(last_used)")
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _record(self, site: str, key: str):
+        with self._stats_lock:
+            counters = self._stats.setdefault(site, {'hits': 0, 'misses': 0, 'bypassed': 0})
+            counters[key] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute(
+            "SELECT response, created_at FROM llm_responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if now - row[1] > self.ttl:
+            with conn:
+                conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+            return None
+        with conn:
+            conn.execute("UPDATE llm_responses SET last_used = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def set(self, key: str, response: str, model: str = None):
+        conn = self._connection()
+        now = time.time()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, model, response, size, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, len(response.encode('utf-8')), now, now)
+            )
+        self._enforce_limits()
+
+    def _enforce_limits(self):
+        conn = self._connection()
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # Trim to 90% of the limits so eviction does not run on every insert
+        with conn:
+            conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (time.time() - self.ttl,))
+            rows = conn.execute("SELECT key, size FROM llm_responses ORDER BY last_used DESC").fetchall()
+            keep_entries = int(self.max_entries * 0.9)
+            keep_bytes = int(self.max_bytes * 0.9)
+            kept, kept_bytes, evict = 0, 0, []
+            for key, size in rows:
+                if kept < keep_entries and kept_bytes + size <= keep_bytes:
+                    kept += 1
+                    kept_bytes += size
+                else:
+                    evict.append((key,))
+            conn.executemany("DELETE FROM llm_responses WHERE key = ?", evict)
+        logger.info(f"Evicted {len(evict)} entries from LLM response cache")
+
+    def get_or_compute(self, site: str, model: Optional[str], temperature: Optional[float],
+                       prompt: str, compute: Callable[[], str], use_cache: bool = True,
+                       max_tokens: Optional[int] = None) -> str:
+        """Return the cached response for this prompt, calling compute() on a miss"""
+        if not use_cache:
+            self._record(site, 'bypassed')
+            return compute()
+
+        key = make_cache_key(model, temperature, prompt, max_tokens)
+        try:
+            cached = self.get(key)
+        except Exception as e:
+            logger.error(f"Error reading LLM cache: {str(e)}")
+            cached = None
+        if cached is not None:
+            self._record(site, 'hits')
+            return cached
+
+        self._record(site, 'misses')
+        response = compute()
+        if isinstance(response, str):
+            try:
+                self.set(key, response, model)
+            except Exception as e:
+                logger.error(f"Error writing LLM cache: {str(e)}")
+        return response
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            sites = {site: dict(counters) for site, counters in self._stats.items()}
+        hits = sum(counters['hits'] for counters in sites.values())
+        misses = sum(counters['misses'] for counters in sites.values())
+        return {
+            'sites': sites,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 3) if hits + misses else 0.0,
+        }
+
+class CachingLLM:
+    """
+    Wraps any object with a predict(prompt) method (ChatOpenAI or a local
+    fake) and serves repeated prompts from the LLMResponseCache.
+
+    site names the call site for statistics and opt-out: caching is skipped
+    for sites listed in LLM_CACHE_DISABLED_SITES (comma separated, by default
+    the generation sites in DEFAULT_UNCACHED_SITES), when enabled=False is
+    passed, or per call with predict(prompt, use_cache=False).
+    """
+
+    def __init__(self, llm, site: str, cache: LLMResponseCache = None, enabled: bool = None):
+        self.llm = llm
+        self.site = site
+        self.cache = cache
+        if enabled is None:
+            disabled_sites = os.getenv('LLM_CACHE_DISABLED_SITES', DEFAULT_UNCACHED_SITES)
+            disabled = {name.strip() for name in disabled_sites.split(',') if name.strip()}
+            enabled = os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true' and site not in disabled
+        self.enabled = enabled
+
+    @property
+    def model_name(self) -> Optional[str]:
+        return getattr(self.llm, 'model_name', None) or getattr(self.llm, 'model', None)
+
+    def predict(self, prompt: str, use_cache: bool = True, **kwargs) -> str:
+        cache = self.cache or get_llm_cache()
+        return cache.get_or_compute(
+            self.site,
+            self.model_name,
+            getattr(self.llm, 'temperature', None),
+            prompt,
+            lambda: self.llm.predict(prompt, **kwargs),
+            use_cache=self.enabled and use_cache,
+            max_tokens=getattr(self.llm, 'max_tokens', None)
+        )
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+# Process-wide cache shared by every call site
+_llm_cache: Optional[LLMResponseCache] = None
+_llm_cache_lock = threading.Lock()
+
+def get_llm_cache() -> LLMResponseCache:
+    """Return the shared LLMResponseCache, creating it on first use"""
+    global _llm_cache
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                _llm_cache = LLMResponseCache(
+                    path=os.getenv('LLM_CACHE_PATH', DEFAULT_CACHE_PATH),
+                    ttl=float(os.getenv('LLM_CACHE_TTL_SECONDS', str(7 * 24 * 3600))),
+                    max_entries=int(os.getenv('LLM_CACHE_MAX_ENTRIES', '20000')),
+                    max_bytes=int(os.getenv('LLM_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+                )
+    return _llm_cache
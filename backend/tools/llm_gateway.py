@@ -0,0 +1,456 @@
+import os
+import time
+import random
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+import httpx
+import openai
+from config.logging_config import setup_logging
+from config.llm_config import TASK_PROFILES, get_task_profile
+from tools.token_budget import count_tokens, current_usage
+
+logger = setup_logging()
+
+# Requests in flight across every model
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))
+# Requests in flight per model, e.g. "gpt-4o=4,text-embedding-ada-002=8"
+LLM_MODEL_CONCURRENCY = os.getenv('LLM_MODEL_CONCURRENCY', '')
+LLM_DEFAULT_MODEL_CONCURRENCY = int(os.getenv('LLM_DEFAULT_MODEL_CONCURRENCY', '4'))
+LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', '60'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '4'))
+LLM_BACKOFF_BASE = float(os.getenv('LLM_BACKOFF_BASE', '1.0'))
+LLM_BACKOFF_MAX = float(os.getenv('LLM_BACKOFF_MAX', '30'))
+
+def _parse_limits(spec: str) -> Dict[str, int]:
+    limits = {}
+    for item in spec.split(','):
+        if '=' in item:
+            model, limit = item.split('=', 1)
+            try:
+                limits[model.strip()] = int(limit)
+            except ValueError:
+                logger.warning(f"Ignoring invalid LLM concurrency limit '{item}'")
+    return limits
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+class LLMGateway:
+    """
+    Single entry point for OpenAI chat and embedding requests.
+
+    One pooled HTTP client is shared by every caller. Requests are bounded
+    by a global semaphore and a per-model semaphore, retried with jittered
+    exponential backoff on 429, 5xx, timeouts and connection errors, and
+    recorded in per-site latency and token metrics.
+    """
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 model_limits: Dict[str, int] = None,
+                 default_model_concurrency: int = LLM_DEFAULT_MODEL_CONCURRENCY,
+                 timeout: float = LLM_TIMEOUT_SECONDS,
+                 max_retries: int = LLM_MAX_RETRIES):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.default_model_concurrency = default_model_concurrency
+        self.model_limits = model_limits if model_limits is not None else _parse_limits(LLM_MODEL_CONCURRENCY)
+        self._global = threading.BoundedSemaphore(max_concurrency)
+        self._models: Dict[str, threading.BoundedSemaphore] = {}
+        self._http_client: Optional[httpx.Client] = None
+        self._client: Optional[openai.OpenAI] = None
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def http_client(self) -> httpx.Client:
+        """Keep-alive connection pool shared by the OpenAI and LangChain clients"""
+        if self._http_client is None:
+            with self._lock:
+                if self._http_client is None:
+                    self._http_client = httpx.Client(
+                        timeout=self.timeout,
+                        limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+                    )
+        return self._http_client
+
+    @property
+    def client(self) -> openai.OpenAI:
+        if self._client is None:
+            http_client = self.http_client
+            with self._lock:
+                if self._client is None:
+                    # Retries are handled here so they share the concurrency limits
+                    self._client = openai.OpenAI(
+                        api_key=os.getenv('OPENAI_API_KEY'),
+                        http_client=http_client,
+                        timeout=self.timeout,
+                        max_retries=0
+                    )
+        return self._client
+
+    def _model_semaphore(self, model: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            semaphore = self._models.get(model)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.model_limits.get(model, self.default_model_concurrency))
+                self._models[model] = semaphore
+            return semaphore
+
+    def record(self, site: str, model: str, latency: float, prompt_tokens: int = 0,
+               completion_tokens: int = 0, retries: int = 0, error: bool = False):
+        """Add one request to the metrics for site"""
+        with self._lock:
+            metrics = self._metrics.setdefault(site, {
+                'calls': 0, 'errors': 0, 'retries': 0, 'prompt_tokens': 0,
+                'completion_tokens': 0, 'latency_total': 0.0, 'latencies': deque(maxlen=500), 'models': set(),
+            })
+            metrics['calls'] += 1
+            metrics['errors'] += int(error)
+            metrics['retries'] += retries
+            metrics['prompt_tokens'] += prompt_tokens or 0
+            metrics['completion_tokens'] += completion_tokens or 0
+            metrics['latency_total'] += latency
+            metrics['latencies'].append(latency)
+            metrics['models'].add(model)
+
+    def _with_limits(self, model: str, request, site: str):
+        """
+        Run request under the global and per-model concurrency limits,
+        retrying transient errors with jittered backoff (or Retry-After).
+        Returns (response, retries); the final error is raised with the
+        retry count attached as gateway_retries.
+        """
+        retries = 0
+        semaphore = self._model_semaphore(model)
+        while True:
+            try:
+                with self._global, semaphore:
+                    return request(), retries
+            except Exception as e:
+                if not _is_retryable(e) or retries >= self.max_retries:
+                    e.gateway_retries = retries
+                    raise
+                delay = _retry_after(e)
+                if delay is None:
+                    # Full jitter keeps concurrent callers from retrying in lockstep
+                    delay = random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** retries))
+                retries += 1
+                logger.warning(f"LLM request for {site} failed ({type(e).__name__}), retry {retries} in {delay:.1f}s")
+                # Sleep outside the semaphores so other requests can use the slot
+                time.sleep(delay)
+
+    def _call(self, site: str, model: str, request, estimated_tokens: int = 0):
+        # Refuse calls that would take the current workflow past its budget
+        workflow_usage = current_usage()
+        if workflow_usage is not None:
+            workflow_usage.check(site, estimated_tokens)
+        started = time.monotonic()
+        try:
+            response, retries = self._with_limits(model, request, site)
+        except Exception as e:
+            self.record(site, model, time.monotonic() - started, retries=getattr(e, 'gateway_retries', 0), error=True)
+            raise
+        response_usage = getattr(response, 'usage', None)
+        self.record(
+            site, model, time.monotonic() - started,
+            prompt_tokens=getattr(response_usage, 'prompt_tokens', 0),
+            completion_tokens=getattr(response_usage, 'completion_tokens', 0),
+            retries=retries
+        )
+        if workflow_usage is not None:
+            workflow_usage.record(
+                site, model, estimated_tokens,
+                prompt_tokens=getattr(response_usage, 'prompt_tokens', 0),
+                completion_tokens=getattr(response_usage, 'completion_tokens', 0)
+            )
+        return response
+
+    def chat(self, messages: List[Dict[str, str]], model: str = None, temperature: float = 0.7,
+             max_tokens: int = None, site: str = 'default', **kwargs) -> str:
+        """Run a chat completion and return the message content"""
+        model = model or os.getenv('OPENAI_MODEL_NAME', 'gpt-4o')
+        if max_tokens is not None:
+            kwargs['max_tokens'] = max_tokens
+        estimated = sum(count_tokens(message.get('content') or "", model) + 4 for message in messages)
+        response = self._call(site, model, lambda: self.client.chat.completions.create(
+            model=model, messages=messages, temperature=temperature, **kwargs
+        ), estimated_tokens=estimated)
+        return response.choices[0].message.content
+
+    def chat_stream(self, messages: List[Dict[str, str]], model: str = None, temperature: float = 0.7,
+                    max_tokens: int = None, site: str = 'default', **kwargs) -> Iterator[str]:
+        """
+        Run a chat completion and yield the content as it is generated.
+
+        Opening the stream is retried like any other request; once tokens
+        have been yielded a failure is raised to the caller. The concurrency
+        slots are held until the stream is finished or closed.
+        """
+        model = model or os.getenv('OPENAI_MODEL_NAME', 'gpt-4o')
+        if max_tokens is not None:
+            kwargs['max_tokens'] = max_tokens
+        estimated = sum(count_tokens(message.get('content') or "", model) + 4 for message in messages)
+        usage = current_usage()
+        if usage is not None:
+            usage.check(site, estimated)
+        semaphore = self._model_semaphore(model)
+        retries = 0
+        started = time.monotonic()
+        while True:
+            self._global.acquire()
+            semaphore.acquire()
+            try:
+                stream = self.client.chat.completions.create(
+                    model=model, messages=messages, temperature=temperature, stream=True,
+                    stream_options={'include_usage': True}, **kwargs
+                )
+                break
+            except Exception as e:
+                semaphore.release()
+                self._global.release()
+                if not _is_retryable(e) or retries >= self.max_retries:
+                    self.record(site, model, time.monotonic() - started, retries=retries, error=True)
+                    raise
+                delay = _retry_after(e)
+                if delay is None:
+                    delay = random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** retries))
+                retries += 1
+                logger.warning(f"LLM stream for {site} failed ({type(e).__name__}), retry {retries} in {delay:.1f}s")
+                # Sleep outside the semaphores so other requests can use the slot
+                time.sleep(delay)
+        parts = []
+        stream_usage = None
+        try:
+            for chunk in stream:
+                if getattr(chunk, 'usage', None):
+                    stream_usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        except Exception:
+            self.record(site, model, time.monotonic() - started, retries=retries, error=True)
+            raise
+        finally:
+            semaphore.release()
+            self._global.release()
+        # The final chunk carries usage; count the text ourselves if the stream was cut short
+        prompt_tokens = getattr(stream_usage, 'prompt_tokens', estimated)
+        completion_tokens = getattr(stream_usage, 'completion_tokens', None)
+        if completion_tokens is None:
+            completion_tokens = count_tokens("".join(parts), model)
+        self.record(site, model, time.monotonic() - started, prompt_tokens=prompt_tokens,
+                    completion_tokens=completion_tokens, retries=retries)
+        workflow_usage = current_usage()
+        if workflow_usage is not None:
+            workflow_usage.record(site, model, estimated, prompt_tokens=prompt_tokens,
+                                  completion_tokens=completion_tokens)
+
+    def embed(self, texts: Union[str, Sequence[str]], model: str = 'text-embedding-ada-002',
+              site: str = 'embedding') -> List[List[float]]:
+        """Embed one text or a batch of texts, returning one vector per input"""
+        inputs = [texts] if isinstance(texts, str) else list(texts)
+        estimated = sum(count_tokens(text, model) for text in inputs)
+        response = self._call(site, model, lambda: self.client.embeddings.create(model=model, input=inputs),
+                              estimated_tokens=estimated)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    def chat_for_task(self, task: str, messages: List[Dict[str, str]], **kwargs) -> str:
+        """Run a chat completion with the model profile configured for task"""
+        profile = get_task_profile(task)
+        kwargs.setdefault('temperature', profile.get('temperature', 0.7))
+        kwargs.setdefault('max_tokens', profile.get('max_tokens'))
+        return self.chat(messages, model=profile['model'], site=task, **kwargs)
+
+    def embed_for_task(self, task: str, texts: Union[str, Sequence[str]]) -> List[List[float]]:
+        """Embed texts with the embedding model configured for task"""
+        return self.embed(texts, model=get_task_profile(task)['model'], site=task)
+
+    def langchain_chat(self, task: str = 'crew'):
+        """
+        ChatOpenAI for CrewAI agents that reuses the gateway connection pool,
+        runs every call under the gateway's concurrency limits and retry
+        policy, and reports latency and token usage to the gateway metrics.
+        """
+        profile = get_task_profile(task)
+        chat = _gateway_chat_class()(
+            model=profile['model'],
+            temperature=profile.get('temperature', 0.7),
+            api_key=os.getenv('OPENAI_API_KEY'),
+            http_client=self.http_client,
+            timeout=self.timeout,
+            # Retries happen in the gateway, outside the concurrency slots
+            max_retries=0,
+            callbacks=[_GatewayCallback(self, task)]
+        )
+        chat._gateway = self
+        chat._site = task
+        return chat
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sites = {}
+            for site, metrics in self._metrics.items():
+                latencies = sorted(metrics['latencies'])
+                sites[site] = {
+                    'calls': metrics['calls'],
+                    'errors': metrics['errors'],
+                    'retries': metrics['retries'],
+                    'prompt_tokens': metrics['prompt_tokens'],
+                    'completion_tokens': metrics['completion_tokens'],
+                    'avg_latency': round(metrics['latency_total'] / metrics['calls'], 3),
+                    'p95_latency': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+                    'models': sorted(metrics['models']),
+                }
+        return {
+            'sites': sites,
+            'calls': sum(site['calls'] for site in sites.values()),
+            'prompt_tokens': sum(site['prompt_tokens'] for site in sites.values()),
+            'completion_tokens': sum(site['completion_tokens'] for site in sites.values()),
+            'profiles': {task: get_task_profile(task) for task in TASK_PROFILES},
+        }
+
+class GatewayLLM:
+    """
+    Drop-in replacement for ChatOpenAI.predict() backed by the gateway,
+    so tools keep their llm.predict(prompt) call shape.
+    """
+
+    @classmethod
+    def for_task(cls, task: str) -> 'GatewayLLM':
+        """Build an LLM using the model profile configured for task"""
+        profile = get_task_profile(task)
+        return cls(task, model=profile['model'], temperature=profile.get('temperature', 0.7),
+                   max_tokens=profile.get('max_tokens'))
+
+    def __init__(self, site: str, model: str = None, temperature: float = 0.7,
+                 max_tokens: int = None, gateway: LLMGateway = None):
+        self.site = site
+        self.model_name = model or os.getenv('OPENAI_MODEL_NAME', 'gpt-4o')
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.gateway = gateway
+
+    def predict(self, prompt: str, **kwargs) -> str:
+        gateway = self.gateway or get_llm_gateway()
+        return gateway.chat(
+            [{"role": "user", "content": prompt}],
+            model=self.model_name,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            site=self.site,
+            **kwargs
+        )
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        """predict() that yields the completion as it is generated"""
+        gateway = self.gateway or get_llm_gateway()
+        return gateway.chat_stream(
+            [{"role": "user", "content": prompt}],
+            model=self.model_name,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            site=self.site,
+            **kwargs
+        )
+
+try:
+    from langchain_core.callbacks import BaseCallbackHandler
+except ImportError:
+    BaseCallbackHandler = object
+
+@lru_cache(maxsize=1)
+def _gateway_chat_class():
+    """ChatOpenAI subclass whose completions go through LLMGateway._with_limits"""
+    from langchain_openai import ChatOpenAI
+    from pydantic import PrivateAttr
+
+    class GatewayChatOpenAI(ChatOpenAI):
+        _gateway: Any = PrivateAttr(default=None)
+        _site: str = PrivateAttr(default='crew')
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            gateway = self._gateway or get_llm_gateway()
+            generate = super()._generate
+            result, retries = gateway._with_limits(
+                self.model_name, lambda: generate(messages, stop=stop, run_manager=run_manager, **kwargs), self._site
+            )
+            # Picked up by _GatewayCallback for the metrics
+            result.llm_output = {**(result.llm_output or {}), 'gateway_retries': retries}
+            return result
+
+    return GatewayChatOpenAI
+
+class _GatewayCallback(BaseCallbackHandler):
+    """
+    Records LangChain calls made by CrewAI agents in the gateway metrics and
+    the current workflow's token usage. Raising from on_chat_model_start
+    (raise_error=True) stops an agent loop once the workflow budget is spent.
+    """
+
+    raise_error = True
+
+    def __init__(self, gateway: LLMGateway, site: str):
+        self.gateway = gateway
+        self.site = site
+        self._started: Dict[Any, float] = {}
+        self._estimates: Dict[Any, int] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        estimated = sum(count_tokens(str(message.content)) + 4 for batch in messages for message in batch)
+        usage = current_usage()
+        if usage is not None:
+            usage.check(self.site, estimated)
+        self._estimates[run_id] = estimated
+        self._started[run_id] = time.monotonic()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        started = self._started.pop(run_id, time.monotonic())
+        estimated = self._estimates.pop(run_id, 0)
+        output = response.llm_output or {}
+        usage = output.get('token_usage') or {}
+        model = output.get('model_name', 'unknown')
+        self.gateway.record(
+            self.site, model, time.monotonic() - started,
+            prompt_tokens=usage.get('prompt_tokens', 0),
+            completion_tokens=usage.get('completion_tokens', 0),
+            retries=output.get('gateway_retries', 0)
+        )
+        workflow_usage = current_usage()
+        if workflow_usage is not None:
+            workflow_usage.record(
+                self.site, model, estimated,
+                prompt_tokens=usage.get('prompt_tokens', 0),
+                completion_tokens=usage.get('completion_tokens', 0)
+            )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._estimates.pop(run_id, None)
+        started = self._started.pop(run_id, time.monotonic())
+        self.gateway.record(self.site, 'unknown', time.monotonic() - started,
+                            retries=getattr(error, 'gateway_retries', 0), error=True)
+
+# Process-wide gateway shared by every call site
+_llm_gateway: Optional[LLMGateway] = None
+_llm_gateway_lock = threading.Lock()
+
+def get_llm_gateway() -> LLMGateway:
+    """Return the shared LLMGateway, creating it on first use"""
+    global _llm_gateway
+    if _llm_gateway is None:
+        with _llm_gateway_lock:
+            if _llm_gateway is None:
+                _llm_gateway = LLMGateway()
+    return _llm_gateway
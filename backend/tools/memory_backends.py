@@ -0,0 +1,358 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, Iterator, Optional, Sequence, Tuple
+from config.logging_config import setup_logging
+
+logger = setup_logging()
+
+# Default location for the on-disk backend, next to the workflow file cache
+DEFAULT_SQLITE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'cache', 'memory_store.sqlite3')
+
+# Article bodies longer than this many characters are kept zlib-compressed
+COMPRESS_THRESHOLD = int(os.getenv('MEMORY_STORE_COMPRESS_THRESHOLD', '4096'))
+
+class ArticleRecord:
+    """
+    Compact in-memory representation of one enriched article.
+
+    added_at is a time.monotonic() timestamp, so expiry is unaffected by
+    wall-clock changes. Content above compress_threshold characters is
+    stored as zlib-compressed UTF-8; pass 0 to disable compression.
+    """
+
+    __slots__ = ('_content', 'summary', 'key_points', 'metadata', 'added_at')
+
+    def __init__(self, content: str, summary: str = "", key_points: Sequence[str] = (),
+                 metadata: Dict[str, Any] = None, added_at: float = None,
+                 compress_threshold: int = COMPRESS_THRESHOLD):
+        content = content or ""
+        if compress_threshold and len(content) > compress_threshold:
+            self._content = zlib.compress(content.encode('utf-8'))
+        else:
+            self._content = content
+        self.summary = summary or ""
+        self.key_points = tuple(key_points)
+        self.metadata = metadata or None
+        self.added_at = time.monotonic() if added_at is None else added_at
+
+    @property
+    def content(self) -> str:
+        if isinstance(self._content, bytes):
+            return zlib.decompress(self._content).decode('utf-8')
+        return self._content
+
+    @property
+    def compressed(self) -> bool:
+        return isinstance(self._content, bytes)
+
+    @property
+    def size(self) -> int:
+        """Approximate payload size in bytes, used for capacity accounting"""
+        size = len(self._content) + len(self.summary) + sum(len(point) for point in self.key_points)
+        if self.metadata:
+            size += sum(len(str(key)) + len(str(value)) for key, value in self.metadata.items())
+        return size
+
+    def age(self) -> float:
+        """Seconds since the record was added"""
+        return time.monotonic() - self.added_at
+
+class MemoryBackend(ABC):
+    """
+    Storage interface used by MemoryStore.
+
+    Backends map article URLs to ArticleRecord objects and must implement
+    get, set, delete, items and __len__.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def get(self, url: str) -> Optional[ArticleRecord]:
+        ...
+
+    @abstractmethod
+    def set(self, url: str, record: ArticleRecord) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, url: str) -> None:
+        ...
+
+    def contains(self, url: str) -> bool:
+        return self.get(url) is not None
+
+    def get_many(self, urls: Iterable[str]) -> Dict[str, ArticleRecord]:
+        """Records for the given URLs; URLs that are not stored are left out"""
+        records = {}
+        for url in urls:
+            record = self.get(url)
+            if record is not None:
+                records[url] = record
+        return records
+
+    @abstractmethod
+    def items(self) -> Iterator[Tuple[str, ArticleRecord]]:
+        ...
+
+    def expire_older_than(self, max_age: float) -> int:
+        """Delete records older than max_age seconds and return how many were removed"""
+        expired = [url for url, record in self.items() if record.age() > max_age]
+        for url in expired:
+            self.delete(url)
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'entries': len(self)}
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+class InMemoryBackend(MemoryBackend):
+    """
+    Process-local backend with LRU eviction.
+
+    The backend is bounded both by entry count and by the approximate size
+    of the stored text, evicting least recently used entries first.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 5000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._records: "OrderedDict[str, ArticleRecord]" = OrderedDict()
+        self._total_bytes = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._lock = threading.RLock()
+
+    def get(self, url: str) -> Optional[ArticleRecord]:
+        with self._lock:
+            record = self._records.get(url)
+            if record is not None:
+                self._records.move_to_end(url)
+            return record
+
+    def set(self, url: str, record: ArticleRecord) -> None:
+        with self._lock:
+            self._remove(url)
+            self._records[url] = record
+            self._total_bytes += record.size
+            self._evict()
+
+    def delete(self, url: str) -> None:
+        with self._lock:
+            self._remove(url)
+
+    def contains(self, url: str) -> bool:
+        with self._lock:
+            return url in self._records
+
+    def get_many(self, urls: Iterable[str]) -> Dict[str, ArticleRecord]:
+        with self._lock:
+            records = {}
+            for url in urls:
+                record = self._records.get(url)
+                if record is not None:
+                    self._records.move_to_end(url)
+                    records[url] = record
+            return records
+
+    def items(self) -> Iterator[Tuple[str, ArticleRecord]]:
+        with self._lock:
+            return iter(list(self._records.items()))
+
+    def expire_older_than(self, max_age: float) -> int:
+        cutoff = time.monotonic() - max_age
+        with self._lock:
+            expired = [url for url, record in self._records.items() if record.added_at < cutoff]
+            for url in expired:
+                self._remove(url)
+            self._expirations += len(expired)
+            return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._records),
+                'bytes': self._total_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._records)
+
+    def _remove(self, url: str) -> None:
+        record = self._records.pop(url, None)
+        if record is not None:
+            self._total_bytes -= record.size
+
+    def _evict(self) -> None:
+        # Always keep the newest record, even if it alone exceeds max_bytes
+        while len(self._records) > 1 and (
+            len(self._records) > self.max_entries or self._total_bytes > self.max_bytes
+        ):
+            _, record = self._records.popitem(last=False)
+            self._total_bytes -= record.size
+            self._evictions += 1
+
+class SQLiteBackend(MemoryBackend):
+    """
+    Persistent file-backed backend that survives restarts and is shared by
+    every uvicorn worker on the host.
+
+    The database runs in WAL mode so readers in any process never block the
+    writer, and each thread keeps its own connection. Timestamps are stored
+    as wall-clock epoch seconds and converted to the local monotonic clock
+    on read.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH, busy_timeout: float = 5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        conn = self._connection()
+        # WAL is a property of the database file, so one process setting it is enough
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS memory_articles (
+                url TEXT PRIMARY KEY,
+                content TEXT,
+                metadata TEXT,
+                summary TEXT,
+                key_points TEXT,
+                added_at REAL NOT NULL
+            )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_memory_articles_added_at ON memory_articles(added_at)")
+        conn.commit()
+        logger.info(f"SQLite memory backend opened at {path}")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout)
+            # NORMAL is durable across application crashes in WAL mode and avoids an fsync per commit
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row_to_record(row) -> ArticleRecord:
+        return ArticleRecord(
+            content=row[0],
+            metadata=json.loads(row[1]) if row[1] else None,
+            summary=row[2],
+            key_points=json.loads(row[3]) if row[3] else (),
+            added_at=time.monotonic() - (time.time() - row[4]),
+        )
+
+    def get(self, url: str) -> Optional[ArticleRecord]:
+        row = self._connection().execute(
+            "SELECT content, metadata, summary, key_points, added_at FROM memory_articles WHERE url = ?",
+            (url,)
+        ).fetchone()
+        return self._row_to_record(row) if row else None
+
+    def set(self, url: str, record: ArticleRecord) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO memory_articles (url, content, metadata, summary, key_points, added_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    record.content,
+                    json.dumps(record.metadata or {}),
+                    record.summary,
+                    json.dumps(list(record.key_points)),
+                    time.time() - record.age(),
+                )
+            )
+
+    def delete(self, url: str) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM memory_articles WHERE url = ?", (url,))
+
+    def contains(self, url: str) -> bool:
+        row = self._connection().execute("SELECT 1 FROM memory_articles WHERE url = ?", (url,)).fetchone()
+        return row is not None
+
+    def get_many(self, urls: Iterable[str]) -> Dict[str, ArticleRecord]:
+        urls = list(dict.fromkeys(urls))
+        conn = self._connection()
+        records = {}
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(urls), 500):
+            chunk = urls[start:start + 500]
+            rows = conn.execute(
+                "SELECT url, content, metadata, summary, key_points, added_at FROM memory_articles "
+                f"WHERE url IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall()
+            for row in rows:
+                records[row[0]] = self._row_to_record(row[1:])
+        return records
+
+    def items(self) -> Iterator[Tuple[str, ArticleRecord]]:
+        rows = self._connection().execute(
+            "SELECT url, content, metadata, summary, key_points, added_at FROM memory_articles"
+        ).fetchall()
+        return iter([(row[0], self._row_to_record(row[1:])) for row in rows])
+
+    def expire_older_than(self, max_age: float) -> int:
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute("DELETE FROM memory_articles WHERE added_at < ?", (time.time() - max_age,))
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        size = 0
+        for suffix in ('', '-wal'):
+            try:
+                size += os.path.getsize(self.path + suffix)
+            except OSError:
+                pass
+        return {'entries': len(self), 'bytes': size, 'path': self.path}
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM memory_articles").fetchone()[0]
+
+def create_backend(kind: str = None) -> MemoryBackend:
+    """
+    Create the backend selected by MEMORY_STORE_BACKEND: memory (default)
+    or sqlite, which persists articles to MEMORY_STORE_PATH across restarts.
+    """
+    kind = (kind or os.getenv('MEMORY_STORE_BACKEND', 'memory')).lower()
+
+    if kind == 'sqlite':
+        try:
+            return SQLiteBackend(os.getenv('MEMORY_STORE_PATH', DEFAULT_SQLITE_PATH))
+        except Exception as e:
+            logger.error(f"Error opening SQLite memory backend, falling back to in-memory: {str(e)}")
+            kind = 'memory'
+
+    if kind != 'memory':
+        logger.warning(f"Unknown memory backend '{kind}', using in-memory backend")
+    return InMemoryBackend(
+        max_entries=int(os.getenv('MEMORY_STORE_MAX_ENTRIES', '5000')),
+        max_bytes=int(os.getenv('MEMORY_STORE_MAX_BYTES', str(64 * 1024 * 1024)))
+    )
@@ -1,99 +1,206 @@
-from typing import Dict, List, Optional
-import numpy as np
-from datetime import datetime, timedelta
-from langchain_openai import ChatOpenAI
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+from datetime import timedelta
 from config.logging_config import setup_logging
+from tools.memory_backends import ArticleRecord, MemoryBackend, create_backend
+from tools.article_enrichment import EnrichmentRouter
+from tools.llm_cache import CachingLLM
+from tools.llm_gateway import GatewayLLM
 
 logger = setup_logging()
 
 class MemoryStore:
-    def __init__(self, retention_period: int = 30):
+    def __init__(self, retention_period: int = 30, backend: MemoryBackend = None, expiry_interval: float = 60):
         """
-        Initialize memory store with retention period in minutes
+        Initialize memory store with retention period in minutes.
+
+        Expired entries are removed by a background timer every
+        expiry_interval seconds, started when the first article is stored;
+        pass 0 to disable it.
         """
-        self.articles: Dict[str, Dict] = {}  # URL -> article data
-        self.summaries: Dict[str, str] = {}  # URL -> summary
-        self.key_points: Dict[str, List[str]] = {}  # URL -> list of key points
+        self.backend = backend if backend is not None else create_backend()
         self.retention_period = timedelta(minutes=retention_period)
-        self.llm = ChatOpenAI(temperature=0.7)
-        
+        self.llm = CachingLLM(GatewayLLM.for_task('article_enrichment'), site='article_enrichment')
+        self.enricher = EnrichmentRouter(self.llm)
+        self._pending = set()
+        self._pending_lock = threading.Lock()
+        self._stats = {
+            'summary_hits': 0,
+            'summary_misses': 0,
+            'key_point_hits': 0,
+            'key_point_misses': 0,
+            'articles_enriched': 0,
+            'articles_reused': 0,
+        }
+        self._stats_lock = threading.Lock()
+        self.expiry_interval = expiry_interval
+        self._expiry_stop = threading.Event()
+        self._expiry_thread = None
+        self._expiry_lock = threading.Lock()
+
+    def _record(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def _claim(self, url: str) -> bool:
+        """Mark url as being enriched; False if it is already stored or in flight"""
+        # Concurrent workflows may fetch the same article; only one enriches it
+        with self._pending_lock:
+            if url in self._pending or self.backend.contains(url):
+                logger.info(f"Article {url} already in memory")
+                self._record('articles_reused')
+                return False
+            self._pending.add(url)
+            return True
+
+    def _release(self, urls: List[str]):
+        with self._pending_lock:
+            self._pending.difference_update(urls)
+
+    def _store(self, url: str, content: str, metadata: Optional[Dict], enrichment: Optional[Dict]) -> ArticleRecord:
+        enrichment = enrichment or {}
+        record = ArticleRecord(
+            content=content,
+            summary=enrichment.get('summary', ""),
+            key_points=enrichment.get('key_points', ()),
+            metadata=metadata,
+        )
+        self.backend.set(url, record)
+        if self.expiry_interval and self._expiry_thread is None:
+            self._start_expiry_timer(self.expiry_interval)
+        self._record('articles_enriched')
+        logger.info(f"Added article {url} to memory")
+        return record
+
     def add_article(self, url: str, content: str, metadata: Dict = None):
         """
         Add article content to memory with metadata
         """
-        if url in self.articles:
-            logger.info(f"Article {url} already in memory")
+        if not self._claim(url):
             return
 
-        # Create summary and extract key points
+        # Summary and key points come back from a single call
         try:
-            summary = self._create_summary(content)
-            key_points = self._extract_key_points(content)
-            
-            self.articles[url] = {
-                'content': content,
-                'metadata': metadata or {},
-                'added_at': datetime.now(),
-            }
-            self.summaries[url] = summary
-            self.key_points[url] = key_points
-            
-            logger.info(f"Added article {url} to memory")
+            try:
+                enrichment = self.enricher.enrich([(url, content)]).get(url)
+            except Exception as e:
+                logger.error(f"Error enriching article {url}: {str(e)}")
+                enrichment = None
+            self._store(url, content, metadata, enrichment)
         except Exception as e:
             logger.error(f"Error processing article {url}: {str(e)}")
+        finally:
+            self._release([url])
+
+    def add_articles(self, articles: List[Tuple[str, str, Optional[Dict]]]) -> Dict[str, ArticleRecord]:
+        """
+        Add several (url, content, metadata) articles, enriching them in
+        batched calls packed up to the enrichment token budget.
+
+        Returns the records stored by this call, keyed by URL.
+        """
+        stored: Dict[str, ArticleRecord] = {}
+        claimed = [(url, content, metadata) for url, content, metadata in articles if self._claim(url)]
+        if not claimed:
+            return stored
+
+        try:
+            try:
+                results = self.enricher.enrich([(url, content) for url, content, _ in claimed])
+            except Exception as e:
+                logger.error(f"Error enriching {len(claimed)} articles: {str(e)}")
+                results = {}
+            for url, content, metadata in claimed:
+                try:
+                    stored[url] = self._store(url, content, metadata, results.get(url))
+                except Exception as e:
+                    logger.error(f"Error processing article {url}: {str(e)}")
+        finally:
+            self._release([url for url, _, _ in claimed])
+        return stored
 
     def get_article_summary(self, url: str) -> Optional[str]:
         """Get summary for a specific article"""
-        return self.summaries.get(url)
+        record = self.backend.get(url)
+        self._record('summary_hits' if record else 'summary_misses')
+        return record.summary if record else None
 
     def get_article_key_points(self, url: str) -> List[str]:
         """Get key points for a specific article"""
-        return self.key_points.get(url, [])
+        record = self.backend.get(url)
+        self._record('key_point_hits' if record else 'key_point_misses')
+        return list(record.key_points) if record else []
+
+    def get_key_points_many(self, urls: List[str]) -> Dict[str, List[str]]:
+        """Get key points for many articles with one backend lookup"""
+        records = self.backend.get_many(url for url in urls if url)
+        hits = sum(1 for url in urls if url in records)
+        self._record('key_point_hits', hits)
+        self._record('key_point_misses', len(urls) - hits)
+        return {url: list(records[url].key_points) if url in records else [] for url in urls}
 
     def get_all_summaries(self) -> Dict[str, str]:
         """Get all article summaries"""
         self._cleanup_old_entries()
-        return self.summaries
+        return {url: record.summary for url, record in self.backend.items()}
 
     def get_all_key_points(self) -> Dict[str, List[str]]:
         """Get all article key points"""
         self._cleanup_old_entries()
-        return self.key_points
+        return {url: list(record.key_points) for url, record in self.backend.items()}
 
-    def _create_summary(self, content: str, max_length: int = 200) -> str:
-        """Create a concise summary of the article content"""
-        try:
-            prompt = f"Summarize this article in about 200 words:\n\n{content}"
-            response = self.llm.predict(prompt)
-            return response[:max_length]
-        except Exception as e:
-            logger.error(f"Error creating summary: {str(e)}")
-            return ""
+    def get_stats(self) -> Dict[str, object]:
+        """Get hit/miss counters and backend size/eviction statistics"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['key_point_hits'] + stats['key_point_misses']
+        stats['key_point_hit_rate'] = round(stats['key_point_hits'] / lookups, 3) if lookups else 0.0
+        stats['backend'] = self.backend.name
+        stats.update(self.backend.stats())
+        stats['enrichment'] = self.enricher.get_stats()
+        return stats
 
-    def _extract_key_points(self, content: str, max_points: int = 5) -> List[str]:
-        """Extract key points from the article content"""
-        try:
-            prompt = f"Extract {max_points} key points from this article:\n\n{content}"
-            response = self.llm.predict(prompt)
-            points = [point.strip() for point in response.split('\n') if point.strip()]
-            return points[:max_points]
-        except Exception as e:
-            logger.error(f"Error extracting key points: {str(e)}")
-            return []
+    def close(self):
+        """Stop the background expiry timer"""
+        self._expiry_stop.set()
+        if self._expiry_thread is not None:
+            self._expiry_thread.join(timeout=5)
 
     def _cleanup_old_entries(self):
         """Remove entries older than retention period"""
-        current_time = datetime.now()
-        urls_to_remove = []
-        
-        for url, data in self.articles.items():
-            if current_time - data['added_at'] > self.retention_period:
-                urls_to_remove.append(url)
-        
-        for url in urls_to_remove:
-            self.articles.pop(url, None)
-            self.summaries.pop(url, None)
-            self.key_points.pop(url, None)
-            
-        if urls_to_remove:
-            logger.info(f"Cleaned up {len(urls_to_remove)} old entries from memory") 
\ No newline at end of file
+        removed = self.backend.expire_older_than(self.retention_period.total_seconds())
+
+        if removed:
+            logger.info(f"Cleaned up {removed} old entries from memory")
+
+    def _start_expiry_timer(self, interval: float):
+        """Run _cleanup_old_entries periodically on a daemon thread"""
+        def run():
+            while not self._expiry_stop.wait(interval):
+                try:
+                    self._cleanup_old_entries()
+                except Exception as e:
+                    logger.error(f"Error expiring memory entries: {str(e)}")
+
+        with self._expiry_lock:
+            if self._expiry_thread is None:
+                self._expiry_thread = threading.Thread(target=run, name="memory-store-expiry", daemon=True)
+                self._expiry_thread.start()
+
+# Process-wide store shared by every tool
+_memory_store: Optional[MemoryStore] = None
+_memory_store_lock = threading.Lock()
+
+def get_memory_store() -> MemoryStore:
+    """Return the shared MemoryStore, creating it on first use"""
+    global _memory_store
+    if _memory_store is None:
+        with _memory_store_lock:
+            if _memory_store is None:
+                _memory_store = MemoryStore(
+                    retention_period=int(os.getenv('MEMORY_STORE_RETENTION_MINUTES', '60')),
+                    expiry_interval=float(os.getenv('MEMORY_STORE_EXPIRY_INTERVAL', '60'))
+                )
+                logger.info("Initialized shared memory store", extra={'extra_data': {'backend': _memory_store.backend.name}})
+    return _memory_store
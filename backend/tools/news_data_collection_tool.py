@@ -8,7 +8,8 @@ from bs4 import BeautifulSoup
 import requests
 from typing import Optional, List, Dict, Any
 from tools.supabase_client import supabase
-from tools.memory_store import MemoryStore
+from tools.enrichment_queue import get_enrichment_queue
+from tools.trend_engine import get_trend_engine
 from config.logging_config import setup_logging
 import traceback
 import time
@@ -17,7 +18,8 @@ from datetime import datetime
 # Initialize components
 logger = setup_logging()
 newsapi = NewsApiClient(api_key=os.getenv('NEWS_API_KEY'))
-memory_store = MemoryStore(retention_period=60)  # 60 minutes retention
+enrichment_queue = get_enrichment_queue()  # Enriches into the shared memory store
+trend_engine = get_trend_engine()  # Hourly term rollups for burst detection
 
 VALID_CATEGORIES = {
     'technology', 'culture', 'business', 'fashion', 
@@ -157,17 +159,6 @@ class FetchNewsTool(BaseTool):
                     # Scrape full content
                     full_content = scrape_full_content(article['url'])
                     
-                    # Store in memory for analysis
-                    memory_store.add_article(
-                        article['url'], 
-                        full_content,
-                        metadata={
-                            'title': article['title'],
-                            'description': article['description'],
-                            'category': category
-                        }
-                    )
-
                     # Prepare article data
                     new_article = {
                         'source': article['source']['name'],
@@ -191,12 +182,27 @@ class FetchNewsTool(BaseTool):
                     if result.data:
                         saved_articles.append(result.data[0])
                         logger.info(f"Saved article: {article['title']}")
+
+                        # Summaries and key points are produced in the background
+                        enrichment_queue.enqueue(
+                            article['url'],
+                            full_content,
+                            metadata={
+                                'title': article['title'],
+                                'description': article['description'],
+                                'category': category
+                            }
+                        )
                 except Exception as article_error:
                     logger.error(f"Error processing article: {str(article_error)}")
                     logger.error(traceback.format_exc())
                     continue  # Skip this article and continue with the next one
             
             logger.info(f"Saved {len(saved_articles)} new articles")
+            try:
+                trend_engine.ingest(saved_articles)
+            except Exception as e:
+                logger.error(f"Error updating trend rollups: {str(e)}")
             return saved_articles
             
         except Exception as e:
@@ -2,8 +2,8 @@ from crewai.tools import BaseTool
 from typing import Dict, Any, List, Optional
 from tools.supabase_client import supabase
 from tools.vector_embedding_tool import vector_embedding_tool
+from tools.llm_gateway import get_llm_gateway
 from config.logging_config import setup_logging
-import openai
 import os
 import json
 import traceback
@@ -93,8 +93,11 @@ class RAGTool(BaseTool):
                     "source": "keyword_search"
                 }
             
-            # Get the full blog posts for the matched embeddings
-            blog_ids = [match['blog_id'] for match in search_result['matches']]
+            # Get the full blog posts for the matched embeddings (best chunk per blog)
+            matches = {}
+            for match in search_result['matches']:
+                matches.setdefault(match['blog_id'], match)
+            blog_ids = list(matches)
             
             if not blog_ids:
                 return {"error": "No matching blog posts found"}
@@ -104,8 +107,19 @@ class RAGTool(BaseTool):
             if not blogs_result.data:
                 return {"error": "Failed to retrieve blog posts"}
             
+            # Keep the similarity order and the section that matched the query
+            blogs_by_id = {blog['id']: blog for blog in blogs_result.data}
+            blog_posts = []
+            for blog_id in blog_ids:
+                if blog_id in blogs_by_id:
+                    blog_posts.append({
+                        **blogs_by_id[blog_id],
+                        "matched_section": matches[blog_id].get('content'),
+                        "matched_heading": matches[blog_id].get('heading')
+                    })
+            
             return {
-                "blog_posts": blogs_result.data,
+                "blog_posts": blog_posts,
                 "source": "vector_search"
             }
             
@@ -117,9 +131,6 @@ class RAGTool(BaseTool):
     def _generate_answer(self, query: str, context: Dict[str, Any], chat_history: List[Dict[str, str]]) -> str:
         """Generate an answer using the context and chat history"""
         try:
-            # Ensure API key is set
-            openai.api_key = os.getenv('OPENAI_API_KEY')
-            
             # Prepare the context
             blog_posts = context.get('blog_posts', [])
             
@@ -130,7 +141,13 @@ class RAGTool(BaseTool):
             context_text = ""
             for i, post in enumerate(blog_posts):
                 context_text += f"Blog {i+1}: {post.get('title', 'Untitled')}\n"
-                context_text += f"Content: {post.get('content', 'No content')[:1000]}...\n\n"
+                if post.get('matched_section'):
+                    # The section the vector search matched is the most relevant part of the post
+                    if post.get('matched_heading'):
+                        context_text += f"Section: {post['matched_heading']}\n"
+                    context_text += f"Content: {post['matched_section']}\n\n"
+                else:
+                    context_text += f"Content: {post.get('content', 'No content')[:1000]}...\n\n"
             
             # Format the chat history
             history_text = ""
@@ -158,17 +175,10 @@ class RAGTool(BaseTool):
             """
             
             # Generate the answer
-            response = openai.chat.completions.create(
-                model=os.getenv('OPENAI_MODEL_NAME', 'gpt-4o'),
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.7,
-                max_tokens=1000
-            )
-            
-            answer = response.choices[0].message.content
+            answer = get_llm_gateway().chat_for_task('rag_chat', [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ])
             
             return answer
             
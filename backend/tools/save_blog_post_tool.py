@@ -1,10 +1,19 @@
 from crewai.tools import BaseTool
-from typing import List, Dict, Any
+from typing import Iterator, List, Dict, Any, Optional, Tuple
 from tools.supabase_client import supabase
-from tools.memory_store import MemoryStore
-from langchain_openai import ChatOpenAI
+from tools.memory_store import get_memory_store
+from tools.llm_cache import CachingLLM
+from tools.llm_gateway import GatewayLLM
+from tools.token_budget import current_usage
+from tools.blog_task_queue import get_blog_task_queue
+from tools.blog_rendering import blog_display_fields
 from config.logging_config import setup_logging
+import os
 import json
+import re
+import threading
+import contextvars
+from contextlib import contextmanager
 from datetime import datetime
 import traceback
 
@@ -25,24 +34,180 @@ except ImportError:
     get_image_for_blog = None
 
 logger = setup_logging()
-llm = ChatOpenAI(temperature=0.7)
-memory_store = MemoryStore()
+llm = CachingLLM(GatewayLLM.for_task('blog_generation'), site='blog_generation')
+# Streamed generations are not cached
+stream_llm = GatewayLLM.for_task('blog_generation')
+memory_store = get_memory_store()
+blog_task_queue = get_blog_task_queue()
 
-def generate_blog_content(trend_data: Dict[str, Any], articles: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """Generate blog content based on trend analysis and articles"""
+def fill_blog_image(blog_id: str, payload: Dict[str, Any]):
+    """Look up an image for a saved blog and store its URL"""
+    image_url = get_image_for_blog(payload['title'], payload['content'], payload['image_category'])
+    supabase.table('blogs').update({'image_url': image_url}).eq('id', blog_id).execute()
+    logger.info(f"Generated image URL for blog {blog_id}: {image_url}")
+
+def create_blog_embedding(blog_id: str, payload: Dict[str, Any]):
+    """Create vector embeddings for a saved blog"""
+    embedding_result = vector_embedding_tool._run(
+        blog_id=blog_id,
+        content=payload['content'],
+        title=payload['title'],
+        operation="create"
+    )
+    if isinstance(embedding_result, dict) and "error" in embedding_result:
+        raise RuntimeError(embedding_result['error'])
+
+if get_image_for_blog:
+    blog_task_queue.register('blog_image', fill_blog_image)
+if vector_embedding_tool:
+    blog_task_queue.register('blog_embedding', create_blog_embedding)
+
+def schedule_post_save_tasks(blog: Dict[str, Any], image_category: str) -> Dict[str, str]:
+    """Queue image lookup and embeddings for a committed blog; returns task ids by kind"""
+    payload = {'title': blog['title'], 'content': blog['content'], 'image_category': image_category}
+    tasks = {}
+    if get_image_for_blog:
+        tasks['blog_image'] = blog_task_queue.enqueue('blog_image', blog['id'], payload)
+    if vector_embedding_tool:
+        tasks['blog_embedding'] = blog_task_queue.enqueue('blog_embedding', blog['id'], payload)
+    return tasks
+
+def save_blog(new_blog: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """
+    Insert a blog unless one with the same normalized title, or from the
+    same workflow run, exists.
+
+    One insert_blog RPC call (INSERT ... ON CONFLICT), so concurrent
+    workflows cannot both write the same post. Returns the stored row and
+    whether this call created it.
+    """
+    result = supabase.rpc('insert_blog', {'p_blog': new_blog}).execute()
+    if not result.data or not result.data.get('blog'):
+        return None, False
+    return result.data['blog'], bool(result.data.get('created'))
+
+class BlogStage:
+    """
+    The blog stage of one workflow run.
+
+    The content creator may call create_blog_post during its reasoning loop
+    and the task callback saves its final answer afterwards; whichever
+    commits first wins and later calls get that result back, so a run
+    writes, images and embeds one blog. run_id is stored with the blog as
+    an idempotency key, which also covers calls from other processes.
+    """
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.result: Optional[Dict[str, Any]] = None
+        self.lock = threading.Lock()
+
+_current_blog_stage: contextvars.ContextVar[Optional[BlogStage]] = contextvars.ContextVar('blog_stage', default=None)
+
+def current_blog_stage() -> Optional[BlogStage]:
+    """The BlogStage of the workflow running in this context, if any"""
+    return _current_blog_stage.get()
+
+@contextmanager
+def blog_stage(run_id: str) -> Iterator[BlogStage]:
+    """Commit at most one blog for run_id inside the block"""
+    token = _current_blog_stage.set(BlogStage(run_id))
     try:
-        # Extract article titles and URLs for reference
-        article_refs = []
-        for i, article in enumerate(articles[:5]):  # Use top 5 articles
-            title = article.get('title', f'Article {i+1}')
-            url = article.get('url', '')
-            article_refs.append(f"{title} - {url}")
+        yield _current_blog_stage.get()
+    finally:
+        _current_blog_stage.reset(token)
+
+def commit_blog(new_blog: Dict[str, Any], image_category: str, message: str) -> Dict[str, Any]:
+    """Save new_blog and queue its image and embeddings, only when this call created it"""
+    stage = current_blog_stage()
+    if stage is not None:
+        new_blog = {**new_blog, "workflow_run_id": stage.run_id}
+    # Rendered HTML, excerpt and reading time are stored with the post
+    new_blog = {**new_blog, **blog_display_fields(new_blog.get('content'))}
+    logger.info(f"Saving blog post: {new_blog['title']}")
+    try:
+        saved, created = save_blog(new_blog)
+        
+        if not saved:
+            logger.error("Failed to save blog post")
+            return {
+                "status": "error",
+                "message": "Failed to save blog post",
+                "blog": new_blog
+            }
         
-        article_references = "\n".join(article_refs)
+        if not created:
+            if stage is not None and saved.get('workflow_run_id') == stage.run_id:
+                logger.info(f"Blog post for workflow run {stage.run_id} already saved with ID: {saved['id']}")
+                result = {
+                    "status": "success",
+                    "message": "Blog post already saved for this workflow run",
+                    "blog": saved,
+                    "tasks": {}
+                }
+                stage.result = result
+                return result
+            logger.warning(f"Blog post with title '{new_blog['title']}' already exists")
+            return {
+                "status": "duplicate",
+                "message": f"Blog post with title '{new_blog['title']}' already exists",
+                "blog": saved
+            }
         
-        # Create prompt for blog generation with clearer JSON formatting instructions
-        # and without the summary field which is not in our database schema
-        prompt = f"""Create a comprehensive blog post based on the following trend analysis and articles:
+        logger.info(f"Blog post saved successfully with ID: {saved['id']}")
+        
+        # Image lookup and embeddings run off the request path
+        tasks = {}
+        try:
+            tasks = schedule_post_save_tasks(saved, image_category)
+        except Exception as task_error:
+            logger.error(f"Error scheduling post-save tasks: {str(task_error)}")
+            logger.error(traceback.format_exc())
+        
+        result = {
+            "status": "success",
+            "message": message,
+            "blog": saved,
+            "tasks": tasks
+        }
+        if stage is not None:
+            stage.result = result
+        return result
+    except Exception as db_error:
+        logger.error(f"Database error saving blog post: {str(db_error)}")
+        logger.error(traceback.format_exc())
+        return {
+            "status": "error",
+            "message": f"Database error: {str(db_error)}",
+            "blog": new_blog
+        }
+
+# Remaining blog_generation budget below which the prompt is trimmed
+BLOG_LOW_BUDGET_TOKENS = int(os.getenv('BLOG_LOW_BUDGET_TOKENS', '6000'))
+
+def blog_brief(trend_data: Dict[str, Any], articles: List[Dict[str, Any]]) -> str:
+    """What the blog post should cover, shared by the JSON and streamed markdown prompts"""
+    # Near the end of a workflow budget, reference fewer articles without summaries
+    usage = current_usage()
+    remaining = usage.remaining('blog_generation') if usage is not None else None
+    degraded = remaining is not None and remaining < BLOG_LOW_BUDGET_TOKENS
+    if degraded:
+        usage.degrade('blog_generation', "3 article references without summaries")
+
+    # Extract article titles and URLs for reference
+    article_refs = []
+    for i, article in enumerate(articles[:3 if degraded else 5]):  # Top 5 articles, 3 when the budget is degraded
+        title = article.get('title', f'Article {i+1}')
+        url = article.get('url', '')
+        summary = memory_store.get_article_summary(url) if url and not degraded else None
+        if summary:
+            article_refs.append(f"{title} - {url}\n  Summary: {summary}")
+        else:
+            article_refs.append(f"{title} - {url}")
+    
+    article_references = "\n".join(article_refs)
+    
+    return f"""Create a comprehensive blog post based on the following trend analysis and articles:
 
         Trend Analysis:
         - Themes: {', '.join(trend_data.get('themes', ['Technology Trends']))}
@@ -58,14 +223,21 @@ def generate_blog_content(trend_data: Dict[str, Any], articles: List[Dict[str, A
         2. Well-structured content with headings
         3. Key insights and analysis
         4. Future implications
+"""
 
+def generate_blog_content(trend_data: Dict[str, Any], articles: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Generate blog content based on trend analysis and articles"""
+    try:
+        # Create prompt for blog generation with clearer JSON formatting instructions
+        # and without the summary field which is not in our database schema
+        prompt = blog_brief(trend_data, articles) + """
         IMPORTANT: You must format your response as a valid JSON object with the following structure:
-        {{
+        {
             "title": "Your blog post title here",
             "content": "Your full blog post content here in markdown format",
             "category": "The main category of the blog post",
             "image_prompt": "A prompt for generating an image that represents the blog post"
-        }}
+        }
 
         DO NOT include a 'summary' field in your JSON response as it's not supported by our database schema.
         Ensure your response is properly formatted as JSON with quotes around keys and values.
@@ -131,12 +303,44 @@ def generate_blog_content(trend_data: Dict[str, Any], articles: List[Dict[str, A
             "image_prompt": "Error visualization"
         }
 
+def stream_blog_content(trend_data: Dict[str, Any], articles: List[Dict[str, Any]]) -> Iterator[str]:
+    """Generate the blog as markdown, yielding text as the model writes it"""
+    prompt = blog_brief(trend_data, articles) + """
+        Write the blog post in markdown. Start with the title as a single '# ' heading
+        on the first line, followed by the content. Do not wrap the post in JSON or code fences.
+        """
+    return stream_llm.stream(prompt)
+
+def parse_markdown_blog(text: str, default_title: str) -> Dict[str, str]:
+    """Split a streamed markdown post into its title and content"""
+    text = text.strip()
+    title_match = re.match(r'#\s*(.+?)\s*(?:\n|$)', text)
+    if title_match:
+        return {"title": title_match.group(1).strip(), "content": text[title_match.end():].strip()}
+    return {"title": default_title, "content": text}
+
+def average_trend_score(articles: List[Dict[str, Any]]) -> float:
+    """Mean trend score of the articles a blog is based on"""
+    scores = [article.get('trend_score', 1.0) for article in articles if isinstance(article, dict)]
+    return sum(scores) / len(scores) if scores else 1.0
+
 class CreateBlogPostTool(BaseTool):
     name: str = "create_blog_post"
     description: str = "Create and save a blog post based on trend analysis"
     
     def _run(self, topic: str = None, category: str = None, trend_analysis: Dict[str, Any] = None, final_answer: str = None) -> Dict[str, Any]:
         """Run the tool with the given inputs"""
+        stage = current_blog_stage()
+        if stage is None:
+            return self._create(topic, category, trend_analysis, final_answer)
+        # One commit per workflow run: later calls return the committed blog
+        with stage.lock:
+            if stage.result is not None:
+                logger.info(f"Blog post already committed for workflow run {stage.run_id}, skipping")
+                return stage.result
+            return self._create(topic, category, trend_analysis, final_answer)
+    
+    def _create(self, topic: str = None, category: str = None, trend_analysis: Dict[str, Any] = None, final_answer: str = None) -> Dict[str, Any]:
         try:
             logger.info(f"create_blog_post running with topic: {topic}, category: {category}")
             
@@ -146,81 +350,19 @@ class CreateBlogPostTool(BaseTool):
                 title = f"{topic if topic else 'Technology'} Trends Analysis"
                 content = final_answer
                 
-                # Get a relevant image URL for the blog post
-                image_url = None
-                if get_image_for_blog:
-                    try:
-                        image_url = get_image_for_blog(title, content, category if category else "Technology")
-                        logger.info(f"Generated image URL: {image_url}")
-                    except Exception as e:
-                        logger.error(f"Error getting image URL: {str(e)}")
-                
-                # Create blog post directly from final answer - without summary field
+                # Create blog post directly from final answer - without summary field.
+                # The image URL is filled in in the background after the save.
                 new_blog = {
                     "title": title,
                     "content": content,
                     "category": category if category else "technology",
-                    "image_url": image_url,
+                    "image_url": None,
                     "trend_score": 1.0,
                     "created_at": datetime.now().isoformat()
                 }
                 
-                # Save to Supabase
-                logger.info(f"Saving blog post from final answer: {title}")
-                try:
-                    # Check for duplicate title
-                    existing = supabase.table('blogs').select('id').eq('title', title).execute()
-                    if existing.data:
-                        logger.warning(f"Blog post with title '{title}' already exists")
-                        return {
-                            "status": "duplicate",
-                            "message": f"Blog post with title '{title}' already exists",
-                            "blog": new_blog
-                        }
-                    
-                    result = supabase.table('blogs').insert(new_blog).execute()
-                    
-                    if result.data:
-                        logger.info(f"Blog post saved successfully with ID: {result.data[0]['id']}")
-                        
-                        # Create vector embeddings for the blog post if the tool is available
-                        if vector_embedding_tool:
-                            try:
-                                embedding_result = vector_embedding_tool._run(
-                                    blog_id=result.data[0]['id'],
-                                    content=new_blog['content'],
-                                    title=new_blog['title'],
-                                    operation="create"
-                                )
-                                
-                                if isinstance(embedding_result, dict) and "error" in embedding_result:
-                                    logger.warning(f"Failed to create embeddings: {embedding_result['error']}")
-                                else:
-                                    logger.info(f"Created embeddings for blog post: {result.data[0]['id']}")
-                            except Exception as embedding_error:
-                                logger.error(f"Error creating embeddings: {str(embedding_error)}")
-                                logger.error(traceback.format_exc())
-                        
-                        return {
-                            "status": "success",
-                            "message": "Blog post created successfully from final answer",
-                            "blog": result.data[0]
-                        }
-                    else:
-                        logger.error("Failed to save blog post from final answer")
-                        return {
-                            "status": "error",
-                            "message": "Failed to save blog post from final answer",
-                            "blog": new_blog
-                        }
-                except Exception as db_error:
-                    logger.error(f"Database error saving blog post: {str(db_error)}")
-                    logger.error(traceback.format_exc())
-                    return {
-                        "status": "error",
-                        "message": f"Database error: {str(db_error)}",
-                        "blog": new_blog
-                    }
+                return commit_blog(new_blog, category if category else "Technology",
+                                   "Blog post created successfully from final answer")
             
             # If we don't have trend analysis, try to fetch it
             if not trend_analysis and topic:
@@ -279,91 +421,20 @@ class CreateBlogPostTool(BaseTool):
                     }
                 
                 # Calculate trend score
-                trend_score = 1.0
-                if articles:
-                    scores = [article.get('trend_score', 1.0) for article in articles if isinstance(article, dict)]
-                    if scores:
-                        trend_score = sum(scores) / len(scores)
-                
-                # Get a relevant image URL for the blog post
-                image_url = None
-                if get_image_for_blog:
-                    try:
-                        image_url = get_image_for_blog(blog_data.get("title", ""), blog_data.get("content", ""), blog_data.get("category", "Technology"))
-                        logger.info(f"Generated image URL: {image_url}")
-                    except Exception as e:
-                        logger.error(f"Error getting image URL: {str(e)}")
+                trend_score = average_trend_score(articles)
                 
-                # Create the blog post
+                # Create the blog post; the image URL is filled in in the background after the save
                 new_blog = {
                     "title": blog_data.get("title"),
                     "content": blog_data.get("content"),
                     "category": blog_data.get("category", "technology").lower(),
-                    "image_url": image_url,
+                    "image_url": None,
                     "trend_score": trend_score,
                     "created_at": datetime.now().isoformat()
                 }
                 
-                # Check for duplicate title
-                try:
-                    existing = supabase.table('blogs').select('id').eq('title', new_blog['title']).execute()
-                    if existing.data:
-                        logger.warning(f"Blog post with title '{new_blog['title']}' already exists")
-                        return {
-                            "status": "duplicate",
-                            "message": f"Blog post with title '{new_blog['title']}' already exists",
-                            "blog": new_blog
-                        }
-                except Exception as db_error:
-                    logger.error(f"Database error checking for duplicates: {str(db_error)}")
-                    logger.error(traceback.format_exc())
-                
-                # Save to Supabase
-                logger.info(f"Saving blog post: {new_blog['title']}")
-                try:
-                    result = supabase.table('blogs').insert(new_blog).execute()
-                    
-                    if result.data:
-                        logger.info(f"Blog post saved successfully with ID: {result.data[0]['id']}")
-                        
-                        # Create vector embeddings for the blog post if the tool is available
-                        if vector_embedding_tool:
-                            try:
-                                embedding_result = vector_embedding_tool._run(
-                                    blog_id=result.data[0]['id'],
-                                    content=new_blog['content'],
-                                    title=new_blog['title'],
-                                    operation="create"
-                                )
-                                
-                                if isinstance(embedding_result, dict) and "error" in embedding_result:
-                                    logger.warning(f"Failed to create embeddings: {embedding_result['error']}")
-                                else:
-                                    logger.info(f"Created embeddings for blog post: {result.data[0]['id']}")
-                            except Exception as embedding_error:
-                                logger.error(f"Error creating embeddings: {str(embedding_error)}")
-                                logger.error(traceback.format_exc())
-                        
-                        return {
-                            "status": "success",
-                            "message": "Blog post created successfully",
-                            "blog": result.data[0]
-                        }
-                    else:
-                        logger.error("Failed to save blog post")
-                        return {
-                            "status": "error",
-                            "message": "Failed to save blog post",
-                            "blog": new_blog
-                        }
-                except Exception as db_error:
-                    logger.error(f"Database error saving blog post: {str(db_error)}")
-                    logger.error(traceback.format_exc())
-                    return {
-                        "status": "error",
-                        "message": f"Database error: {str(db_error)}",
-                        "blog": new_blog
-                    }
+                return commit_blog(new_blog, blog_data.get("category", "Technology"),
+                                   "Blog post created successfully")
             else:
                 logger.error("No trend analysis or final answer provided")
                 return {
@@ -0,0 +1,125 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+import numpy as np
+from tools.trend_scoring import _to_naive_datetime
+from config.logging_config import setup_logging
+
+logger = setup_logging()
+
+# Average cosine similarity above which two groups of articles are the same story
+STORY_SIMILARITY_THRESHOLD = float(os.getenv('STORY_SIMILARITY_THRESHOLD', '0.85'))
+# Articles published within this many hours count towards a story's growth
+STORY_RECENT_HOURS = float(os.getenv('STORY_RECENT_HOURS', '24'))
+# Upper bounds on the trend score boosts from story size and growth
+STORY_MAX_SIZE_BOOST = float(os.getenv('STORY_MAX_SIZE_BOOST', '1.5'))
+STORY_MAX_GROWTH_BOOST = float(os.getenv('STORY_MAX_GROWTH_BOOST', '1.25'))
+
+def agglomerative_clusters(embeddings: np.ndarray, threshold: float = None) -> np.ndarray:
+    """
+    Average-linkage agglomerative clustering on cosine similarity.
+
+    Repeatedly merges the two most similar groups until no pair has an
+    average similarity of at least threshold. Returns one label per row,
+    numbered from the largest cluster down.
+    """
+    threshold = STORY_SIMILARITY_THRESHOLD if threshold is None else threshold
+    count = len(embeddings)
+    if count == 0:
+        return np.zeros(0, dtype=int)
+    vectors = np.asarray(embeddings, dtype=np.float64)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1, norms)
+
+    similarity = vectors @ vectors.T
+    np.fill_diagonal(similarity, -np.inf)
+    sizes = np.ones(count)
+    labels = np.arange(count)
+    while count > 1:
+        i, j = divmod(int(np.argmax(similarity)), len(similarity))
+        if similarity[i, j] < threshold:
+            break
+        # Lance-Williams update: the merged group's similarity is the size-weighted average
+        merged = (similarity[i] * sizes[i] + similarity[j] * sizes[j]) / (sizes[i] + sizes[j])
+        similarity[i, :] = merged
+        similarity[:, i] = merged
+        similarity[i, i] = -np.inf
+        similarity[j, :] = -np.inf
+        similarity[:, j] = -np.inf
+        sizes[i] += sizes[j]
+        labels[labels == j] = i
+        count -= 1
+
+    _, inverse, counts = np.unique(labels, return_inverse=True, return_counts=True)
+    rank = np.empty_like(counts)
+    rank[np.argsort(-counts, kind='stable')] = np.arange(len(counts))
+    return rank[inverse]
+
+def cluster_articles(articles: List[Dict[str, Any]], vectors: Dict[str, np.ndarray],
+                     now: datetime = None) -> List[Dict[str, Any]]:
+    """
+    Group articles into story clusters.
+
+    Each cluster reports its size, how many members were published in the
+    last STORY_RECENT_HOURS, its growth (recent vs. older members, add-one
+    smoothed), the title closest to its centroid and member URLs. Articles
+    without an embedding are left out.
+    """
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    recent_cutoff = now - timedelta(hours=STORY_RECENT_HOURS)
+    members = [article for article in articles if article.get('id') in vectors]
+    if not members:
+        return []
+    matrix = np.stack([vectors[article['id']] for article in members])
+    labels = agglomerative_clusters(matrix)
+
+    clusters = []
+    for label in range(labels.max() + 1):
+        indices = np.flatnonzero(labels == label)
+        cluster_vectors = matrix[indices]
+        centroid = cluster_vectors.mean(axis=0)
+        representative = members[indices[int(np.argmax(cluster_vectors @ centroid))]]
+        recent = 0
+        for index in indices:
+            try:
+                if _to_naive_datetime(members[index]['published_at']) >= recent_cutoff:
+                    recent += 1
+            except Exception:
+                pass
+        older = len(indices) - recent
+        clusters.append({
+            'cluster_id': int(label),
+            'size': len(indices),
+            'recent': recent,
+            'growth': round((recent + 1) / (older + 1), 2),
+            'title': representative.get('title', ''),
+            'urls': [members[index].get('url') for index in indices],
+        })
+    return clusters
+
+def cluster_factors(articles: List[Dict[str, Any]], clusters: List[Dict[str, Any]]) -> List[float]:
+    """
+    Trend score multiplier per article from its story cluster.
+
+    Bigger stories score higher (+10% per extra article) and growing ones
+    higher still (square root of growth); stories that have gone quiet are
+    damped slightly. Articles alone in their cluster get 1.0, since their
+    recency is already in the time decay.
+    """
+    by_url = {}
+    for cluster in clusters:
+        if cluster['size'] < 2:
+            continue
+        size_factor = min(STORY_MAX_SIZE_BOOST, 1.0 + 0.1 * (cluster['size'] - 1))
+        growth_factor = float(np.clip(np.sqrt(cluster['growth']), 0.8, STORY_MAX_GROWTH_BOOST))
+        for url in cluster['urls']:
+            by_url[url] = size_factor * growth_factor
+    return [by_url.get(article.get('url'), 1.0) for article in articles]
+
+def describe_clusters(clusters: List[Dict[str, Any]], limit: int = 5) -> str:
+    """Prompt lines for the largest multi-article stories"""
+    lines = [
+        f"- {cluster['title']} ({cluster['size']} articles, {cluster['recent']} in the last {STORY_RECENT_HOURS:g}h)"
+        for cluster in clusters if cluster['size'] > 1
+    ]
+    return "\n".join(lines[:limit])
@@ -0,0 +1,158 @@
+import os
+import threading
+import contextvars
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Dict, Iterator, Optional
+import tiktoken
+from config.logging_config import setup_logging
+from config.llm_config import get_model_price
+
+logger = setup_logging()
+
+# Total tokens (prompt + completion) one workflow run may spend
+WORKFLOW_TOKEN_BUDGET = int(os.getenv('WORKFLOW_TOKEN_BUDGET', '150000'))
+# Per-stage limits, e.g. "crew=90000,trend_analysis=20000,blog_generation=12000"
+WORKFLOW_STAGE_BUDGETS = os.getenv(
+    'WORKFLOW_STAGE_BUDGETS',
+    'crew=90000,article_enrichment=30000,trend_analysis=20000,blog_generation=12000'
+)
+
+class TokenBudgetExceeded(Exception):
+    """Raised before an LLM call that would take a workflow past its budget"""
+
+    def __init__(self, stage: str, requested: int, remaining: int):
+        super().__init__(f"Token budget exhausted for {stage}: {requested} tokens requested, {remaining} remaining")
+        self.stage = stage
+        self.requested = requested
+        self.remaining = remaining
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: Optional[str]):
+    try:
+        return tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("cl100k_base")
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+def count_tokens(text: str, model: str = None) -> int:
+    """Count tokens in text with the tokenizer used by model"""
+    return len(_get_encoding(model).encode(text or ""))
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = None) -> str:
+    """Truncate text to at most max_tokens tokens"""
+    encoding = _get_encoding(model)
+    tokens = encoding.encode(text or "")
+    if len(tokens) <= max_tokens:
+        return text or ""
+    return encoding.decode(tokens[:max_tokens])
+
+def _parse_budgets(spec: str) -> Dict[str, int]:
+    budgets = {}
+    for item in spec.split(','):
+        if '=' in item:
+            stage, limit = item.split('=', 1)
+            try:
+                budgets[stage.strip()] = int(limit)
+            except ValueError:
+                logger.warning(f"Ignoring invalid stage budget '{item}'")
+    return budgets
+
+class WorkflowUsage:
+    """
+    Token and cost accounting for one workflow run.
+
+    Stages are the LLM task names (crew, article_enrichment, trend_analysis,
+    blog_generation, ...). Each call records the tiktoken estimate made
+    before the request and the usage reported by the API afterwards.
+    Budgets are checked against the reported usage so far plus the
+    estimate for the next call.
+    """
+
+    def __init__(self, run_budget: int = None, stage_budgets: Dict[str, int] = None):
+        self.run_budget = WORKFLOW_TOKEN_BUDGET if run_budget is None else run_budget
+        self.stage_budgets = _parse_budgets(WORKFLOW_STAGE_BUDGETS) if stage_budgets is None else stage_budgets
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.degraded: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _stage(self, stage: str) -> Dict[str, Any]:
+        return self.stages.setdefault(stage, {
+            'calls': 0, 'estimated_prompt_tokens': 0, 'prompt_tokens': 0,
+            'completion_tokens': 0, 'cost_usd': 0.0,
+        })
+
+    def _used(self, stage: str = None) -> int:
+        stages = [self.stages.get(stage, {})] if stage else self.stages.values()
+        return sum(s.get('prompt_tokens', 0) + s.get('completion_tokens', 0) for s in stages)
+
+    def remaining(self, stage: str = None) -> Optional[int]:
+        """Tokens left for stage (bounded by the run budget), or None if unlimited"""
+        with self._lock:
+            limits = []
+            if self.run_budget:
+                limits.append(self.run_budget - self._used())
+            if stage and self.stage_budgets.get(stage):
+                limits.append(self.stage_budgets[stage] - self._used(stage))
+        return max(0, min(limits)) if limits else None
+
+    def allows(self, stage: str, tokens: int) -> bool:
+        remaining = self.remaining(stage)
+        return remaining is None or tokens <= remaining
+
+    def check(self, stage: str, tokens: int):
+        """Raise TokenBudgetExceeded if a call of this size does not fit"""
+        remaining = self.remaining(stage)
+        if remaining is not None and tokens > remaining:
+            raise TokenBudgetExceeded(stage, tokens, remaining)
+
+    def record(self, stage: str, model: str, estimated_prompt_tokens: int = 0,
+               prompt_tokens: int = 0, completion_tokens: int = 0):
+        input_price, output_price = get_model_price(model)
+        with self._lock:
+            counters = self._stage(stage)
+            counters['calls'] += 1
+            counters['estimated_prompt_tokens'] += estimated_prompt_tokens or 0
+            counters['prompt_tokens'] += prompt_tokens or 0
+            counters['completion_tokens'] += completion_tokens or 0
+            counters['cost_usd'] += ((prompt_tokens or 0) * input_price + (completion_tokens or 0) * output_price) / 1e6
+
+    def degrade(self, stage: str, reason: str):
+        """Note that stage ran in a reduced mode to stay within budget"""
+        with self._lock:
+            if stage not in self.degraded:
+                logger.warning(f"Degrading {stage} to stay within token budget: {reason}")
+                self.degraded[stage] = reason
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {stage: dict(counters, cost_usd=round(counters['cost_usd'], 6))
+                      for stage, counters in self.stages.items()}
+            degraded = dict(self.degraded)
+        prompt = sum(s['prompt_tokens'] for s in stages.values())
+        completion = sum(s['completion_tokens'] for s in stages.values())
+        return {
+            'prompt_tokens': prompt,
+            'completion_tokens': completion,
+            'total_tokens': prompt + completion,
+            'estimated_prompt_tokens': sum(s['estimated_prompt_tokens'] for s in stages.values()),
+            'cost_usd': round(sum(s['cost_usd'] for s in stages.values()), 6),
+            'run_budget': self.run_budget,
+            'stage_budgets': dict(self.stage_budgets),
+            'stages': stages,
+            'degraded': degraded,
+        }
+
+_current_usage: contextvars.ContextVar[Optional[WorkflowUsage]] = contextvars.ContextVar('workflow_usage', default=None)
+
+def current_usage() -> Optional[WorkflowUsage]:
+    """The WorkflowUsage of the workflow running in this context, if any"""
+    return _current_usage.get()
+
+@contextmanager
+def track_usage(usage: Optional[WorkflowUsage]) -> Iterator[Optional[WorkflowUsage]]:
+    """Attribute LLM calls made inside the block to usage"""
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(token)
@@ -1,95 +1,103 @@
 import os
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
 from crewai.tools import BaseTool
 from tools.supabase_client import supabase
 from config.logging_config import setup_logging
-from langchain_openai import ChatOpenAI
-from tools.memory_store import MemoryStore
-import numpy as np
-from datetime import datetime, timezone
+from tools.memory_store import get_memory_store
+from tools.llm_cache import CachingLLM
+from tools.llm_gateway import GatewayLLM
+from tools.enrichment_queue import get_enrichment_queue
+from tools.token_budget import current_usage
+from tools.trend_scoring import calculate_trend_score, calculate_trend_scores
+from tools.trend_engine import extract_terms, get_trend_engine
+from tools.article_embeddings import embed_articles
+from tools.trend_leaderboard import get_trend_leaderboard
+from tools.story_clustering import cluster_articles, cluster_factors, describe_clusters
+from tools.trend_state import (
+    load_trend_state, mark_articles_analyzed, merge_top_articles, merge_trend_data, save_trend_state
+)
+from tools.trend_prompt import (
+    TREND_MAX_MAP_CHUNKS, TREND_PROMPT_TOKEN_BUDGET, analysis_prompt, merge_prompt, pack_chunks
+)
 import traceback
 import json
 
 logger = setup_logging()
-llm = ChatOpenAI(temperature=0.7)
-memory_store = MemoryStore()
+llm = CachingLLM(GatewayLLM.for_task('trend_analysis'), site='trend_analysis')
+memory_store = get_memory_store()
+enrichment_queue = get_enrichment_queue()
+trend_engine = get_trend_engine()
+trend_leaderboard = get_trend_leaderboard()
 
-def calculate_trend_score(article_data: Dict[str, Any]) -> float:
-    """Calculate trend score based on various factors"""
-    base_score = 1.0
-    now = datetime.now(timezone.utc).replace(tzinfo=None)  # Ensure timezone-naive
-    
-    # Time decay factor (newer articles score higher)
-    if 'published_at' in article_data:
-        try:
-            # Handle ISO format with timezone
-            if isinstance(article_data['published_at'], str):
-                if 'Z' in article_data['published_at']:
-                    # Convert to timezone-naive by removing the Z and timezone info
-                    pub_date_str = article_data['published_at'].replace('Z', '')
-                    pub_date = datetime.fromisoformat(pub_date_str)
-                else:
-                    # Already timezone-naive
-                    pub_date = datetime.fromisoformat(article_data['published_at'])
-            else:
-                # If it's already a datetime object
-                pub_date = article_data['published_at']
-                
-            # Ensure timezone-naive for comparison
-            if pub_date.tzinfo is not None:
-                pub_date = pub_date.replace(tzinfo=None)
-                
-            hours_old = (now - pub_date).total_seconds() / 3600
-            time_factor = np.exp(-hours_old / 24)  # Exponential decay over 24 hours
-        except Exception as e:
-            logger.error(f"Error parsing published_at date: {e}")
-            logger.error(traceback.format_exc())
-            time_factor = 0.5
-    else:
-        time_factor = 0.5
-
-    # Source credibility factor (can be expanded)
-    source_factor = 1.0
-    if article_data.get('source'):
-        major_sources = {'reuters', 'associated press', 'bloomberg', 'bbc', 'cnn', 'the verge', 'wired', 'techcrunch'}
-        if isinstance(article_data['source'], str) and article_data['source'].lower() in major_sources:
-            source_factor = 1.2
-
-    # Content relevance factor (based on key points)
-    key_points = memory_store.get_article_key_points(article_data.get('url', ''))
-    relevance_factor = min(1.5, 0.8 + (len(key_points) * 0.1))
-
-    final_score = base_score * time_factor * source_factor * relevance_factor
-    return round(final_score, 2)
+# Seconds to wait for background enrichment before scoring without key points
+ENRICHMENT_WAIT_TIMEOUT = float(os.getenv('ENRICHMENT_WAIT_TIMEOUT', '10'))
+# Tokens kept free for the prompt template and the JSON response
+TREND_ANALYSIS_RESERVED_TOKENS = int(os.getenv('TREND_ANALYSIS_RESERVED_TOKENS', '1500'))
+# Parallel LLM calls in the map step of map-reduce trend analysis
+TREND_MAP_WORKERS = int(os.getenv('TREND_MAP_WORKERS', '4'))
+# Analyse only unanalyzed articles and merge them into the persisted per-topic state
+TREND_INCREMENTAL = os.getenv('TREND_INCREMENTAL', 'true').lower() == 'true'
+# Unanalyzed articles fetched per incremental run
+TREND_INCREMENTAL_BATCH = int(os.getenv('TREND_INCREMENTAL_BATCH', '100'))
+# Embed articles and group them into story clusters that feed scoring and the prompt
+STORY_CLUSTERING = os.getenv('STORY_CLUSTERING', 'true').lower() == 'true'
+# Rising terms from the trend engine, found in the topic's articles, added to the prompt
+TREND_SIGNAL_LIMIT = int(os.getenv('TREND_SIGNAL_LIMIT', '10'))
 
 class TrendAnalyzerTool(BaseTool):
     name: str = "analyze_trends"
     description: str = "Analyze trends in collected news articles"
     
+    def _fetch_articles(self, topic: str = None, category: str = None, only_new: bool = False):
+        """Latest articles matching topic and category; only_new limits them to unanalyzed ones"""
+        query = supabase.table('news_articles').select('*')
+        
+        if topic:
+            query = query.ilike('title', f'%{topic}%')
+        
+        if category:
+            query = query.eq('category', category)
+
+        if only_new:
+            query = query.eq('analyzed', False)
+            
+        # Order by created_at instead of updated_at
+        limit = TREND_INCREMENTAL_BATCH if only_new else 20
+        return query.order('created_at', desc=True).limit(limit).execute()
+
     def _run(self, topic: str = None, category: str = None, articles: List[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Run the trend analysis with the given inputs"""
         try:
             logger.info(f"analyze_trends running with topic: {topic}, category: {category}")
-            
+            state = load_trend_state(topic, category if category else 'miscellaneous') if TREND_INCREMENTAL else None
+
+            if articles and state:
+                # Articles already folded into the state are not analysed again
+                articles = [article for article in articles if not (isinstance(article, dict) and article.get('analyzed'))]
+                if not articles:
+                    logger.info("All provided articles were already analyzed, returning stored trends")
+                    return self._state_result(state, topic, category, new_articles=0)
+
             if not articles:
                 # Fetch articles from Supabase if not provided
                 logger.info("No articles provided, fetching from Supabase")
                 
                 try:
-                    query = supabase.table('news_articles').select('*')
-                    
-                    if topic:
-                        query = query.ilike('title', f'%{topic}%')
-                    
-                    if category:
-                        query = query.eq('category', category)
-                        
-                    # Order by created_at instead of updated_at
-                    result = query.order('created_at', desc=True).limit(20).execute()
+                    result = self._fetch_articles(topic, category, only_new=TREND_INCREMENTAL)
+                    if not result.data and TREND_INCREMENTAL and not state:
+                        # analyzed is shared by every topic: a topic without state starts from the
+                        # latest matching articles even if another topic already analysed them
+                        logger.info("No unanalyzed articles for a new topic, using the latest matching articles")
+                        result = self._fetch_articles(topic, category, only_new=False)
                     
                     if result.data:
                         logger.info(f"Fetched {len(result.data)} articles from Supabase")
                         articles = result.data
+                    elif state:
+                        logger.info("No new articles since the last analysis, returning stored trends")
+                        return self._state_result(state, topic, category, new_articles=0)
                     else:
                         logger.warning("No articles found in Supabase")
                         return {
@@ -108,27 +116,56 @@ class TrendAnalyzerTool(BaseTool):
                         "error": str(db_error)
                     }
             
-            # Process articles and calculate trend scores
-            processed_articles = []
+            # Give background enrichment a bounded chance to finish so key points count
+            urls = [article['url'] for article in articles if isinstance(article, dict) and article.get('url')]
+            if urls:
+                ready = enrichment_queue.wait_for(urls, timeout=ENRICHMENT_WAIT_TIMEOUT)
+                logger.info(f"{sum(ready.values())}/{len(urls)} articles enriched before scoring")
+
+            # Process articles and calculate trend scores in one batch
+            valid_articles = []
             for article in articles:
                 if not isinstance(article, dict):
                     logger.warning(f"Skipping non-dict article: {type(article)}")
                     continue
-                    
-                # Calculate trend score
+                valid_articles.append(article)
+
+            # Story clusters boost articles covered widely and recently
+            clusters, factors = [], None
+            if STORY_CLUSTERING and valid_articles:
                 try:
-                    trend_score = calculate_trend_score(article)
-                    article_with_score = article.copy()
-                    article_with_score['trend_score'] = trend_score
-                    processed_articles.append(article_with_score)
+                    clusters = cluster_articles(valid_articles, embed_articles(valid_articles))
+                    factors = cluster_factors(valid_articles, clusters)
+                    logger.info(f"Grouped {len(valid_articles)} articles into {len(clusters)} story clusters")
                 except Exception as e:
-                    logger.error(f"Error calculating trend score: {str(e)}")
+                    logger.error(f"Error clustering articles, scoring without stories: {str(e)}")
                     logger.error(traceback.format_exc())
-                    # Still include the article but with default score
-                    article_with_score = article.copy()
-                    article_with_score['trend_score'] = 1.0
-                    processed_articles.append(article_with_score)
+            stories = describe_clusters(clusters)
+
+            try:
+                trend_scores = [
+                    float(score) for score in calculate_trend_scores(valid_articles, memory_store, cluster_factors=factors)
+                ]
+            except Exception as e:
+                logger.error(f"Error calculating batch trend scores, scoring individually: {str(e)}")
+                logger.error(traceback.format_exc())
+                trend_scores = []
+                for i, article in enumerate(valid_articles):
+                    try:
+                        trend_scores.append(calculate_trend_score(article, memory_store, cluster_factor=factors[i] if factors else 1.0))
+                    except Exception as article_error:
+                        logger.error(f"Error calculating trend score: {str(article_error)}")
+                        # Still include the article but with default score
+                        trend_scores.append(1.0)
+
+            processed_articles = []
+            for article, trend_score in zip(valid_articles, trend_scores):
+                article_with_score = article.copy()
+                article_with_score['trend_score'] = trend_score
+                processed_articles.append(article_with_score)
             
+            logger.info("Memory store stats after scoring", extra={'extra_data': memory_store.get_stats()})
+
             if not processed_articles:
                 logger.warning("No valid articles to analyze")
                 return {
@@ -138,36 +175,63 @@ class TrendAnalyzerTool(BaseTool):
                     "error": "No valid articles to analyze"
                 }
             
-            # Extract titles and content for analysis
-            titles = [article.get('title', '') for article in processed_articles if article.get('title')]
-            contents = [article.get('content', '') for article in processed_articles if article.get('content')]
-            
-            # Combine titles and content for analysis
-            analysis_text = "\n\n".join(titles + contents)
-            
-            # Use LLM to identify trends
-            prompt = f"""Analyze the following news articles to identify key trends, patterns, and insights:
+            # Statistical burst detection runs locally. Only rising terms that occur in this
+            # topic's articles are passed on, so other stories in the category do not take over
+            try:
+                signals = trend_engine.rising_terms(category, limit=TREND_SIGNAL_LIMIT * 3)
+            except Exception as e:
+                logger.error(f"Error detecting rising terms: {str(e)}")
+                signals = []
+            article_terms = [
+                extract_terms(" ".join(str(article.get(field) or "") for field in ('title', 'description', 'content')))
+                for article in processed_articles
+            ]
+            signals = [
+                signal for signal in signals if any(signal['term'] in terms for terms in article_terms)
+            ][:TREND_SIGNAL_LIMIT]
 
-            Articles:
-            {analysis_text}
+            signal_lines = []
+            for signal in signals:
+                evidence = [
+                    article['title'] for article, terms in zip(processed_articles, article_terms)
+                    if signal['term'] in terms and article.get('title')
+                ][:2]
+                line = f"- {signal['term']}: {signal['count']} articles in the last {trend_engine.window_hours}h " \
+                       f"(expected {signal['expected']}, {signal['growth']}x usual rate)"
+                if evidence:
+                    line += "; e.g. " + "; ".join(evidence)
+                signal_lines.append(line)
+            signal_text = "\n            ".join(signal_lines)
 
-            Identify:
-            1. Main themes across the articles
-            2. Key developments or announcements
-            3. Emerging trends
-            4. Important insights or implications
+            # Within a workflow budget, every map call and the merge call need their reserved tokens
+            max_chunks, corpus_budget = TREND_MAX_MAP_CHUNKS, None
+            usage = current_usage()
+            remaining = usage.remaining('trend_analysis') if usage is not None else None
+            if remaining is not None:
+                per_chunk = TREND_PROMPT_TOKEN_BUDGET + TREND_ANALYSIS_RESERVED_TOKENS
+                max_chunks = max(1, min(max_chunks, (remaining - TREND_ANALYSIS_RESERVED_TOKENS) // per_chunk))
+                corpus_budget = remaining - TREND_ANALYSIS_RESERVED_TOKENS * (max_chunks + (max_chunks > 1))
 
-            Format your response as a JSON with these keys:
-            - themes: List of main themes
-            - developments: List of key developments
-            - trends: List of emerging trends
-            - insights: List of important insights or implications
-            """
-            
+            chunks, dropped = pack_chunks(processed_articles, max_chunks=max_chunks, corpus_budget=corpus_budget)
+            if dropped:
+                reason = f"{dropped} of {len(processed_articles)} articles left out of the trend prompt"
+                if usage is not None:
+                    usage.degrade('trend_analysis', reason)
+                else:
+                    logger.info(f"Trend prompt budget reached, {reason}")
+            prompt = analysis_prompt(chunks[0] if chunks else [], stories, signal_text)
+
+            analysis_ok = False
             try:
-                response = llm.predict(prompt)
+                if len(chunks) > 1:
+                    logger.info(f"Analysing trends with map-reduce over {len(chunks)} chunks")
+                    response = self._map_reduce(chunks, stories, signal_text)
+                else:
+                    response = llm.predict(prompt)
                 try:
                     trend_data = json.loads(response)
+                    # Only a parsed analysis is merged into the topic state
+                    analysis_ok = True
                 except json.JSONDecodeError:
                     logger.error("Failed to parse LLM response as JSON")
                     # Create a structured format from unstructured response
@@ -189,13 +253,34 @@ class TrendAnalyzerTool(BaseTool):
             
             # Sort articles by trend score
             sorted_articles = sorted(processed_articles, key=lambda x: x.get('trend_score', 0), reverse=True)
+            top_articles = sorted_articles[:10]  # Top 10 articles by trend score
+
+            if TREND_INCREMENTAL and analysis_ok:
+                # Fold the new articles into the topic state, then never analyse them again
+                previous = state or {}
+                trend_data = merge_trend_data(previous.get('trends'), trend_data)
+                top_articles = merge_top_articles(previous.get('top_articles'), sorted_articles)
+                article_count = previous.get('article_count', 0) + len(processed_articles)
+                save_trend_state(topic, category if category else 'miscellaneous', trend_data, top_articles, article_count)
+                # Store the computed scores so the leaderboard does not rank them at the insert-time 1.0
+                marked = mark_articles_analyzed(
+                    [article.get('id') for article in processed_articles],
+                    {article.get('id'): article.get('trend_score') for article in processed_articles},
+                    {article.get('id'): factor for article, factor in zip(valid_articles, factors)} if factors else None
+                )
+                logger.info(f"Merged {len(processed_articles)} new articles into trend state, marked {marked} analyzed")
+                if marked:
+                    trend_leaderboard.mark_dirty({article.get('category') for article in processed_articles})
             
             # Prepare result
             result = {
                 "trends": trend_data,
-                "articles": sorted_articles[:10],  # Top 10 articles by trend score
+                "articles": top_articles,
                 "category": category if category else 'miscellaneous',
-                "topic": topic
+                "topic": topic,
+                "signals": signals,
+                "stories": [{key: cluster[key] for key in ('title', 'size', 'recent', 'growth')} for cluster in clusters[:10]],
+                "new_articles": len(processed_articles)
             }
             
             return result
@@ -210,6 +295,37 @@ class TrendAnalyzerTool(BaseTool):
                 "error": str(e)
             }
     
+    def _state_result(self, state: Dict[str, Any], topic: str, category: str, new_articles: int) -> Dict[str, Any]:
+        """Result built from the persisted trend state alone"""
+        return {
+            "trends": state.get('trends') or {},
+            "articles": state.get('top_articles') or [],
+            "category": category if category else 'miscellaneous',
+            "topic": topic,
+            "signals": [],
+            "new_articles": new_articles
+        }
+
+    def _map_reduce(self, chunks: List[List[str]], stories: str = "", signals: str = "") -> str:
+        """Analyse each chunk in parallel, then merge the partial analyses in a final call"""
+        with ThreadPoolExecutor(max_workers=min(TREND_MAP_WORKERS, len(chunks))) as executor:
+            # Each call runs in a copy of this context so the workflow token budget still applies
+            futures = [
+                executor.submit(contextvars.copy_context().run, llm.predict, analysis_prompt(chunk))
+                for chunk in chunks
+            ]
+            partials = []
+            for future in futures:
+                try:
+                    partials.append(future.result())
+                except Exception as e:
+                    logger.error(f"Error analysing trend chunk: {str(e)}")
+        if not partials:
+            raise RuntimeError("All trend analysis chunks failed")
+        if len(partials) == 1:
+            return partials[0]
+        return llm.predict(merge_prompt(partials, stories, signals))
+
     def _parse_input(self, inputs: Any) -> Dict[str, Any]:
         """Parse the input to extract topic, category, and articles"""
         logger.info(f"analyze_trends received inputs type: {type(inputs)}")
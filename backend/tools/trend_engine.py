@@ -0,0 +1,287 @@
+import os
+import re
+import time
+import threading
+import traceback
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set
+import numpy as np
+from tools.supabase_client import supabase
+from tools.extractive_summarizer import STOPWORDS
+from config.logging_config import setup_logging
+
+logger = setup_logging()
+
+# Category key that aggregates every category
+ALL_CATEGORIES = 'all'
+
+TOKEN = re.compile(r"[a-z][a-z0-9'\-]*[a-z0-9]|[a-z]")
+PAGE_SIZE = 1000
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with stopwords and very short words replaced by None"""
+    return [word if word not in STOPWORDS and len(word) > 2 else None for word in TOKEN.findall((text or "").lower())]
+
+def extract_terms(text: str) -> Set[str]:
+    """Distinct terms and bigrams of adjacent non-stopword terms in text"""
+    tokens = tokenize(text)
+    terms = {token for token in tokens if token}
+    terms.update(f"{first} {second}" for first, second in zip(tokens, tokens[1:]) if first and second)
+    return terms
+
+def hour_bucket(value: Any) -> Optional[int]:
+    """Hours since the epoch (UTC) for a published_at string or datetime"""
+    if not value:
+        return None
+    try:
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp() // 3600)
+    except (TypeError, ValueError):
+        return None
+
+def current_hour() -> int:
+    return int(datetime.now(timezone.utc).timestamp() // 3600)
+
+def bucket_timestamp(hour: int) -> str:
+    return datetime.fromtimestamp(hour * 3600, timezone.utc).isoformat()
+
+class TrendEngine:
+    """
+    Local burst detection over hourly term and bigram counts.
+
+    Each article contributes its distinct terms and bigrams to the hourly
+    bucket of its published_at, per category and for ALL_CATEGORIES. The
+    rollups are kept in memory for window_hours + baseline_hours and
+    persisted to trend_term_rollups / trend_bucket_totals by increment, so
+    every worker can load them on start. Reads reload the persisted rollups
+    every reload_interval seconds to pick up articles ingested by other
+    workers, first deleting persisted buckets that fell out of the window.
+
+    A term is rising when its share of articles in the recent window is
+    well above its share in the rolling baseline that precedes it,
+    measured as a binomial z-score. Detection only touches the terms seen
+    in the window, so it runs in milliseconds.
+    """
+
+    def __init__(self, window_hours: int = 6, baseline_hours: int = 168, min_count: int = 3,
+                 persist: bool = True, reload_interval: float = 300.0):
+        self.window_hours = window_hours
+        self.baseline_hours = baseline_hours
+        self.min_count = min_count
+        self.persist = persist
+        self.reload_interval = reload_interval
+        self._loaded_at: Optional[float] = None
+        self._reload_lock = threading.Lock()
+        self._terms: Dict[str, Dict[int, Counter]] = defaultdict(dict)
+        self._articles: Dict[str, Dict[int, int]] = defaultdict(dict)
+        # Running totals over every retained hour, so baseline counts are total - window
+        self._term_totals: Dict[str, Counter] = defaultdict(Counter)
+        self._article_totals: Counter = Counter()
+        self._lock = threading.RLock()
+
+    def _add(self, category: str, hour: int, terms: Counter, articles: int):
+        hour_terms = self._terms[category].setdefault(hour, Counter())
+        hour_terms.update(terms)
+        self._term_totals[category].update(terms)
+        self._articles[category][hour] = self._articles[category].get(hour, 0) + articles
+        self._article_totals[category] += articles
+
+    def _prune(self, now_hour: int):
+        cutoff = now_hour - self.window_hours - self.baseline_hours
+        for category, hours in self._terms.items():
+            expired = [hour for hour in hours if hour <= cutoff]
+            for hour in expired:
+                self._term_totals[category].subtract(hours.pop(hour))
+                self._article_totals[category] -= self._articles[category].pop(hour, 0)
+            if expired:
+                # subtract() leaves zero entries behind
+                self._term_totals[category] = +self._term_totals[category]
+
+    def ingest(self, articles: Iterable[Dict[str, Any]], now_hour: int = None) -> int:
+        """Add articles to the rollups and persist the increments; returns articles counted"""
+        now_hour = current_hour() if now_hour is None else now_hour
+        cutoff = now_hour - self.window_hours - self.baseline_hours
+        terms: Dict[tuple, Counter] = defaultdict(Counter)
+        totals: Counter = Counter()
+
+        for article in articles:
+            hour = hour_bucket(article.get('published_at'))
+            if hour is None or hour <= cutoff:
+                continue
+            # Clock skew can date articles slightly in the future
+            hour = min(hour, now_hour)
+            category = (article.get('category') or 'miscellaneous').lower()
+            text = " ".join(str(article.get(field) or "") for field in ('title', 'description', 'content'))
+            terms[(category, hour)].update(extract_terms(text))
+            totals[(category, hour)] += 1
+
+        if not totals:
+            return 0
+        with self._lock:
+            for (category, hour), count in totals.items():
+                self._add(category, hour, terms[(category, hour)], count)
+                self._add(ALL_CATEGORIES, hour, terms[(category, hour)], count)
+            self._prune(now_hour)
+        if self.persist:
+            self._persist(terms, totals)
+        return sum(totals.values())
+
+    def _persist(self, terms: Dict[tuple, Counter], totals: Counter):
+        term_rows = [
+            {'category': category, 'bucket': bucket_timestamp(hour), 'term': term, 'count': count}
+            for (category, hour), counter in terms.items() for term, count in counter.items()
+        ]
+        total_rows = [
+            {'category': category, 'bucket': bucket_timestamp(hour), 'articles': count}
+            for (category, hour), count in totals.items()
+        ]
+        try:
+            supabase.rpc('increment_trend_rollups', {'term_rows': term_rows, 'total_rows': total_rows}).execute()
+        except Exception as e:
+            logger.error(f"Error persisting trend rollups: {str(e)}")
+
+    def prune_persisted(self, now_hour: int = None) -> Dict[str, int]:
+        """Delete persisted rollup buckets older than the retained window; returns rows removed per table"""
+        now_hour = current_hour() if now_hour is None else now_hour
+        until = bucket_timestamp(now_hour - self.window_hours - self.baseline_hours)
+        result = supabase.rpc('delete_trend_rollups', {'p_until': until}).execute()
+        return result.data or {}
+
+    def _fetch_since(self, table: str, columns: str, since: str) -> List[Dict[str, Any]]:
+        rows, start = [], 0
+        while True:
+            page = supabase.table(table).select(columns).gt('bucket', since)\
+                .order('bucket').range(start, start + PAGE_SIZE - 1).execute().data or []
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                return rows
+            start += PAGE_SIZE
+
+    def load(self, now_hour: int = None) -> int:
+        """Replace the in-memory rollups with the persisted ones for the retained window"""
+        now_hour = current_hour() if now_hour is None else now_hour
+        since = bucket_timestamp(now_hour - self.window_hours - self.baseline_hours)
+        totals = self._fetch_since('trend_bucket_totals', 'category,bucket,articles', since)
+        term_rows = self._fetch_since('trend_term_rollups', 'category,bucket,term,count', since)
+
+        terms: Dict[tuple, Counter] = defaultdict(Counter)
+        for row in term_rows:
+            terms[(row['category'], hour_bucket(row['bucket']))][row['term']] += row['count']
+        with self._lock:
+            self._terms.clear()
+            self._articles.clear()
+            self._term_totals.clear()
+            self._article_totals.clear()
+            for row in totals:
+                key = (row['category'], hour_bucket(row['bucket']))
+                self._add(row['category'], key[1], terms.get(key, Counter()), row['articles'])
+                self._add(ALL_CATEGORIES, key[1], terms.get(key, Counter()), row['articles'])
+            self._loaded_at = time.monotonic()
+        logger.info(f"Loaded {len(term_rows)} trend rollup rows across {len(totals)} hourly buckets")
+        return len(term_rows)
+
+    def _maybe_reload(self):
+        """Reload the persisted rollups once reload_interval has passed; one caller reloads at a time"""
+        if not self.persist or self.reload_interval <= 0:
+            return
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.reload_interval:
+            return
+        if not self._reload_lock.acquire(blocking=False):
+            return
+        try:
+            # Every worker prunes on its timer; deleting already-pruned buckets is a no-op
+            try:
+                self.prune_persisted()
+            except Exception as e:
+                logger.error(f"Error pruning trend rollups: {str(e)}")
+            self.load()
+        except Exception as e:
+            logger.error(f"Error reloading trend rollups: {str(e)}")
+            # Wait a full interval before trying again
+            self._loaded_at = time.monotonic()
+        finally:
+            self._reload_lock.release()
+
+    def rising_terms(self, category: str = None, limit: int = 20, now_hour: int = None) -> List[Dict[str, Any]]:
+        """
+        Terms whose share of recent articles in category is bursting.
+
+        Returns up to limit signals sorted by z-score, each with the window
+        count, the count expected from the baseline rate and the growth
+        ratio of the two rates.
+        """
+        self._maybe_reload()
+        now_hour = current_hour() if now_hour is None else now_hour
+        category = (category or ALL_CATEGORIES).lower()
+        window_hours = range(now_hour - self.window_hours + 1, now_hour + 1)
+
+        with self._lock:
+            self._prune(now_hour)
+            hours = self._terms.get(category, {})
+            window: Counter = Counter()
+            for hour in window_hours:
+                window.update(hours.get(hour, {}))
+            window_articles = sum(self._articles[category].get(hour, 0) for hour in window_hours)
+            baseline_articles = self._article_totals[category] - window_articles
+            candidates = [term for term, count in window.items() if count >= self.min_count]
+            if not candidates or not window_articles:
+                return []
+            totals = self._term_totals[category]
+            window_counts = np.fromiter((window[term] for term in candidates), dtype=float, count=len(candidates))
+            total_counts = np.fromiter((totals[term] for term in candidates), dtype=float, count=len(candidates))
+
+        baseline_counts = total_counts - window_counts
+        # Laplace smoothing gives terms unseen in the baseline a small, non-zero rate
+        baseline_rate = (baseline_counts + 1) / (baseline_articles + 2)
+        expected = baseline_rate * window_articles
+        z_scores = (window_counts - expected) / np.sqrt(expected * (1 - baseline_rate) + 1)
+        growth = (window_counts / window_articles) / baseline_rate
+
+        order = np.argsort(-z_scores)[:limit]
+        return [
+            {
+                'term': candidates[i],
+                'category': category,
+                'count': int(window_counts[i]),
+                'expected': round(float(expected[i]), 2),
+                'z_score': round(float(z_scores[i]), 2),
+                'growth': round(float(growth[i]), 2),
+            }
+            for i in order if z_scores[i] > 0
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                category: {'hours': len(hours), 'terms': len(self._term_totals[category]),
+                           'articles': self._article_totals[category]}
+                for category, hours in self._terms.items()
+            }
+
+# Process-wide engine shared by ingestion, analysis and the API
+_trend_engine: Optional[TrendEngine] = None
+_trend_engine_lock = threading.Lock()
+
+def get_trend_engine() -> TrendEngine:
+    """Return the shared TrendEngine, loading persisted rollups on first use"""
+    global _trend_engine
+    if _trend_engine is None:
+        with _trend_engine_lock:
+            if _trend_engine is None:
+                engine = TrendEngine(
+                    window_hours=int(os.getenv('TREND_WINDOW_HOURS', '6')),
+                    baseline_hours=int(os.getenv('TREND_BASELINE_HOURS', '168')),
+                    min_count=int(os.getenv('TREND_MIN_COUNT', '3')),
+                    reload_interval=float(os.getenv('TREND_RELOAD_SECONDS', '300'))
+                )
+                try:
+                    engine.load()
+                except Exception as e:
+                    logger.error(f"Error loading trend rollups: {str(e)}")
+                    logger.error(traceback.format_exc())
+                _trend_engine = engine
+    return _trend_engine
@@ -0,0 +1,205 @@
+import os
+import time
+import threading
+import traceback
+from typing import Any, Dict, Iterable, List, Optional, Set
+from tools.supabase_client import supabase
+from tools.trend_scoring import ARTICLE_TREND_DECAY_HOURS, SOURCE_WEIGHTS
+from config.logging_config import setup_logging
+
+logger = setup_logging()
+
+# Leaderboard key for the ranking across every category
+ALL_CATEGORIES = 'all'
+
+# Published within this many hours, articles and blogs get their stored trend_score decayed
+TREND_DECAY_WINDOW_HOURS = int(os.getenv('TREND_DECAY_WINDOW_HOURS', '168'))
+# Blog scores decay more slowly than articles (ARTICLE_TREND_DECAY_HOURS)
+BLOG_TREND_DECAY_HOURS = float(os.getenv('BLOG_TREND_DECAY_HOURS', '72'))
+
+# Article fields shared by the leaderboard and news_articles; trend rows add id, rank, category and analyzed
+TREND_ROW_FIELDS = ('title', 'description', 'url', 'source', 'image_url', 'url_to_image', 'published_at', 'trend_score')
+
+def _trend_row(article_id: Any, rank: int, category: Optional[str], row: Dict[str, Any]) -> Dict[str, Any]:
+    """One ranked article in the shape served by /api/trends, whichever table it came from"""
+    return {'id': article_id, 'rank': rank, **{field: row.get(field) for field in TREND_ROW_FIELDS},
+            'category': category, 'analyzed': True}
+
+def get_ranked_articles(category: Optional[str] = None, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+    """
+    Ranked analyzed articles offset+1 .. offset+limit read from news_articles.
+
+    Serves pages past the leaderboard size and leaderboard failures with the
+    same ordering and category matching as refresh_trend_leaderboard.
+    """
+    query = supabase.table('news_articles').select(','.join(('id', 'category') + TREND_ROW_FIELDS)).eq('analyzed', True)
+    key = (category or ALL_CATEGORIES).strip().lower()
+    if key != ALL_CATEGORIES:
+        # ilike without wildcards is a case-insensitive equality, like lower(category) in the leaderboard
+        query = query.ilike('category', key.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_'))
+    rows = query.order('trend_score', desc=True).order('published_at', desc=True)\
+        .range(offset, offset + limit - 1).execute().data or []
+    return [_trend_row(row['id'], offset + i + 1, row.get('category'), row) for i, row in enumerate(rows)]
+
+def recompute_trend_scores(window_hours: int = None, min_interval: float = 0) -> Dict[str, int]:
+    """
+    Apply time decay to the stored trend_score of recent articles and blogs.
+
+    Runs as one SQL function call using the same factors as
+    calculate_trend_score, including the stored cluster_factor; returns the
+    number of rows changed per table. The function skips the run
+    ({"skipped": true}) while another caller is running it or when it ran
+    less than min_interval seconds ago.
+    """
+    result = supabase.rpc('recompute_trend_scores', {
+        'p_source_weights': SOURCE_WEIGHTS,
+        'p_window_hours': TREND_DECAY_WINDOW_HOURS if window_hours is None else window_hours,
+        'p_article_decay_hours': ARTICLE_TREND_DECAY_HOURS,
+        'p_blog_decay_hours': BLOG_TREND_DECAY_HOURS,
+        'p_min_interval_seconds': min_interval
+    }).execute()
+    return result.data or {}
+
+class TrendLeaderboard:
+    """
+    Keeps the trend_leaderboard table fresh and serves pages from it.
+
+    Analysis marks the categories it touched as dirty; a background worker
+    refreshes just those (plus 'all') after a short debounce, and every
+    category on a fixed interval so score changes made elsewhere show up.
+    With decay enabled, the interval refresh first recomputes decayed
+    trend scores so the ranking reflects article age. The worker only runs
+    once start() is called, which the API does on startup; scripts that
+    import the tools read the leaderboard without refreshing it.
+    Reads are primary-key range lookups on (category, rank).
+    """
+
+    def __init__(self, size: int = 200, interval: float = 300.0, debounce: float = 2.0, decay: bool = True):
+        self.size = size
+        self.interval = interval
+        self.debounce = debounce
+        self.decay = decay
+        self._dirty: Set[str] = set()
+        self._dirty_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._stats = {'refreshes': 0, 'full_refreshes': 0, 'errors': 0, 'last_refresh': None, 'last_decay': None}
+        self._stats_lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Start the refresh and decay worker if it is not running yet"""
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="trend-leaderboard", daemon=True)
+                self._worker.start()
+
+    @staticmethod
+    def _key(category: Optional[str]) -> str:
+        return (category or ALL_CATEGORIES).strip().lower()
+
+    def mark_dirty(self, categories: Iterable[Optional[str]]):
+        """Schedule a refresh of the given categories without blocking the caller"""
+        with self._dirty_lock:
+            self._dirty.update(self._key(category) for category in categories)
+            self._dirty.add(ALL_CATEGORIES)
+        self._wake.set()
+
+    def refresh(self, categories: Iterable[str] = None) -> int:
+        """Rebuild the given categories now, or every category when None; returns rows written"""
+        params = {'p_size': self.size}
+        if categories is not None:
+            params['p_categories'] = sorted(self._key(category) for category in categories)
+        result = supabase.rpc('refresh_trend_leaderboard', params).execute()
+        with self._stats_lock:
+            self._stats['full_refreshes' if categories is None else 'refreshes'] += 1
+            self._stats['last_refresh'] = time.time()
+        return result.data or 0
+
+    def get_page(self, category: Optional[str] = None, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        """Ranked articles offset+1 .. offset+limit for category, shaped like get_ranked_articles"""
+        # The leaderboard keeps the lowercase key; the article's own category comes from news_articles
+        columns = ','.join(('rank', 'article_id') + TREND_ROW_FIELDS + ('article:news_articles(category)',))
+        result = supabase.table('trend_leaderboard').select(columns)\
+            .eq('category', self._key(category))\
+            .gte('rank', offset + 1)\
+            .lte('rank', offset + limit)\
+            .order('rank')\
+            .execute()
+        return [
+            _trend_row(row['article_id'], row['rank'], (row.get('article') or {}).get('category'), row)
+            for row in result.data or []
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        with self._dirty_lock:
+            stats['dirty'] = sorted(self._dirty)
+        return stats
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._worker is not None:
+            self._worker.join(timeout=timeout)
+
+    def _decay(self):
+        # A failed decay still leaves the leaderboard to be refreshed
+        try:
+            # Every API worker runs this timer; the database lets about one run per interval through
+            updated = recompute_trend_scores(min_interval=self.interval * 0.9)
+            with self._stats_lock:
+                self._stats['last_decay'] = updated
+        except Exception as e:
+            with self._stats_lock:
+                self._stats['errors'] += 1
+            logger.error(f"Error recomputing trend scores: {str(e)}")
+
+    def _run(self):
+        next_full = time.monotonic()
+        while not self._stop.is_set():
+            self._wake.wait(timeout=max(0.0, next_full - time.monotonic()))
+            if self._stop.is_set():
+                break
+            try:
+                if time.monotonic() >= next_full:
+                    next_full = time.monotonic() + self.interval
+                    with self._dirty_lock:
+                        self._dirty.clear()
+                    self._wake.clear()
+                    if self.decay:
+                        self._decay()
+                    self.refresh()
+                    continue
+                # Let a burst of analyses settle into one refresh
+                self._wake.clear()
+                time.sleep(self.debounce)
+                with self._dirty_lock:
+                    dirty, self._dirty = self._dirty, set()
+                if dirty:
+                    self.refresh(dirty)
+            except Exception as e:
+                with self._stats_lock:
+                    self._stats['errors'] += 1
+                logger.error(f"Error refreshing trend leaderboard: {str(e)}")
+                logger.error(traceback.format_exc())
+
+# Process-wide leaderboard refresher shared by analysis and the API
+_trend_leaderboard: Optional[TrendLeaderboard] = None
+_trend_leaderboard_lock = threading.Lock()
+
+def get_trend_leaderboard() -> TrendLeaderboard:
+    """Return the shared TrendLeaderboard; its refresh worker starts with start()"""
+    global _trend_leaderboard
+    if _trend_leaderboard is None:
+        with _trend_leaderboard_lock:
+            if _trend_leaderboard is None:
+                _trend_leaderboard = TrendLeaderboard(
+                    size=int(os.getenv('TREND_LEADERBOARD_SIZE', '200')),
+                    interval=float(os.getenv('TREND_LEADERBOARD_REFRESH_SECONDS', '300')),
+                    debounce=float(os.getenv('TREND_LEADERBOARD_DEBOUNCE_SECONDS', '2')),
+                    decay=os.getenv('TREND_DECAY_ON_REFRESH', 'true').lower() == 'true'
+                )
+    return _trend_leaderboard
@@ -0,0 +1,144 @@
+import os
+import re
+from typing import Any, Dict, List, Set, Tuple
+from tools.token_budget import count_tokens, truncate_to_tokens
+from config.logging_config import setup_logging
+
+logger = setup_logging()
+
+# Article tokens allowed in one trend analysis prompt (a single pass or one map chunk)
+TREND_PROMPT_TOKEN_BUDGET = int(os.getenv('TREND_PROMPT_TOKEN_BUDGET', '6000'))
+# Tokens of content kept per article, so one long body cannot crowd out the rest
+TREND_ARTICLE_MAX_TOKENS = int(os.getenv('TREND_ARTICLE_MAX_TOKENS', '600'))
+# Upper bound on map chunks; articles beyond budget * chunks are dropped by score
+TREND_MAX_MAP_CHUNKS = int(os.getenv('TREND_MAX_MAP_CHUNKS', '4'))
+# Word-shingle Jaccard similarity above which two snippets count as duplicates
+TREND_DEDUPE_THRESHOLD = float(os.getenv('TREND_DEDUPE_THRESHOLD', '0.8'))
+
+WORD = re.compile(r"\w+")
+SHINGLE_SIZE = 3
+
+RESPONSE_FORMAT = """Format your response as a JSON with these keys:
+            - themes: List of main themes
+            - developments: List of key developments
+            - trends: List of emerging trends
+            - insights: List of important insights or implications
+            """
+
+def _shingles(text: str) -> Set[Tuple[str, ...]]:
+    words = WORD.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {tuple(words)}
+    return {tuple(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+def article_snippet(article: Dict[str, Any], max_tokens: int = None) -> str:
+    """Title and token-truncated content of an article as it appears in the prompt"""
+    max_tokens = TREND_ARTICLE_MAX_TOKENS if max_tokens is None else max_tokens
+    title = article.get('title') or ''
+    content = truncate_to_tokens(article.get('content') or '', max_tokens)
+    return f"{title}\n{content}".strip()
+
+def dedupe_snippets(snippets: List[Tuple[Dict[str, Any], str]],
+                    threshold: float = None) -> List[Tuple[Dict[str, Any], str]]:
+    """
+    Drop snippets that are near-identical to an earlier one.
+
+    Syndicated stories and rewrites share most of their word 3-shingles,
+    so a Jaccard similarity above threshold marks a duplicate. Input order
+    is kept, so the highest scoring copy survives when sorted by score.
+    """
+    threshold = TREND_DEDUPE_THRESHOLD if threshold is None else threshold
+    kept, kept_shingles = [], []
+    for article, snippet in snippets:
+        shingles = _shingles(snippet)
+        if any(len(shingles & other) / (len(shingles | other) or 1) >= threshold for other in kept_shingles):
+            continue
+        kept.append((article, snippet))
+        kept_shingles.append(shingles)
+    return kept
+
+def pack_chunks(articles: List[Dict[str, Any]], chunk_budget: int = None, max_chunks: int = None,
+                corpus_budget: int = None) -> Tuple[List[List[str]], int]:
+    """
+    Pack article snippets, in trend score order, into prompt-sized chunks.
+
+    Each chunk holds at most chunk_budget tokens; packing stops after
+    max_chunks chunks or corpus_budget tokens in total. Returns the chunks
+    and the number of distinct articles that did not fit.
+    """
+    chunk_budget = TREND_PROMPT_TOKEN_BUDGET if chunk_budget is None else chunk_budget
+    max_chunks = TREND_MAX_MAP_CHUNKS if max_chunks is None else max_chunks
+    ranked = sorted(articles, key=lambda x: x.get('trend_score', 0), reverse=True)
+    snippets = dedupe_snippets([(article, article_snippet(article)) for article in ranked])
+    if len(snippets) < len(ranked):
+        logger.info(f"Dropped {len(ranked) - len(snippets)} near-duplicate articles from the trend prompt")
+
+    chunks: List[List[str]] = []
+    current: List[str] = []
+    current_tokens = total_tokens = packed = 0
+    for _, snippet in snippets:
+        tokens = count_tokens(snippet)
+        if tokens > chunk_budget:
+            snippet = truncate_to_tokens(snippet, chunk_budget)
+            tokens = chunk_budget
+        if corpus_budget is not None and total_tokens + tokens > corpus_budget:
+            break
+        if current_tokens + tokens > chunk_budget:
+            if len(chunks) + 1 >= max_chunks:
+                break
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(snippet)
+        current_tokens += tokens
+        total_tokens += tokens
+        packed += 1
+    if current:
+        chunks.append(current)
+    return chunks, len(snippets) - packed
+
+def stories_section(stories: str) -> str:
+    """Prompt section listing story clusters, or nothing when there are none"""
+    if not stories:
+        return ""
+    return f"""
+            Stories covered by several articles (grouped by similarity, largest first):
+            {stories}
+"""
+
+def signals_section(signals: str) -> str:
+    """Prompt section listing rising terms found in the articles, or nothing when there are none"""
+    if not signals:
+        return ""
+    return f"""
+            Terms in these articles that are rising sharply in recent coverage compared with the previous week:
+            {signals}
+            Where relevant, explain what is driving them.
+"""
+
+def analysis_prompt(snippets: List[str], stories: str = "", signals: str = "") -> str:
+    """Prompt asking for trends across one chunk of article snippets"""
+    analysis_text = "\n\n".join(snippets)
+    return f"""Analyze the following news articles to identify key trends, patterns, and insights:
+
+            Articles:
+            {analysis_text}
+{stories_section(stories)}{signals_section(signals)}
+            Identify:
+            1. Main themes across the articles
+            2. Key developments or announcements
+            3. Emerging trends
+            4. Important insights or implications
+
+            {RESPONSE_FORMAT}"""
+
+def merge_prompt(partial_analyses: List[str], stories: str = "", signals: str = "") -> str:
+    """Prompt combining per-chunk analyses into one"""
+    sections = "\n\n".join(f"Analysis {i + 1}:\n{analysis}" for i, analysis in enumerate(partial_analyses))
+    return f"""The following analyses each cover a different batch of news articles on the same subject:
+
+            {sections}
+{stories_section(stories)}{signals_section(signals)}
+            Merge them into a single analysis. Combine overlapping points, keep the most significant ones,
+            and prefer points supported by several analyses.
+
+            {RESPONSE_FORMAT}"""
@@ -0,0 +1,140 @@
+import os
+import traceback
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, List, Sequence
+import numpy as np
+from config.logging_config import setup_logging
+from tools.memory_store import MemoryStore, get_memory_store
+
+logger = setup_logging()
+
+DEFAULT_SOURCE_WEIGHTS = {
+    'reuters': 1.2, 'associated press': 1.2, 'bloomberg': 1.2, 'bbc': 1.2,
+    'cnn': 1.2, 'the verge': 1.2, 'wired': 1.2, 'techcrunch': 1.2,
+}
+
+def parse_source_weights(spec: str) -> Dict[str, float]:
+    """Parse "reuters=1.2,the verge=1.1" into a lowercase source -> weight map"""
+    weights = {}
+    for item in spec.split(','):
+        if '=' in item:
+            source, weight = item.rsplit('=', 1)
+            try:
+                weights[source.strip().lower()] = float(weight)
+            except ValueError:
+                logger.warning(f"Ignoring invalid source weight '{item}'")
+    return weights
+
+# TREND_SOURCE_WEIGHTS adds to or overrides the default credibility weights
+SOURCE_WEIGHTS = {**DEFAULT_SOURCE_WEIGHTS, **parse_source_weights(os.getenv('TREND_SOURCE_WEIGHTS', ''))}
+# Hours over which an article's trend score decays by a factor of e
+ARTICLE_TREND_DECAY_HOURS = float(os.getenv('ARTICLE_TREND_DECAY_HOURS', '24'))
+
+_EPOCH = datetime(1970, 1, 1)
+
+@lru_cache(maxsize=65536)
+def _parse_published_at(value: str) -> datetime:
+    if 'Z' in value:
+        # Convert to timezone-naive by removing the Z and timezone info
+        return datetime.fromisoformat(value.replace('Z', ''))
+    return datetime.fromisoformat(value)
+
+def _to_naive_datetime(value: Any) -> datetime:
+    """published_at as a naive datetime; the offset is dropped, not applied"""
+    pub_date = _parse_published_at(value) if isinstance(value, str) else value
+    if pub_date.tzinfo is not None:
+        pub_date = pub_date.replace(tzinfo=None)
+    return pub_date
+
+def _source_factor(source: Any, weights: Dict[str, float]) -> float:
+    if source and isinstance(source, str):
+        return weights.get(source.lower(), 1.0)
+    return 1.0
+
+def calculate_trend_score(article_data: Dict[str, Any], store: MemoryStore = None,
+                          source_weights: Dict[str, float] = None, now: datetime = None,
+                          cluster_factor: float = 1.0) -> float:
+    """Calculate trend score based on various factors"""
+    store = store if store is not None else get_memory_store()
+    weights = source_weights if source_weights is not None else SOURCE_WEIGHTS
+    base_score = 1.0
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)  # Ensure timezone-naive
+
+    # Time decay factor (newer articles score higher)
+    if 'published_at' in article_data:
+        try:
+            pub_date = _to_naive_datetime(article_data['published_at'])
+            hours_old = (now - pub_date).total_seconds() / 3600
+            time_factor = np.exp(-hours_old / ARTICLE_TREND_DECAY_HOURS)  # Exponential decay over ARTICLE_TREND_DECAY_HOURS
+        except Exception as e:
+            logger.error(f"Error parsing published_at date: {e}")
+            logger.error(traceback.format_exc())
+            time_factor = 0.5
+    else:
+        time_factor = 0.5
+
+    # Source credibility factor
+    source_factor = _source_factor(article_data.get('source'), weights)
+
+    # Content relevance factor (based on key points)
+    key_points = store.get_article_key_points(article_data.get('url', ''))
+    relevance_factor = min(1.5, 0.8 + (len(key_points) * 0.1))
+
+    # Story factor (size and growth of the article's story cluster)
+    final_score = base_score * time_factor * source_factor * relevance_factor * cluster_factor
+    return round(final_score, 2)
+
+def calculate_trend_scores(articles: List[Dict[str, Any]], store: MemoryStore = None,
+                           source_weights: Dict[str, float] = None, now: datetime = None,
+                           cluster_factors: Sequence[float] = None) -> np.ndarray:
+    """
+    Score many articles at once; element i equals calculate_trend_score(articles[i]).
+
+    Timestamps are parsed once (repeated strings are memoised), key points
+    are fetched with one backend lookup, and time decay, source and
+    relevance factors are computed as arrays.
+    """
+    store = store if store is not None else get_memory_store()
+    weights = source_weights if source_weights is not None else SOURCE_WEIGHTS
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    count = len(articles)
+
+    dates = []
+    valid = np.zeros(count, dtype=bool)
+    failures = 0
+    for i, article in enumerate(articles):
+        pub_date = _EPOCH
+        if 'published_at' in article:
+            try:
+                pub_date = _to_naive_datetime(article['published_at'])
+                valid[i] = True
+            except Exception:
+                failures += 1
+        dates.append(pub_date)
+    if failures:
+        logger.warning(f"Could not parse published_at for {failures} of {count} articles")
+
+    # Integer microseconds keep the age identical to timedelta.total_seconds()
+    published = np.array(dates, dtype='datetime64[us]')
+    age_us = (np.datetime64(now, 'us') - published[valid]).astype(np.int64)
+    time_factor = np.full(count, 0.5)
+    time_factor[valid] = np.exp(-(age_us / 1e6 / 3600) / ARTICLE_TREND_DECAY_HOURS)
+
+    source_factor = np.fromiter(
+        (_source_factor(article.get('source'), weights) for article in articles), dtype=float, count=count
+    )
+
+    urls = [article.get('url', '') for article in articles]
+    key_points = store.get_key_points_many(urls)
+    point_counts = np.fromiter((len(key_points[url]) for url in urls), dtype=float, count=count)
+    relevance_factor = np.minimum(1.5, 0.8 + point_counts * 0.1)
+
+    final_scores = 1.0 * time_factor * source_factor * relevance_factor
+    if cluster_factors is not None:
+        final_scores = final_scores * np.asarray(cluster_factors, dtype=float)
+    scores = np.round(final_scores, 2)
+    # The scalar version rounds with Python's round() when it falls back to a 0.5 time factor
+    for i in np.flatnonzero(~valid):
+        scores[i] = round(float(final_scores[i]), 2)
+    return scores
@@ -0,0 +1,117 @@
+import os
+import re
+import traceback
+from typing import Any, Dict, List, Optional
+from tools.supabase_client import supabase
+from config.logging_config import setup_logging
+
+logger = setup_logging()
+
+# Items kept per trend list (themes, developments, ...) in the persisted state
+TREND_STATE_MAX_ITEMS = int(os.getenv('TREND_STATE_MAX_ITEMS', '10'))
+# Top articles kept per topic
+TREND_STATE_MAX_ARTICLES = int(os.getenv('TREND_STATE_MAX_ARTICLES', '10'))
+
+TREND_KEYS = ('themes', 'developments', 'trends', 'insights')
+# Article fields kept in the state; bodies stay in news_articles
+ARTICLE_FIELDS = ('id', 'url', 'title', 'description', 'source', 'category', 'published_at', 'trend_score', 'url_to_image')
+# Ids per bulk update, keeping the PostgREST query string well under URL limits
+MARK_BATCH_SIZE = 200
+
+def topic_key(topic: Optional[str]) -> str:
+    """Normalised topic used to key the persisted state"""
+    return re.sub(r"\s+", " ", (topic or "").strip().lower())
+
+def _as_list(value: Any) -> List[Any]:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+def merge_trend_data(previous: Dict[str, Any], new: Dict[str, Any], limit: int = None) -> Dict[str, Any]:
+    """
+    Merge a fresh analysis into the accumulated one.
+
+    New items come first so recent developments stay visible; items already
+    present (case-insensitively) are not repeated, and each list is capped.
+    """
+    limit = TREND_STATE_MAX_ITEMS if limit is None else limit
+    previous = previous if isinstance(previous, dict) else {}
+    new = new if isinstance(new, dict) else {}
+    merged = {}
+    for key in TREND_KEYS:
+        seen, items = set(), []
+        for item in _as_list(new.get(key)) + _as_list(previous.get(key)):
+            marker = str(item).strip().lower()
+            if marker and marker not in seen:
+                seen.add(marker)
+                items.append(item)
+        merged[key] = items[:limit]
+    return merged
+
+def merge_top_articles(previous: List[Dict[str, Any]], new: List[Dict[str, Any]], limit: int = None) -> List[Dict[str, Any]]:
+    """Highest trend score articles across both lists, newer copies replacing older ones by URL"""
+    limit = TREND_STATE_MAX_ARTICLES if limit is None else limit
+    by_url = {}
+    for article in (previous or []) + (new or []):
+        by_url[article.get('url') or id(article)] = {field: article[field] for field in ARTICLE_FIELDS if field in article}
+    return sorted(by_url.values(), key=lambda x: x.get('trend_score', 0), reverse=True)[:limit]
+
+def load_trend_state(topic: Optional[str], category: str) -> Optional[Dict[str, Any]]:
+    """Persisted trend state for topic and category, or None"""
+    try:
+        result = supabase.table('topic_trend_state').select('*')\
+            .eq('topic_key', topic_key(topic))\
+            .eq('category', category)\
+            .limit(1)\
+            .execute()
+        return result.data[0] if result.data else None
+    except Exception as e:
+        logger.error(f"Error loading trend state: {str(e)}")
+        return None
+
+def save_trend_state(topic: Optional[str], category: str, trends: Dict[str, Any],
+                     top_articles: List[Dict[str, Any]], article_count: int):
+    try:
+        supabase.table('topic_trend_state').upsert({
+            'topic_key': topic_key(topic),
+            'category': category,
+            'trends': trends,
+            'top_articles': top_articles,
+            'article_count': article_count
+        }, on_conflict='topic_key,category').execute()
+    except Exception as e:
+        logger.error(f"Error saving trend state: {str(e)}")
+        logger.error(traceback.format_exc())
+
+def mark_articles_analyzed(article_ids: List[Any], trend_scores: Dict[Any, float] = None,
+                           cluster_factors: Dict[Any, float] = None) -> int:
+    """
+    Set analyzed = true on the given news_articles rows in a few bulk updates.
+
+    trend_scores (article id -> score) also stores the scores computed
+    during analysis, and cluster_factors the story-cluster factor the bulk
+    decay keeps applying. Articles are grouped by these values, which are
+    rounded, so this stays a handful of updates.
+    """
+    trend_scores = trend_scores or {}
+    cluster_factors = cluster_factors or {}
+    groups: Dict[Any, List[Any]] = {}
+    for article_id in dict.fromkeys(article_id for article_id in article_ids if article_id):
+        factor = cluster_factors.get(article_id)
+        key = (trend_scores.get(article_id), None if factor is None else round(float(factor), 3))
+        groups.setdefault(key, []).append(article_id)
+    marked = 0
+    for (score, factor), ids in groups.items():
+        values = {'analyzed': True}
+        if score is not None:
+            values['trend_score'] = float(score)
+        if factor is not None:
+            values['cluster_factor'] = factor
+        for start in range(0, len(ids), MARK_BATCH_SIZE):
+            batch = ids[start:start + MARK_BATCH_SIZE]
+            try:
+                supabase.table('news_articles').update(values).in_('id', batch).execute()
+                marked += len(batch)
+            except Exception as e:
+                logger.error(f"Error marking {len(batch)} articles analyzed: {str(e)}")
+    return marked
@@ -2,8 +2,10 @@ from crewai.tools import BaseTool
 from typing import Dict, Any, List, Optional
 from tools.supabase_client import supabase
 from tools.supabase_admin_client import admin_supabase
+from tools.llm_gateway import get_llm_gateway
+from tools.blog_chunking import chunk_markdown, embedding_input
+from config.llm_config import get_task_profile
 from config.logging_config import setup_logging
-import openai
 import os
 import json
 import traceback
@@ -43,7 +45,7 @@ class VectorEmbeddingTool(BaseTool):
             return {"error": str(e)}
     
     def _create_embeddings(self, blog_id: str, content: str, title: Optional[str] = None) -> Dict[str, Any]:
-        """Create embeddings for a blog post and store them in Supabase"""
+        """Chunk a blog post, embed all chunks in one request and store one row per chunk"""
         try:
             # Check if the blog post exists
             blog_result = supabase.table('blogs').select('*').eq('id', blog_id).execute()
@@ -51,39 +53,52 @@ class VectorEmbeddingTool(BaseTool):
             if not blog_result.data:
                 return {"error": f"Blog post with ID {blog_id} not found"}
             
-            # Generate embeddings using OpenAI
-            embedding = self._generate_embedding(content)
+            title = title or blog_result.data[0].get('title', '')
+            model = get_task_profile('blog_embedding')['model']
+            chunks = chunk_markdown(content, model=model)
+            if not chunks:
+                return {"error": "No content to embed"}
             
-            if not embedding:
+            # Generate embeddings for every chunk in a single batched request
+            embeddings = self._generate_embeddings([embedding_input(chunk, title) for chunk in chunks])
+            
+            if not embeddings:
                 return {"error": "Failed to generate embedding"}
             
             # Prepare the data for Supabase
-            embedding_data = {
+            created_at = datetime.now().isoformat()
+            embedding_rows = [{
                 "blog_id": blog_id,
-                "content": content[:1000],  # Store a preview of the content
-                "title": title or blog_result.data[0].get('title', ''),
+                "chunk_index": chunk['index'],
+                "heading": chunk['heading'],
+                "content": chunk['content'],
+                "start_offset": chunk['start'],
+                "end_offset": chunk['end'],
+                "token_count": chunk['tokens'],
+                "title": title,
                 "embedding": embedding,
-                "created_at": datetime.now().isoformat()
-            }
+                "created_at": created_at
+            } for chunk, embedding in zip(chunks, embeddings)]
             
-            # Try to insert into Supabase
+            # Try to save to Supabase; upserting by chunk keeps retries from adding rows
             try:
                 # First try with regular client
-                result = supabase.table('blog_embeddings').insert(embedding_data).execute()
-                logger.info(f"Created embedding for blog ID: {blog_id}")
+                self._store_chunks(supabase, blog_id, embedding_rows)
+                logger.info(f"Created {len(embedding_rows)} chunk embeddings for blog ID: {blog_id}")
             except Exception as e:
                 logger.warning(f"Error inserting embedding with regular client: {str(e)}")
                 # Try with admin client
                 if admin_supabase:
-                    result = admin_supabase.table('blog_embeddings').insert(embedding_data).execute()
-                    logger.info(f"Created embedding for blog ID: {blog_id} using admin client")
+                    self._store_chunks(admin_supabase, blog_id, embedding_rows)
+                    logger.info(f"Created {len(embedding_rows)} chunk embeddings for blog ID: {blog_id} using admin client")
                 else:
                     raise Exception("Admin client not available and regular client failed")
             
             return {
                 "status": "success",
-                "message": f"Created embedding for blog ID: {blog_id}",
-                "blog_id": blog_id
+                "message": f"Created {len(embedding_rows)} chunk embeddings for blog ID: {blog_id}",
+                "blog_id": blog_id,
+                "chunks": len(embedding_rows)
             }
             
         except Exception as e:
@@ -91,6 +106,11 @@ class VectorEmbeddingTool(BaseTool):
             logger.error(traceback.format_exc())
             return {"error": str(e)}
     
+    def _store_chunks(self, client, blog_id: str, embedding_rows: List[Dict[str, Any]]):
+        """Write the chunk rows and drop chunks left over from a longer earlier version of the post"""
+        client.table('blog_embeddings').upsert(embedding_rows, on_conflict='blog_id,chunk_index').execute()
+        client.table('blog_embeddings').delete().eq('blog_id', blog_id).gte('chunk_index', len(embedding_rows)).execute()
+    
     def _retrieve_embeddings(self, blog_id: str) -> Dict[str, Any]:
         """Retrieve embeddings for a blog post from Supabase"""
         try:
@@ -148,22 +168,21 @@ class VectorEmbeddingTool(BaseTool):
             logger.error(traceback.format_exc())
             return {"error": str(e)}
     
+    def _generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for a batch of texts in one request"""
+        try:
+            return get_llm_gateway().embed_for_task('blog_embedding', texts)
+            
+        except Exception as e:
+            logger.error(f"Error generating embeddings: {str(e)}")
+            logger.error(traceback.format_exc())
+            return None
+    
     def _generate_embedding(self, text: str) -> List[float]:
         """Generate an embedding for the given text using OpenAI"""
         try:
-            # Ensure API key is set
-            openai.api_key = os.getenv('OPENAI_API_KEY')
-            
             # Generate embedding
-            response = openai.embeddings.create(
-                model="text-embedding-ada-002",
-                input=text
-            )
-            
-            # Extract the embedding
-            embedding = response.data[0].embedding
-            
-            return embedding
+            return get_llm_gateway().embed_for_task('blog_embedding', text)[0]
             
         except Exception as e:
             logger.error(f"Error generating embedding: {str(e)}")